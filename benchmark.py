@@ -0,0 +1,395 @@
+"""
+Benchmark Suite - RT1018 Installer
+Times scan sweeps, sdcard/data pushes, full installs and backups at 1, 10 and 100 devices
+against virtual devices from fake_adb_simulator.py, and compares the results with a baseline
+
+Runs headless: the installer's own scan, push, install-plan and backup code is driven without
+the Tk window. Needs the `adb` binary (PATH, adb/ next to the program, or --adb).
+
+Usage:
+    python benchmark.py                                  # 1, 10, 100 devices, all scenarios
+    python benchmark.py --devices 1,10 --scenarios scan,install --latency 20 --bandwidth 2
+    python benchmark.py --save-baseline                  # store results as the new baseline
+    python benchmark.py --replay adb_traces/session_20260110_101500.jsonl --time-scale 0.5
+"""
+
+import argparse
+import contextlib
+import ipaddress
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+
+import fake_adb_simulator
+from rt1018_installer_gui import (DEFAULT_INSTALL_PLAN, DEFAULT_STALL_TIMEOUT, NOT_ADB, PROFILER,
+                                  SUBPROCESS_FLAGS, AdaptiveTimeouts, AdbRunner, AdbSessionRecorder,
+                                  AdbSessionReplayer, AdbTransportManager, AndroidDevice,
+                                  DeviceInventory, DeviceRegistry, InstallSlots, RebootCoordinator,
+                                  RT1018InstallerGUI, StepTimingHistory, TransferScheduler,
+                                  probe_adb_endpoints)
+
+SCENARIOS = ("scan", "push_sdcard", "push_data", "install", "backup")
+BASE_DIR = Path(__file__).parent
+NOISE_FLOOR = 0.5  # Seconds - smaller differences are never reported as regressions
+
+
+class HeadlessInstaller:
+    """The installer engine without the Tk window
+
+    Borrows the device-facing methods of RT1018InstallerGUI and provides the
+    plan host interface (see InstallPlanExecutor) with plain attributes.
+    """
+
+    run_adb_command = RT1018InstallerGUI.run_adb_command
+    ensure_device_connection = RT1018InstallerGUI.ensure_device_connection
+    inventory_key = RT1018InstallerGUI.inventory_key
+    identify_device = RT1018InstallerGUI.identify_device
+    install_to_device = RT1018InstallerGUI.install_to_device
+    backup_device = RT1018InstallerGUI.backup_device
+    open_install_journal = RT1018InstallerGUI.open_install_journal
+    push_tree_resumable = RT1018InstallerGUI.push_tree_resumable
+    list_remote_file_sizes = RT1018InstallerGUI.list_remote_file_sizes
+    get_error_message = RT1018InstallerGUI.get_error_message
+    reboot_wait = RT1018InstallerGUI.reboot_wait
+
+    def __init__(self, adb_path, source, work_dir):
+        self.adb_path = Path(adb_path)
+        self.files_dir = Path(source)
+        self.work_dir = Path(work_dir)
+        self.journal_dir = self.work_dir / "install_journals"
+        self.history = StepTimingHistory(self.work_dir / "install_history.json")
+        self.inventory = DeviceInventory(self.work_dir / "device_inventory.json")
+        self.app_package = DEFAULT_INSTALL_PLAN["variables"]["package"]
+        self.registry = DeviceRegistry()
+        self.adb = AdbRunner(lambda: str(self.adb_path) if self.adb_path.exists() else "adb")
+        self.adb.timeouts = AdaptiveTimeouts(self.inventory, key_for=self.inventory_key)
+        self.transports = AdbTransportManager(self.adb, log=self.log)
+        self.transfers = TransferScheduler()
+        self.reboots = RebootCoordinator(self.transports, self.run_adb_command)
+        self.relay = None
+        self.install_slots = None
+        self.stall_timeout = DEFAULT_STALL_TIMEOUT
+        self.fresh_install = False
+
+    def log(self, message, level="INFO"):
+        print(f"[{level}] {message}")
+
+    def get_install_plan(self):
+        return DEFAULT_INSTALL_PLAN
+
+    def get_installation_source(self):
+        return self.files_dir
+
+    def on_install_monitor(self, device):
+        pass  # No scrcpy without a window
+
+    def on_transfer_progress(self, device_addr, progress):
+        pass  # Progress bars only exist in the window
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def tree_size(path):
+    return sum(p.stat().st_size for p in Path(path).rglob("*") if p.is_file())
+
+
+def run_per_device(devices, parallel, work):
+    """Run work(device) for every device, at most `parallel` at a time
+
+    Returns (wall seconds, per-device seconds, failure count).
+    """
+    durations = []
+    failures = 0
+
+    def timed(device):
+        start = time.perf_counter()
+        work(device)
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, min(parallel, len(devices)))) as executor:
+        futures = [executor.submit(timed, device) for device in devices]
+        for future in as_completed(futures):
+            try:
+                durations.append(future.result())
+            except Exception as e:
+                failures += 1
+                print(f"[DEBUG] Benchmark task failed: {str(e)}")
+    return time.perf_counter() - start, durations, failures
+
+
+def bench_scan(app, fleet, endpoints):
+    """Same two phases as scan_network: CNXN port sweep, then adb connect + getprop"""
+    start = time.perf_counter()
+    found = []
+    with ThreadPoolExecutor(max_workers=50) as executor:
+        futures = [executor.submit(probe_adb_endpoints, ip, ports) for ip, ports in endpoints]
+        for future in as_completed(futures):
+            found.extend((ip, port) for ip, port, kind in future.result() if kind != NOT_ADB)
+    sweep = time.perf_counter() - start
+
+    identified = []
+    with ThreadPoolExecutor(max_workers=10) as executor:
+        for result in executor.map(lambda ep: app.identify_device(*ep), found):
+            if result:
+                ip, port, version, model, serial = result
+                device = app.registry.upsert(ip, port, version=version, model=model,
+                                             serial=serial)[0]
+                device.set_state(AndroidDevice.CONNECTED)
+                identified.append(device)
+    wall = time.perf_counter() - start
+    return {"wall_s": wall, "sweep_s": sweep, "failures": len(fleet) - len(identified),
+            "hosts": len(endpoints)}, identified
+
+
+def bench_push(app, devices, parallel, local_dir, remote_dir):
+    nbytes = tree_size(local_dir)
+    wall, durations, failures = run_per_device(devices, parallel, lambda d: app.run_adb_command(
+        d.addr, ["push", str(local_dir) + "/.", remote_dir + "/"], timeout=600, watch=True))
+    return {"wall_s": wall, "per_device": durations, "failures": failures,
+            "bytes": nbytes * len(devices)}
+
+
+def bench_install(app, devices, parallel):
+    app.install_slots = InstallSlots(parallel)
+
+    def install(device):
+        with app.install_slots:
+            app.install_to_device(device, log_prefix=f"[{device.ip}:{device.port}] ")
+
+    wall, durations, failures = run_per_device(devices, len(devices), install)
+    app.install_slots = None
+    return {"wall_s": wall, "per_device": durations, "failures": failures,
+            "bytes": tree_size(app.files_dir) * len(devices)}
+
+
+def bench_backup(app, devices, parallel, backup_root):
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+    def backup(device):
+        path = backup_root / f"backup_{device.ip.replace('.', '_')}_{device.port}_{timestamp}"
+        path.mkdir(parents=True, exist_ok=True)
+        app.backup_device(device, path, timestamp)
+
+    wall, durations, failures = run_per_device(devices, parallel, backup)
+    return {"wall_s": wall, "per_device": durations, "failures": failures,
+            "bytes": tree_size(backup_root)}
+
+
+def summarize(result, devices):
+    """Replace raw per-device timings with mean/p50/p95/max and add MB/s"""
+    summary = {"devices": devices}
+    durations = result.pop("per_device", None)
+    summary.update({key: round(value, 3) if isinstance(value, float) else value
+                    for key, value in result.items()})
+    if durations:
+        summary["per_device_s"] = {"mean": round(statistics.mean(durations), 3),
+                                   "p50": round(percentile(durations, 50), 3),
+                                   "p95": round(percentile(durations, 95), 3),
+                                   "max": round(max(durations), 3)}
+    if result.get("bytes") and result["wall_s"] > 0:
+        summary["mb_s"] = round(result["bytes"] / result["wall_s"] / (1024 * 1024), 2)
+    return summary
+
+
+def run_fleet(args, count, app, work_dir):
+    """Start `count` simulated devices and run the selected scenarios against them"""
+    link = fake_adb_simulator.LinkProfile(args.latency / 1000.0, args.bandwidth * 1024 * 1024,
+                                          args.loss)
+    fleet = fake_adb_simulator.start_fleet(count, work_dir / f"devices_{count}", args.subnet,
+                                           args.base_port, 5555, link, args.reboot_downtime,
+                                           boot_settle=1.0)
+    if args.subnet:
+        # Sweep the whole subnet like a real scan, not just the simulated hosts
+        endpoints = [(str(ip), (5555,)) for ip in ipaddress.ip_network(args.subnet).hosts()]
+    else:
+        endpoints = [("127.0.0.1", tuple(range(args.base_port, args.base_port + count)))]
+
+    results = {}
+    try:
+        scan, devices = bench_scan(app, fleet, endpoints)
+        if "scan" in args.scenarios:
+            results[f"scan@{count}"] = summarize(scan, count)
+        if not devices:
+            raise RuntimeError("no simulated device answered the scan")
+
+        package = app.app_package
+        if "push_sdcard" in args.scenarios:
+            results[f"push_sdcard@{count}"] = summarize(bench_push(
+                app, devices, args.parallel, app.files_dir / "sdcard",
+                f"/sdcard/Android/data/{package}/files"), count)
+        if "push_data" in args.scenarios:
+            results[f"push_data@{count}"] = summarize(bench_push(
+                app, devices, args.parallel, app.files_dir / "data" / "files",
+                f"/data/data/{package}/files"), count)
+        if "install" in args.scenarios:
+            results[f"install@{count}"] = summarize(bench_install(app, devices, args.parallel), count)
+        if "backup" in args.scenarios:
+            results[f"backup@{count}"] = summarize(
+                bench_backup(app, devices, args.parallel, work_dir / f"backups_{count}"), count)
+    finally:
+        for device in fleet:
+            subprocess.run([str(app.adb_path) if app.adb_path.exists() else "adb", "disconnect",
+                            device.addr], capture_output=True, creationflags=SUBPROCESS_FLAGS)
+            device.stop()
+        for device in list(app.registry):
+            app.registry.remove(device.addr)
+    return results
+
+
+def run_replay(args, app):
+    """Install onto the devices of a recorded session, answered from the trace"""
+    replayer = app.adb.replayer = AdbSessionReplayer(args.replay, args.time_scale)
+    devices = []
+    for addr, version, model, serial in replayer.devices():
+        ip, _, port = addr.rpartition(":")
+        device = app.registry.upsert(ip, int(port or 5555), version=version, model=model,
+                                     serial=serial)[0]
+        device.set_state(AndroidDevice.CONNECTED)
+        devices.append(device)
+    if not devices:
+        raise RuntimeError(f"no devices in {args.replay}")
+    result = summarize(bench_install(app, devices, args.parallel), len(devices))
+    result["replay_misses"] = replayer.misses
+    return {f"replay_install@{len(devices)}": result}
+
+
+def compare(results, baseline, tolerance):
+    """Print current vs. baseline wall times; returns the regressed result keys"""
+    regressions = []
+    print(f"\n{'scenario':<20}{'wall (s)':>10}{'baseline':>10}{'change':>9}  notes")
+    for key, result in results.items():
+        base = baseline.get(key)
+        notes = []
+        if result.get("failures"):
+            notes.append(f"{result['failures']} failed")
+        if "mb_s" in result:
+            notes.append(f"{result['mb_s']} MB/s")
+        if base:
+            change = (result["wall_s"] - base["wall_s"]) / base["wall_s"] if base["wall_s"] else 0.0
+            if change > tolerance and result["wall_s"] - base["wall_s"] > NOISE_FLOOR:
+                regressions.append(key)
+                notes.append("REGRESSION")
+            print(f"{key:<20}{result['wall_s']:>10.2f}{base['wall_s']:>10.2f}{change:>+8.0%}  "
+                  + ", ".join(notes))
+        else:
+            print(f"{key:<20}{result['wall_s']:>10.2f}{'-':>10}{'':>9}  " + ", ".join(notes))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the installer against simulated devices")
+    parser.add_argument("--devices", default="1,10,100", help="comma-separated fleet sizes")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS),
+                        help=f"comma-separated subset of {', '.join(SCENARIOS)}")
+    parser.add_argument("--parallel", type=int, default=10, help="devices worked on at once")
+    parser.add_argument("--source", default=str(BASE_DIR / "install_files"),
+                        help="installation source (default: install_files)")
+    parser.add_argument("--adb", default=str(BASE_DIR / "adb" / "adb.exe"), help="adb binary")
+    parser.add_argument("--subnet", default="127.0.10.0/24" if sys.platform.startswith("linux") else None,
+                        help="loopback subnet with one address per device (Linux default)")
+    parser.add_argument("--base-port", type=int, default=6000,
+                        help="first 127.0.0.1 port when no subnet is used")
+    parser.add_argument("--latency", type=float, default=0.0, help="one-way latency in ms")
+    parser.add_argument("--bandwidth", type=float, default=0.0, help="per-device MB/s (0 = unlimited)")
+    parser.add_argument("--loss", type=float, default=0.0, help="packet loss probability (0-1)")
+    parser.add_argument("--reboot-downtime", type=float, default=3.0, help="simulated reboot seconds")
+    parser.add_argument("--output", default=str(BASE_DIR / "benchmark_results.json"))
+    parser.add_argument("--baseline", default=str(BASE_DIR / "benchmark_baseline.json"))
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="allowed slowdown before a result counts as a regression (0.2 = 20%%)")
+    parser.add_argument("--verbose", action="store_true", help="show installer log and ADB debug output")
+    parser.add_argument("--record", help="write every adb call of the run to this session trace")
+    parser.add_argument("--replay", help="install from a recorded session trace instead of devices")
+    parser.add_argument("--time-scale", type=float, default=1.0,
+                        help="replay latency multiplier (1 = original timing, 0 = instant)")
+    parser.add_argument("--profile", metavar="DIR",
+                        help="write a Chrome trace and speedscope stack samples of the run to DIR")
+    args = parser.parse_args()
+    args.scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    counts = [int(n) for n in args.devices.split(",")]
+
+    work_dir = Path(tempfile.mkdtemp(prefix="rt1018-bench-"))
+    app = HeadlessInstaller(args.adb, args.source, work_dir)
+    adb_exe = str(app.adb_path) if app.adb_path.exists() else "adb"
+    if args.replay:
+        adb_version = f"replay of {Path(args.replay).name} (x{args.time_scale})"
+    else:
+        try:
+            adb_version = subprocess.run([adb_exe, "version"], capture_output=True, text=True,
+                                         creationflags=SUBPROCESS_FLAGS).stdout.splitlines()[0]
+        except (OSError, IndexError):
+            print("adb not found - install platform-tools or pass --adb")
+            return 2
+    if args.record:
+        app.adb.recorder = AdbSessionRecorder(args.record)
+    if args.profile:
+        PROFILER.start()
+
+    results = {}
+    output = sys.stdout if args.verbose else open(os.devnull, "w")
+    try:
+        if args.replay:
+            print(f"Replaying {args.replay}...", flush=True)
+            with contextlib.redirect_stdout(output):
+                results.update(run_replay(args, app))
+        for count in ([] if args.replay else counts):
+            print(f"Benchmarking {count} device(s)...", file=sys.__stdout__, flush=True)
+            with contextlib.redirect_stdout(output):
+                results.update(run_fleet(args, count, app, work_dir))
+    finally:
+        app.transports.stop()
+        if app.adb.recorder is not None:
+            app.adb.recorder.close()
+            print(f"Session trace written to {args.record}")
+        for path in PROFILER.stop(args.profile) if args.profile else []:
+            print(f"Profile written to {path}")
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "adb": adb_version,
+        "link": {"latency_ms": args.latency, "bandwidth_mb_s": args.bandwidth, "loss": args.loss,
+                 "reboot_downtime_s": args.reboot_downtime},
+        "source_bytes": tree_size(args.source),
+        "results": results,
+    }
+    Path(args.output).write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"\nResults written to {args.output}")
+
+    baseline_path = Path(args.baseline)
+    baseline = {}
+    if baseline_path.exists():
+        baseline = json.loads(baseline_path.read_text(encoding="utf-8")).get("results", {})
+    regressions = compare(results, baseline, args.tolerance)
+
+    if args.save_baseline:
+        baseline_path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"Baseline saved to {baseline_path}")
+    if regressions:
+        print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,516 @@
+"""
+Fake ADB Device Simulator - RT1018 Installer
+Runs virtual RT1018 kiosks that speak the adbd wire protocol so scans, installs and
+backups can be load-tested without hardware
+
+Each virtual device listens on its own loopback address (127.0.x.y:5555 on Linux) or
+port, answers the CNXN handshake, and serves the `shell:`, `sync:` (push/pull/stat/list),
+`reboot:`, `root:` and `remount:` services. Device storage lives in a sandbox directory;
+Android commands (getprop, settings, pm, am, ime, ...) are emulated by a shell prelude.
+Use the real `adb` binary against it: `adb connect 127.0.10.1:5555`.
+
+Usage:
+    python fake_adb_simulator.py --count 100 --subnet 127.0.10.0/24
+    python fake_adb_simulator.py --count 20 --base-port 6000 --latency 30 --bandwidth 2 --loss 0.01
+"""
+
+import argparse
+import ipaddress
+import os
+import queue
+import random
+import re
+import shutil
+import socket
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+A_SYNC = 0x434E5953
+A_CNXN = 0x4E584E43
+A_OPEN = 0x4E45504F
+A_OKAY = 0x59414B4F
+A_CLSE = 0x45534C43
+A_WRTE = 0x45545257
+A_VERSION = 0x01000001
+MAX_PAYLOAD = 256 * 1024
+SYNC_DATA_MAX = 64 * 1024
+RETRANSMIT_DELAY = 0.2  # Seconds a "lost" packet costs (TCP retransmission timeout)
+
+# Emulates the Android commands the installer uses; $SIM_ROOT is the device sandbox
+SHELL_PRELUDE = r'''
+getprop() {
+    if [ -z "$1" ]; then
+        for f in "$SIM_ROOT"/.props/*; do echo "[$(basename "$f")]: [$(cat "$f")]"; done
+    else
+        printf '%s\n' "$(cat "$SIM_ROOT/.props/$1" 2>/dev/null)"
+    fi
+}
+setprop() { printf '%s' "$2" > "$SIM_ROOT/.props/$1"; }
+settings() {
+    case "$1" in
+        get) v=$(cat "$SIM_ROOT/.settings/$2.$3" 2>/dev/null); printf '%s\n' "${v:-null}" ;;
+        put) printf '%s' "$4" > "$SIM_ROOT/.settings/$2.$3" ;;
+    esac
+}
+pm() {
+    case "$1" in
+        install) echo "Success" ;;
+        grant|disable|enable) : ;;
+        path) echo "package:/data/app/$2/base.apk" ;;
+        list) for d in "$SIM_ROOT"/data/data/*; do [ -d "$d" ] && echo "package:$(basename "$d")"; done ;;
+    esac
+}
+monkey() {
+    while [ $# -gt 0 ]; do
+        if [ "$1" = "-p" ]; then mkdir -p "$SIM_ROOT/data/data/$2"; fi
+        shift
+    done
+    echo "Events injected: 1"
+}
+am() {
+    case "$1" in
+        start) echo "Starting: Intent { }" ;;
+        *) : ;;
+    esac
+}
+ime() { echo "Input method $2: $1"; }
+cmd() { : ; }
+chown() { : ; }
+restorecon() { : ; }
+stat() {
+    if [ "$1" = "-c" ] && [ "$2" = "%U" ]; then echo "u0_a55"; else command stat "$@"; fi
+}
+'''
+
+
+class LinkProfile:
+    """Simulated Wi-Fi link: one-way latency, bandwidth cap and packet loss"""
+
+    def __init__(self, latency=0.0, bandwidth=0.0, loss=0.0):
+        self.latency = latency      # seconds
+        self.bandwidth = bandwidth  # bytes/s, 0 = unlimited
+        self.loss = loss            # probability that a packet needs a retransmission
+
+    def delay(self, nbytes):
+        seconds = self.latency
+        if self.bandwidth:
+            seconds += nbytes / self.bandwidth
+        if self.loss and random.random() < self.loss:
+            seconds += RETRANSMIT_DELAY
+        return seconds
+
+
+class _Stream:
+    """One ADB stream (OPEN'd service) multiplexed on a connection"""
+
+    def __init__(self, connection, local_id, remote_id):
+        self.connection = connection
+        self.local_id = local_id
+        self.remote_id = remote_id
+        self.incoming = queue.Queue()
+        self.credit = threading.Event()  # Set when the host OKAYed our last WRTE
+        self.credit.set()
+        self.closed = False
+        self._buffer = b""
+
+    def write(self, data):
+        max_payload = self.connection.max_payload
+        for i in range(0, len(data), max_payload):
+            if not self.credit.wait(30) or self.closed:
+                return
+            self.credit.clear()
+            self.connection.send(A_WRTE, self.local_id, self.remote_id, data[i:i + max_payload])
+
+    def read(self):
+        """Next chunk written by the host, or None once the stream is closed"""
+        if self._buffer:
+            data, self._buffer = self._buffer, b""
+            return data
+        return self.incoming.get()
+
+    def read_exact(self, size):
+        data = b""
+        while len(data) < size:
+            chunk = self.read()
+            if chunk is None:
+                raise EOFError("stream closed")
+            data += chunk
+        data, self._buffer = data[:size], data[size:] + self._buffer
+        return data
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.credit.set()
+            self.connection.send(A_CLSE, self.local_id, self.remote_id)
+
+
+class _Connection:
+    """One host (adb server) connection to a virtual device"""
+
+    def __init__(self, device, sock):
+        self.device = device
+        self.sock = sock
+        self.max_payload = MAX_PAYLOAD
+        self.streams = {}
+        self._next_id = 1
+        self._send_lock = threading.Lock()
+
+    def send(self, command, arg0, arg1, payload=b""):
+        header = struct.pack("<6I", command, arg0, arg1, len(payload), sum(payload) & 0xFFFFFFFF,
+                             command ^ 0xFFFFFFFF)
+        with self._send_lock:
+            time.sleep(self.device.link.delay(len(header) + len(payload)))
+            try:
+                self.sock.sendall(header + payload)
+            except OSError:
+                pass
+
+    def _recv_exact(self, size):
+        data = b""
+        while len(data) < size:
+            chunk = self.sock.recv(size - len(data))
+            if not chunk:
+                raise EOFError("connection closed")
+            data += chunk
+        return data
+
+    def serve(self):
+        try:
+            while True:
+                command, arg0, arg1, length, _, magic = struct.unpack("<6I", self._recv_exact(24))
+                payload = self._recv_exact(length) if length else b""
+                if magic != command ^ 0xFFFFFFFF:
+                    break
+                self._dispatch(command, arg0, arg1, payload)
+        except (EOFError, OSError):
+            pass
+        finally:
+            for stream in list(self.streams.values()):
+                stream.closed = True
+                stream.credit.set()
+                stream.incoming.put(None)
+            self.device.connections.discard(self)
+            try:
+                self.sock.close()
+            except OSError:
+                pass
+
+    def _dispatch(self, command, arg0, arg1, payload):
+        if command == A_CNXN:
+            self.max_payload = min(MAX_PAYLOAD, arg1 or MAX_PAYLOAD)
+            self.send(A_CNXN, A_VERSION, MAX_PAYLOAD, self.device.banner())
+        elif command == A_OPEN:
+            local_id = self._next_id
+            self._next_id += 1
+            stream = self.streams[local_id] = _Stream(self, local_id, arg0)
+            self.send(A_OKAY, local_id, arg0)
+            service = payload.rstrip(b"\0").decode("utf-8", errors="replace")
+            threading.Thread(target=self.device.run_service, args=(stream, service),
+                             daemon=True).start()
+        elif command == A_WRTE:
+            stream = self.streams.get(arg1)
+            if stream is not None:
+                # Acknowledge only after the payload "crossed" the link - this throttles pushes
+                time.sleep(self.device.link.delay(len(payload)))
+                stream.incoming.put(payload)
+                self.send(A_OKAY, arg1, arg0)
+        elif command == A_OKAY:
+            stream = self.streams.get(arg1)
+            if stream is not None:
+                stream.remote_id = arg0
+                stream.credit.set()
+        elif command == A_CLSE:
+            stream = self.streams.pop(arg1, None)
+            if stream is not None:
+                stream.incoming.put(None)
+                if not stream.closed:
+                    stream.closed = True
+                    stream.credit.set()
+                    self.send(A_CLSE, stream.local_id, stream.remote_id)
+
+
+class VirtualDevice:
+    """A simulated RT1018 kiosk reachable over TCP like `adb tcpip` devices"""
+
+    def __init__(self, serial, host, port, root, link=None, reboot_downtime=20.0, boot_settle=2.0,
+                 model="RT1018", android_version="9"):
+        self.serial = serial
+        self.host = host
+        self.port = port
+        self.root = Path(root)
+        self.link = link or LinkProfile()
+        self.reboot_downtime = reboot_downtime
+        self.boot_settle = boot_settle
+        self.connections = set()
+        self.reboots = 0
+        self._listener = None
+        self._lock = threading.Lock()
+
+        for sub in (".props", ".settings", "sdcard", "data/local/tmp", "data/data"):
+            (self.root / sub).mkdir(parents=True, exist_ok=True)
+        defaults = {"ro.serialno": serial, "ro.product.model": model,
+                    "ro.build.version.release": android_version, "sys.boot_completed": "1"}
+        for name, value in defaults.items():
+            if not (self.root / ".props" / name).exists():
+                self.set_prop(name, value)
+
+    @property
+    def addr(self):
+        return f"{self.host}:{self.port}"
+
+    def set_prop(self, name, value):
+        (self.root / ".props" / name).write_text(value)
+
+    def banner(self):
+        model = (self.root / ".props" / "ro.product.model").read_text()
+        return (f"device::ro.product.name=rt1018;ro.product.model={model};"
+                f"ro.product.device=rt1018;features=fixed_push_mkdir").encode()
+
+    # Lifecycle --------------------------------------------------------
+
+    def start(self):
+        listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        listener.bind((self.host, self.port))
+        listener.listen(16)
+        self._listener = listener
+        threading.Thread(target=self._accept_loop, args=(listener,), daemon=True).start()
+
+    def _accept_loop(self, listener):
+        while True:
+            try:
+                sock, _ = listener.accept()
+            except OSError:
+                return
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            connection = _Connection(self, sock)
+            self.connections.add(connection)
+            threading.Thread(target=connection.serve, daemon=True).start()
+
+    def stop(self):
+        if self._listener is not None:
+            try:
+                self._listener.shutdown(socket.SHUT_RDWR)  # Wakes the blocked accept()
+            except OSError:
+                pass
+            self._listener.close()
+            self._listener = None
+        for connection in list(self.connections):
+            try:
+                connection.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def reboot(self):
+        """Go offline for reboot_downtime seconds, then come back and finish booting"""
+        with self._lock:
+            self.reboots += 1
+            self.set_prop("sys.boot_completed", "0")
+            self.stop()
+
+        def come_back():
+            time.sleep(self.reboot_downtime)
+            self.start()
+            time.sleep(self.boot_settle)
+            self.set_prop("sys.boot_completed", "1")
+
+        threading.Thread(target=come_back, daemon=True).start()
+
+    # Services ---------------------------------------------------------
+
+    def local_path(self, device_path):
+        device_path = re.sub(r"^/storage/emulated/0(?=/|$)", "/sdcard", device_path)
+        return self.root / device_path.lstrip("/")
+
+    def _map_command(self, command):
+        """Rewrite device paths in a shell command to the sandbox"""
+        command = re.sub(r"(?<![\w.])/storage/emulated/0(?=/|\b)", "/sdcard", command)
+        return re.sub(r"(?<![\w.])/(?=(sdcard|data)(/|\b))", str(self.root) + "/", command)
+
+    def run_service(self, stream, service):
+        try:
+            if service.startswith(("shell:", "exec:")):
+                self._service_shell(stream, service.split(":", 1)[1])
+            elif service.startswith("sync:"):
+                self._service_sync(stream)
+            elif service.startswith("reboot:"):
+                stream.close()
+                self.reboot()
+            elif service.startswith("root:"):
+                stream.write(b"adbd is already running as root\n")
+            elif service.startswith("remount:"):
+                stream.write(b"remount succeeded\n")
+        except (EOFError, OSError) as e:
+            print(f"[DEBUG] {self.serial}: {service.split(':')[0]} ended: {e}")
+        finally:
+            stream.close()
+
+    def _service_shell(self, stream, command):
+        if not command.strip():
+            return  # Interactive shells are not simulated
+        script = SHELL_PRELUDE + self._map_command(command)
+        result = subprocess.run(["sh", "-c", script], capture_output=True,
+                                env={"SIM_ROOT": str(self.root), "PATH": "/usr/bin:/bin"})
+        output = (result.stdout + result.stderr).replace(str(self.root).encode(), b"")
+        stream.write(output)
+
+    def _service_sync(self, stream):
+        while True:
+            request, length = struct.unpack("<4sI", stream.read_exact(8))
+            if request == b"QUIT":
+                return
+            path = stream.read_exact(length).decode("utf-8", errors="replace")
+            if request == b"STAT":
+                self._sync_stat(stream, path)
+            elif request == b"LIST":
+                self._sync_list(stream, path)
+            elif request == b"SEND":
+                self._sync_send(stream, path)
+            elif request == b"RECV":
+                self._sync_recv(stream, path)
+            else:
+                self._sync_fail(stream, f"unknown sync request {request!r}")
+                return
+
+    @staticmethod
+    def _sync_fail(stream, message):
+        data = message.encode()
+        stream.write(b"FAIL" + struct.pack("<I", len(data)) + data)
+
+    def _sync_stat(self, stream, path):
+        local = self.local_path(path)
+        if local.exists():
+            st = local.stat()
+            stream.write(b"STAT" + struct.pack("<III", st.st_mode & 0xFFFFFFFF, st.st_size & 0xFFFFFFFF,
+                                               int(st.st_mtime)))
+        else:
+            stream.write(b"STAT" + struct.pack("<III", 0, 0, 0))
+
+    def _sync_list(self, stream, path):
+        local = self.local_path(path)
+        entries = []
+        if local.is_dir():
+            for child in local.iterdir():
+                st = child.stat()
+                name = child.name.encode()
+                entries.append(b"DENT" + struct.pack("<IIII", st.st_mode & 0xFFFFFFFF,
+                                                     st.st_size & 0xFFFFFFFF,
+                                                     int(st.st_mtime), len(name)) + name)
+        stream.write(b"".join(entries) + b"DONE" + struct.pack("<IIII", 0, 0, 0, 0))
+
+    def _sync_send(self, stream, spec):
+        path, _, _ = spec.rpartition(",")
+        local = self.local_path(path)
+        try:
+            local.parent.mkdir(parents=True, exist_ok=True)
+            out = open(local, "wb")
+        except OSError as e:
+            out = None
+            error = str(e)
+        mtime = None
+        while mtime is None:
+            chunk_id, length = struct.unpack("<4sI", stream.read_exact(8))
+            if chunk_id == b"DATA":
+                data = stream.read_exact(length)
+                if out is not None:
+                    out.write(data)
+            elif chunk_id == b"DONE":
+                mtime = length
+            else:
+                raise EOFError(f"unexpected sync chunk {chunk_id!r}")
+        if out is None:
+            self._sync_fail(stream, error)
+            return
+        out.close()
+        try:
+            os.utime(local, (mtime, mtime))
+        except OSError:
+            pass
+        stream.write(b"OKAY" + struct.pack("<I", 0))
+
+    def _sync_recv(self, stream, path):
+        local = self.local_path(path)
+        if not local.is_file():
+            self._sync_fail(stream, f"remote object '{path}' does not exist")
+            return
+        with open(local, "rb") as f:
+            for chunk in iter(lambda: f.read(SYNC_DATA_MAX), b""):
+                stream.write(b"DATA" + struct.pack("<I", len(chunk)) + chunk)
+        stream.write(b"DONE" + struct.pack("<I", 0))
+
+
+def start_fleet(count, root, subnet=None, base_port=None, port=5555, link=None,
+                reboot_downtime=20.0, boot_settle=2.0):
+    """Start `count` virtual devices; returns them (already listening)
+
+    With `subnet` (e.g. 127.0.10.0/24, Linux loopback) every device gets its
+    own address on `port`; otherwise they share 127.0.0.1 on consecutive ports
+    from `base_port`.
+    """
+    root = Path(root)
+    devices = []
+    if subnet:
+        hosts = list(ipaddress.ip_network(subnet, strict=False).hosts())
+        if count > len(hosts):
+            raise ValueError(f"{subnet} has only {len(hosts)} addresses")
+        endpoints = [(str(host), port) for host in hosts[:count]]
+    else:
+        endpoints = [("127.0.0.1", (base_port or 6000) + i) for i in range(count)]
+    for index, (host, device_port) in enumerate(endpoints):
+        serial = f"SIM{index + 1:04d}"
+        device = VirtualDevice(serial, host, device_port, root / serial, link, reboot_downtime,
+                               boot_settle)
+        device.start()
+        devices.append(device)
+    return devices
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate RT1018 kiosks speaking the adbd protocol")
+    parser.add_argument("--count", type=int, default=10, help="number of virtual devices")
+    parser.add_argument("--subnet", help="one loopback address per device, e.g. 127.0.10.0/24 (Linux)")
+    parser.add_argument("--port", type=int, default=5555, help="device port when --subnet is used")
+    parser.add_argument("--base-port", type=int, default=6000, help="first port on 127.0.0.1 otherwise")
+    parser.add_argument("--root", help="sandbox directory for device storage (default: temp dir)")
+    parser.add_argument("--latency", type=float, default=0.0, help="one-way latency in ms")
+    parser.add_argument("--bandwidth", type=float, default=0.0, help="per-device MB/s (0 = unlimited)")
+    parser.add_argument("--loss", type=float, default=0.0, help="packet loss probability (0-1)")
+    parser.add_argument("--reboot-downtime", type=float, default=20.0, help="seconds offline per reboot")
+    parser.add_argument("--connect", action="store_true", help="run `adb connect` for every device")
+    args = parser.parse_args()
+
+    root = Path(args.root) if args.root else Path(tempfile.mkdtemp(prefix="rt1018-sim-"))
+    link = LinkProfile(args.latency / 1000.0, args.bandwidth * 1024 * 1024, args.loss)
+    devices = start_fleet(args.count, root, args.subnet, args.base_port, args.port, link,
+                          args.reboot_downtime)
+
+    print(f"{len(devices)} virtual devices running (storage: {root})")
+    if args.subnet:
+        print(f"Scan target: {args.subnet}  ports: {args.port}")
+    else:
+        print(f"Ports {devices[0].port}-{devices[-1].port} on 127.0.0.1")
+    if args.connect:
+        for device in devices:
+            subprocess.run(["adb", "connect", device.addr], capture_output=True)
+        print("adb connect done")
+
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print("\nStopping...")
+        for device in devices:
+            device.stop()
+        if not args.root:
+            shutil.rmtree(root, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,17 +3,30 @@ RT1018 Android Device Installer - GUI Application
 Replaces the batch file installer with a full-featured GUI
 """
 
+import argparse
+import collections
+import contextlib
+import hashlib
+import importlib.util
+import ipaddress
 import json
+import mmap
 import os
+import random
+import re
+import secrets
 import shutil
 import socket
-import sqlite3
+import struct
 import subprocess
 import sys
 import threading
 import time
 import tkinter as tk
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import urllib.parse
+import zlib
+from concurrent.futures import (FIRST_COMPLETED, BrokenExecutor, Future, ThreadPoolExecutor,
+                                as_completed, wait)
 from datetime import datetime
 from pathlib import Path
 from tkinter import ttk, scrolledtext, messagebox, filedialog
@@ -28,29 +41,3542 @@ except ImportError:
     print("WARNING: pywin32 not installed. Scrcpy embedding will not work.")
     print("Install with: pip install pywin32")
 
+# Optional: psutil gives interface netmasks without parsing ipconfig/ifconfig output
+try:
+    import psutil
+    HAS_PSUTIL = True
+except ImportError:
+    HAS_PSUTIL = False
+
+# Optional: PyYAML for install plan profiles written in YAML (JSON always works);
+# imported only when a YAML profile is loaded
+HAS_YAML = importlib.util.find_spec("yaml") is not None
+
 # Hide console windows on Windows for subprocess calls
 SUBPROCESS_FLAGS = subprocess.CREATE_NO_WINDOW if sys.platform == "win32" else 0
 
 
+class SpanProfiler:
+    """Opt-in instrumentation: span timers plus a sampling profiler across all threads
+
+    Spans (adb calls, plan steps, transfers, Tk callbacks) are written as a
+    Chrome trace (chrome://tracing, Perfetto, speedscope). The sampler takes
+    every thread's stack at a fixed interval and writes a speedscope profile
+    with one timeline per thread. While disabled a span costs one attribute check.
+    """
+
+    SAMPLE_INTERVAL = 0.01  # Seconds between stack samples
+
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._origin = 0.0
+        self._started = None
+        self._events = []
+        self._thread_names = {}
+        self._stop = threading.Event()
+        self._sampler = None
+        self._frames = {}   # (function, file, line) -> frame index
+        self._samples = {}  # thread id -> [name, stacks, weights]
+
+    def start(self, sample=True):
+        with self._lock:
+            if self.enabled:
+                return
+            self._origin = time.perf_counter()
+            self._started = datetime.now()
+            self._events, self._thread_names = [], {}
+            self._frames, self._samples = {}, {}
+            self.enabled = True
+        if sample:
+            self._stop.clear()
+            self._sampler = threading.Thread(target=self._sample_loop, name="profiler-sampler",
+                                             daemon=True)
+            self._sampler.start()
+
+    def stop(self, directory):
+        """Stop collecting and write the trace files, returns their paths"""
+        if not self.enabled:
+            return []
+        self.enabled = False
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join(timeout=2)
+            self._sampler = None
+
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        stamp = self._started.strftime("%Y%m%d_%H%M%S")
+        pid = os.getpid()
+        with self._lock:
+            metadata = [{"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+                        for tid, name in self._thread_names.items()]
+            trace = {"traceEvents": metadata + self._events, "displayTimeUnit": "ms"}
+            frames = [{"name": name, "file": file, "line": line}
+                      for (name, file, line), _ in sorted(self._frames.items(), key=lambda item: item[1])]
+            profiles = [{"type": "sampled", "name": name, "unit": "seconds", "startValue": 0,
+                         "endValue": sum(weights), "samples": stacks, "weights": weights}
+                        for name, stacks, weights in self._samples.values() if stacks]
+
+        paths = [directory / f"trace_{stamp}.json"]
+        with open(paths[0], "w", encoding="utf-8") as f:
+            json.dump(trace, f)
+        if profiles:
+            paths.append(directory / f"samples_{stamp}.speedscope.json")
+            with open(paths[1], "w", encoding="utf-8") as f:
+                json.dump({"$schema": "https://www.speedscope.app/file-format-schema.json",
+                           "shared": {"frames": frames}, "profiles": profiles,
+                           "name": f"RT1018 Installer {stamp}", "exporter": "rt1018_installer_gui"}, f)
+        return paths
+
+    def span(self, name, category="app", **args):
+        """Context manager timing a block on the current thread"""
+        if not self.enabled:
+            return contextlib.nullcontext()
+        return self._span(name, category, args)
+
+    @contextlib.contextmanager
+    def _span(self, name, category, args):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            thread = threading.current_thread()
+            event = {"name": name, "cat": category, "ph": "X", "pid": os.getpid(), "tid": thread.ident,
+                     "ts": round((start - self._origin) * 1e6, 1),
+                     "dur": round((end - start) * 1e6, 1), "args": args}
+            with self._lock:
+                if self.enabled:
+                    self._events.append(event)
+                    self._thread_names[thread.ident] = thread.name
+
+    def wrap(self, func, name=None, category="tk"):
+        """Return func timed as a span (unchanged while disabled)"""
+        if not self.enabled or func is None:
+            return func
+        name = name or getattr(func, "__qualname__", repr(func))
+
+        def timed(*args, **kwargs):
+            with self.span(name, category):
+                return func(*args, **kwargs)
+        return timed
+
+    def _sample_loop(self):
+        own = threading.get_ident()
+        last = time.perf_counter()
+        while not self._stop.wait(self.SAMPLE_INTERVAL):
+            now = time.perf_counter()
+            weight, last = now - last, now
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            with self._lock:
+                for ident, frame in sys._current_frames().items():
+                    if ident == own:
+                        continue
+                    stack = []
+                    while frame is not None:
+                        code = frame.f_code
+                        key = (code.co_name, code.co_filename, code.co_firstlineno)
+                        index = self._frames.get(key)
+                        if index is None:
+                            index = self._frames[key] = len(self._frames)
+                        stack.append(index)
+                        frame = frame.f_back
+                    stack.reverse()
+                    entry = self._samples.setdefault(ident, [names.get(ident, str(ident)), [], []])
+                    # Idle threads repeat the same stack - extend the last sample instead
+                    if entry[1] and entry[1][-1] == stack:
+                        entry[2][-1] += weight
+                    else:
+                        entry[1].append(stack)
+                        entry[2].append(weight)
+
+
+# Process-wide so module-level engine classes can add spans without extra plumbing
+PROFILER = SpanProfiler()
+
+
 class AndroidDevice:
     """Represents an Android device detected on the network"""
+
+    # Device lifecycle: discovered → connected → rooted → installing → rebooting → done/failed
+    DISCOVERED = "Discovered"
+    CONNECTED = "Connected"
+    ROOTED = "Rooted"
+    INSTALLING = "Installing"
+    REBOOTING = "Rebooting"
+    DONE = "Done"
+    FAILED = "Failed"
+
+    # Allowed state transitions (any state may also fall back to DISCOVERED on disconnect)
+    TRANSITIONS = {
+        DISCOVERED: (CONNECTED, FAILED),
+        CONNECTED: (ROOTED, INSTALLING, FAILED),
+        ROOTED: (CONNECTED, INSTALLING, DONE, FAILED),  # A resumed install may only redo root
+        INSTALLING: (ROOTED, REBOOTING, DONE, FAILED),
+        REBOOTING: (CONNECTED, INSTALLING, DONE, FAILED),
+        DONE: (CONNECTED, ROOTED, INSTALLING, FAILED),
+        FAILED: (CONNECTED, ROOTED, INSTALLING),
+    }
+
+    # Fields whose changes are reported to the registry listeners
+    TRACKED_FIELDS = ("serial", "version", "model", "state", "selected", "error")
+
+    __slots__ = ("ip", "port", "serial", "version", "model", "state", "selected",
+                 "error", "revision", "_observer")
+
     def __init__(self, ip, port=5555):
         self.ip = ip
         self.port = port
+        self.serial = None
         self.version = None
         self.model = None
-        self.status = "Disconnected"
+        self.state = self.DISCOVERED
         self.selected = False
+        self.error = None
+        self.revision = 0
+        self._observer = None  # Set by DeviceRegistry
+
+    @property
+    def addr(self):
+        """ADB transport address (ip:port)"""
+        return f"{self.ip}:{self.port}"
+
+    @property
+    def status(self):
+        """Display status (kept for backward compatibility with older code)"""
+        return self.state
+
+    def update(self, **fields):
+        """Set tracked fields and notify the observer once if anything changed"""
+        changed = set()
+        for name, value in fields.items():
+            if name not in self.TRACKED_FIELDS:
+                raise AttributeError(f"Untracked device field: {name}")
+            if getattr(self, name) != value:
+                setattr(self, name, value)
+                changed.add(name)
+
+        if changed:
+            self.revision += 1
+            if self._observer:
+                self._observer(self, frozenset(changed))
+        return changed
+
+    def can_transition(self, new_state):
+        """Check if the state machine allows moving to new_state"""
+        if new_state == self.state or new_state == self.DISCOVERED:
+            return True
+        return new_state in self.TRANSITIONS.get(self.state, ())
+
+    def set_state(self, new_state, error=None):
+        """Move to a new lifecycle state, raising ValueError on an invalid transition"""
+        if not self.can_transition(new_state):
+            raise ValueError(f"{self.addr}: invalid state transition {self.state} -> {new_state}")
+        return self.update(state=new_state, error=error)
 
     def __str__(self):
         return f"{self.ip}:{self.port} - Android {self.version or 'Unknown'} ({self.model or 'Unknown'})"
 
 
+class DeviceRegistry:
+    """Thread-safe device collection indexed by ADB address and serial number"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._by_addr = {}    # "ip:port" -> AndroidDevice (insertion ordered)
+        self._by_serial = {}  # ro.serialno -> AndroidDevice
+        self._listeners = []
+
+    def add_listener(self, callback):
+        """Register callback(device, changed_fields); called from the thread making the change"""
+        self._listeners.append(callback)
+
+    def _notify(self, device, changed):
+        if "serial" in changed and device.serial:
+            with self._lock:
+                self._by_serial[device.serial] = device
+        for callback in list(self._listeners):
+            try:
+                callback(device, changed)
+            except Exception as e:
+                print(f"[DEBUG] Device listener error: {str(e)}")
+
+    def upsert(self, ip, port, **fields):
+        """Add a device or update an existing one, returns (device, created)
+
+        A device already known under another address with the same serial
+        (e.g. reachable on both 5555 and 1206) is returned instead of a duplicate.
+        """
+        addr = f"{ip}:{port}"
+        serial = fields.get("serial")
+        with self._lock:
+            device = self._by_addr.get(addr)
+            if device is None and serial:
+                device = self._by_serial.get(serial)
+            created = device is None
+            if created:
+                device = AndroidDevice(ip, port)
+                device.update(**fields)  # No observer yet, so no change events
+                device._observer = self._notify
+                self._by_addr[addr] = device
+                if serial:
+                    self._by_serial[serial] = device
+
+        if created:
+            self._notify(device, frozenset(("added",)))
+        else:
+            device.update(**fields)
+        return device, created
+
+    def remove(self, addr):
+        """Remove a device by address"""
+        with self._lock:
+            device = self._by_addr.pop(addr, None)
+            if device is None:
+                return None
+            if device.serial and self._by_serial.get(device.serial) is device:
+                del self._by_serial[device.serial]
+            device._observer = None
+        self._notify(device, frozenset(("removed",)))
+        return device
+
+    def get(self, addr):
+        with self._lock:
+            return self._by_addr.get(addr)
+
+    def find_by_serial(self, serial):
+        with self._lock:
+            return self._by_serial.get(serial)
+
+    def selected(self):
+        """Devices currently checked in the UI"""
+        return [device for device in self if device.selected]
+
+    def __iter__(self):
+        with self._lock:
+            return iter(list(self._by_addr.values()))
+
+    def __len__(self):
+        with self._lock:
+            return len(self._by_addr)
+
+
+DEFAULT_ADB_PORTS = (5555, 1206)
+MAX_SCAN_HOSTS = 4096  # Larger networks are narrowed around the local address
+
+
+class ScanTarget:
+    """A network (CIDR) and the set of TCP ports to probe on it"""
+
+    __slots__ = ("network", "ports")
+
+    def __init__(self, network, ports=DEFAULT_ADB_PORTS):
+        self.network = ipaddress.ip_network(network, strict=False)
+        self.ports = tuple(sorted(set(ports)))
+
+    def hosts(self):
+        if self.network.num_addresses == 1:
+            return [str(self.network.network_address)]
+        return [str(ip) for ip in self.network.hosts()]
+
+    def __contains__(self, ip):
+        return ipaddress.ip_address(ip) in self.network
+
+    def __eq__(self, other):
+        return isinstance(other, ScanTarget) and (self.network, self.ports) == (other.network, other.ports)
+
+    def __hash__(self):
+        return hash((self.network, self.ports))
+
+    def __str__(self):
+        if self.ports == tuple(sorted(DEFAULT_ADB_PORTS)):
+            return str(self.network)
+        return f"{self.network}@{'+'.join(str(p) for p in self.ports)}"
+
+
+def parse_ports(text):
+    """Parse a port list such as "5555,1206" or "5555+1206" """
+    ports = []
+    for item in re.split(r"[,+\s]+", text.strip()):
+        if item:
+            port = int(item)
+            if not 0 < port < 65536:
+                raise ValueError(f"잘못된 포트: {item}")
+            ports.append(port)
+    if not ports:
+        raise ValueError("포트가 지정되지 않음")
+    return ports
+
+
+def parse_scan_targets(text, default_ports=DEFAULT_ADB_PORTS):
+    """Parse scan targets like "192.168.1.0/24, 10.0.5.0/23@5555+1206"
+
+    The legacy three-octet form ("192.168.1") is accepted as a /24.
+    """
+    targets = []
+    for token in re.split(r"[,;\s]+", text.strip()):
+        if not token:
+            continue
+        network, _, port_text = token.partition("@")
+        ports = parse_ports(port_text) if port_text else default_ports
+        if network.count(".") == 2 and "/" not in network:
+            network += ".0/24"
+        try:
+            target = ScanTarget(network, ports)
+        except ValueError:
+            raise ValueError(f"잘못된 스캔 대상: {token}")
+        if target.network.version != 4:
+            raise ValueError(f"IPv4만 지원: {token}")
+        if target not in targets:
+            targets.append(target)
+    if not targets:
+        raise ValueError("스캔 대상이 비어 있음")
+    return targets
+
+
+def _interfaces_from_command_output(output):
+    """Pair IPv4 addresses with netmasks from `ip addr`, `ifconfig` or `ipconfig` output"""
+    interfaces = []
+    # Linux "ip -o -4 addr": inet 192.168.1.5/24
+    for ip, prefix in re.findall(r"inet[ \t]+(\d+\.\d+\.\d+\.\d+)/(\d+)", output):
+        interfaces.append(ipaddress.ip_interface(f"{ip}/{prefix}"))
+    # ifconfig - macOS/BSD: inet 192.168.1.5 netmask 0xffffff00
+    #            Linux net-tools: inet 192.168.1.5  netmask 255.255.255.0
+    #            older net-tools: inet addr:192.168.1.5  Bcast:...  Mask:255.255.255.0
+    for ip, mask in re.findall(r"inet[ \t]+(?:addr:)?(\d+\.\d+\.\d+\.\d+)[ \t]+"
+                               r"(?:netmask[ \t]+|(?:\S+[ \t]+)*?Mask:)"
+                               r"(0x[0-9a-fA-F]+|\d+\.\d+\.\d+\.\d+)", output):
+        if mask.lower().startswith("0x"):
+            mask = bin(int(mask, 16)).count("1")
+        interfaces.append(ipaddress.ip_interface(f"{ip}/{mask}"))
+    # Windows ipconfig (any locale): "IPv4 ..." line followed by a subnet mask line
+    pending_ip = None
+    for line in output.splitlines():
+        match = re.search(r":\s*(\d+\.\d+\.\d+\.\d+)", line)
+        if not match:
+            continue
+        value = match.group(1)
+        if "IPv4" in line:
+            pending_ip = value
+        elif pending_ip and value.startswith("255."):
+            interfaces.append(ipaddress.ip_interface(f"{pending_ip}/{value}"))
+            pending_ip = None
+    return interfaces
+
+
+def enumerate_ipv4_interfaces():
+    """List local IPv4 interfaces (address + real netmask), excluding loopback/link-local"""
+    interfaces = []
+    if HAS_PSUTIL:
+        for addrs in psutil.net_if_addrs().values():
+            for addr in addrs:
+                if addr.family == socket.AF_INET and addr.netmask:
+                    interfaces.append(ipaddress.ip_interface(f"{addr.address}/{addr.netmask}"))
+    else:
+        if sys.platform == "win32":
+            commands = [["ipconfig"]]
+        elif sys.platform == "darwin":
+            commands = [["ifconfig"]]
+        else:
+            commands = [["ip", "-o", "-4", "addr", "show"], ["ifconfig"]]
+        for cmd in commands:
+            try:
+                result = subprocess.run(cmd, capture_output=True, text=True, timeout=5,
+                                        creationflags=SUBPROCESS_FLAGS)
+            except Exception as e:
+                print(f"[DEBUG] {cmd[0]} failed: {str(e)}")
+                continue
+            interfaces = _interfaces_from_command_output(result.stdout)
+            if interfaces:
+                break
+
+    unique = []
+    for interface in interfaces:
+        if interface.ip.is_loopback or interface.ip.is_link_local or interface in unique:
+            continue
+        unique.append(interface)
+    return unique
+
+
+def scan_target_for_interface(interface, ports=DEFAULT_ADB_PORTS):
+    """Scan target covering an interface's network, narrowed to MAX_SCAN_HOSTS addresses"""
+    network = interface.network
+    while network.num_addresses > MAX_SCAN_HOSTS:
+        network = ipaddress.ip_network(f"{interface.ip}/{network.prefixlen + 1}", strict=False)
+    return ScanTarget(network, ports)
+
+
+# ADB wire protocol (system/core/adb/protocol.txt): 24-byte little-endian header
+ADB_CNXN = 0x4E584E43
+ADB_AUTH = 0x48545541
+ADB_STLS = 0x534C5453
+ADB_VERSION = 0x01000001
+ADB_MAX_PAYLOAD = 256 * 1024
+
+ADB_ENDPOINT = "adb"             # adbd answered CNXN/STLS
+ADB_UNAUTHORIZED = "unauthorized"  # adbd answered with an AUTH challenge
+NOT_ADB = "other"                # Port open, but not speaking ADB
+
+
+def _adb_packet(command, arg0, arg1, payload=b""):
+    checksum = sum(payload) & 0xFFFFFFFF
+    return struct.pack("<6I", command, arg0, arg1, len(payload), checksum,
+                       command ^ 0xFFFFFFFF) + payload
+
+
+def classify_adb_handshake(sock, timeout=1.0):
+    """Send CNXN on a connected socket and classify the first reply"""
+    try:
+        sock.settimeout(timeout)
+        sock.sendall(_adb_packet(ADB_CNXN, ADB_VERSION, ADB_MAX_PAYLOAD, b"host::\0"))
+        header = b""
+        while len(header) < 24:
+            chunk = sock.recv(24 - len(header))
+            if not chunk:
+                return NOT_ADB
+            header += chunk
+    except OSError:
+        return NOT_ADB
+    command, _, _, _, _, magic = struct.unpack("<6I", header)
+    if magic != command ^ 0xFFFFFFFF:
+        return NOT_ADB
+    if command in (ADB_CNXN, ADB_STLS):
+        return ADB_ENDPOINT
+    if command == ADB_AUTH:
+        return ADB_UNAUTHORIZED
+    return NOT_ADB
+
+
+def probe_adb_endpoints(ip, ports, timeout=0.1, handshake_timeout=1.0):
+    """Scan a single IP and fingerprint open ports, returns [(ip, port, kind), ...]"""
+    results = []
+    for port in ports:
+        try:
+            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+                sock.settimeout(timeout)
+                if sock.connect_ex((ip, port)) == 0:
+                    results.append((ip, port, classify_adb_handshake(sock, handshake_timeout)))
+        except Exception:
+            pass
+    return results
+
+
+def read_neighbor_table():
+    """Read IPv4 addresses from the OS ARP/neighbor cache (no packets are sent)"""
+    ip_re = re.compile(r"\b(\d{1,3}(?:\.\d{1,3}){3})\b")
+    mac_re = re.compile(r"\b[0-9a-fA-F]{1,2}(?:[:-][0-9a-fA-F]{1,2}){5}\b")
+    lines = []
+
+    proc_arp = Path("/proc/net/arp")
+    if proc_arp.exists():
+        # Linux: IP address, HW type, Flags, HW address, Mask, Device
+        for line in proc_arp.read_text().splitlines()[1:]:
+            fields = line.split()
+            if len(fields) >= 4 and fields[2] != "0x0":
+                lines.append(f"{fields[0]} {fields[3]}")
+    else:
+        # Windows "arp -a" / macOS "arp -an"
+        try:
+            cmd = ["arp", "-a"] if sys.platform == "win32" else ["arp", "-an"]
+            result = subprocess.run(cmd, capture_output=True, text=True, timeout=5,
+                                    creationflags=SUBPROCESS_FLAGS)
+            lines = result.stdout.splitlines()
+        except Exception as e:
+            print(f"[DEBUG] Neighbor table read failed: {str(e)}")
+
+    addresses = []
+    for line in lines:
+        ip_match = ip_re.search(line)
+        mac_match = mac_re.search(line)
+        if not ip_match or not mac_match:
+            continue
+        ip = ip_match.group(1)
+        mac = mac_match.group(0).lower().replace("-", ":")
+        first_octet = int(ip.split(".")[0])
+        # Skip broadcast/multicast entries
+        if mac == "ff:ff:ff:ff:ff:ff" or 224 <= first_octet <= 239 or ip.endswith(".255"):
+            continue
+        if ip not in addresses:
+            addresses.append(ip)
+    return addresses
+
+
+def _build_mdns_query(service_names):
+    """Build an mDNS PTR query packet (QU bit set so responders answer by unicast)"""
+    packet = struct.pack("!HHHHHH", 0, 0, len(service_names), 0, 0, 0)
+    for name in service_names:
+        for label in name.strip(".").split("."):
+            encoded = label.encode("utf-8")
+            packet += bytes([len(encoded)]) + encoded
+        packet += b"\x00" + struct.pack("!HH", 12, 0x8001)  # PTR, IN | unicast-response
+    return packet
+
+
+def _read_dns_name(data, offset):
+    """Read a (possibly compressed) DNS name, returns (name, offset after the name)"""
+    labels = []
+    end_offset = None
+    for _ in range(128):  # Guard against pointer loops
+        length = data[offset]
+        if length & 0xC0 == 0xC0:
+            pointer = ((length & 0x3F) << 8) | data[offset + 1]
+            if end_offset is None:
+                end_offset = offset + 2
+            offset = pointer
+            continue
+        offset += 1
+        if length == 0:
+            break
+        labels.append(data[offset:offset + length].decode("utf-8", "replace"))
+        offset += length
+    return ".".join(labels), (end_offset if end_offset is not None else offset)
+
+
+def parse_mdns_response(data, sender_ip):
+    """Extract (ip, port) ADB endpoints from an mDNS response packet"""
+    _, flags, qdcount, ancount, nscount, arcount = struct.unpack("!HHHHHH", data[:12])
+    offset = 12
+    for _ in range(qdcount):
+        _, offset = _read_dns_name(data, offset)
+        offset += 4
+
+    srv_records = {}  # instance name -> (target host, port)
+    a_records = {}    # host name -> ip
+    for _ in range(ancount + nscount + arcount):
+        name, offset = _read_dns_name(data, offset)
+        rtype, _, _, rdlength = struct.unpack("!HHIH", data[offset:offset + 10])
+        offset += 10
+        rdata_offset = offset
+        offset += rdlength
+        if rtype == 33:  # SRV: priority, weight, port, target
+            port = struct.unpack("!H", data[rdata_offset + 4:rdata_offset + 6])[0]
+            target, _ = _read_dns_name(data, rdata_offset + 6)
+            srv_records[name.lower()] = (target.lower(), port)
+        elif rtype == 1 and rdlength == 4:  # A
+            a_records[name.lower()] = socket.inet_ntoa(data[rdata_offset:rdata_offset + 4])
+
+    endpoints = []
+    for target, port in srv_records.values():
+        endpoints.append((a_records.get(target, sender_ip), port))
+    return endpoints
+
+
+def query_mdns(service_names, timeout=1.0, mdns_addr=("224.0.0.251", 5353)):
+    """Send one mDNS query and collect ADB endpoints announced until timeout"""
+    endpoints = []
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+    try:
+        sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 255)
+        sock.settimeout(0.2)
+        sock.sendto(_build_mdns_query(service_names), mdns_addr)
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            try:
+                data, (sender_ip, _) = sock.recvfrom(9000)
+            except socket.timeout:
+                continue
+            try:
+                for endpoint in parse_mdns_response(data, sender_ip):
+                    if endpoint not in endpoints:
+                        endpoints.append(endpoint)
+            except (IndexError, struct.error) as e:
+                print(f"[DEBUG] Malformed mDNS packet from {sender_ip}: {str(e)}")
+    except OSError as e:
+        print(f"[DEBUG] mDNS query failed: {str(e)}")
+    finally:
+        sock.close()
+    return endpoints
+
+
+class DeviceDiscoveryService:
+    """Background device discovery that keeps the registry live
+
+    Each cycle seeds candidates from the OS neighbor (ARP) table and from
+    `_adb-tls-connect._tcp` / `_adb._tcp` mDNS announcements, probes only those
+    hosts and hands responding ones to `identify` (usually `adb connect` + getprop).
+    """
+
+    ADB_SERVICES = ("_adb-tls-connect._tcp.local", "_adb._tcp.local")
+
+    def __init__(self, registry, identify, on_found, ports=(5555, 1206), interval=15,
+                 mdns_addr=("224.0.0.251", 5353), neighbor_source=read_neighbor_table):
+        self.registry = registry
+        self.identify = identify        # (ip, port) -> info tuple or None
+        self.on_found = on_found        # called with the identify() result
+        self.ports = tuple(ports)
+        self.interval = interval
+        self.mdns_addr = mdns_addr
+        self.neighbor_source = neighbor_source
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="device-discovery", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive() and not self._stop.is_set()
+
+    def _run(self):
+        print("[DEBUG] Discovery service started")
+        while not self._stop.is_set():
+            try:
+                self.discover_once()
+            except Exception as e:
+                print(f"[DEBUG] Discovery cycle failed: {str(e)}")
+            self._stop.wait(self.interval)
+        print("[DEBUG] Discovery service stopped")
+
+    def _is_known(self, ip, port):
+        device = self.registry.get(f"{ip}:{port}")
+        return device is not None and device.state != AndroidDevice.DISCOVERED
+
+    def discover_once(self):
+        """Run one discovery cycle, returns the identified devices' info tuples"""
+        candidates = []
+        for ip, port in query_mdns(self.ADB_SERVICES, timeout=1.0, mdns_addr=self.mdns_addr):
+            if not self._is_known(ip, port):
+                candidates.append((ip, port))
+
+        neighbors = [ip for ip in self.neighbor_source()
+                     if not any(self._is_known(ip, port) for port in self.ports)]
+        if neighbors:
+            with ThreadPoolExecutor(max_workers=20) as executor:
+                for results in executor.map(lambda ip: probe_adb_endpoints(ip, self.ports), neighbors):
+                    for ip, port, kind in results:
+                        if kind != NOT_ADB and (ip, port) not in candidates:
+                            candidates.append((ip, port))
+
+        found = []
+        for ip, port in candidates:
+            if self._stop.is_set():
+                break
+            info = self.identify(ip, port)
+            if info:
+                self.on_found(*info)
+                found.append(info)
+        if candidates:
+            print(f"[DEBUG] Discovery: {len(candidates)} candidates, {len(found)} ADB devices")
+        return found
+
+
+ADB_TRACE_FORMAT = "rt1018-adb-trace"
+
+
+def _trace_split(args):
+    """(device or None, args without `-s <device>`)"""
+    if len(args) >= 2 and args[0] == "-s":
+        return args[1], list(args[2:])
+    return None, list(args)
+
+
+def _trace_key(args):
+    """Replay lookup key: local paths of push/pull differ between runs, keep only their names"""
+    if args and args[0] == "push" and len(args) >= 3:
+        return ("push",) + tuple(Path(a).name for a in args[1:-1]) + (args[-1],)
+    if args and args[0] == "pull" and len(args) >= 3:
+        return ("pull", args[1], Path(args[2]).name)
+    return tuple(args)
+
+
+class AdbSessionRecorder:
+    """Appends every adb invocation (arguments, latency, output, exit status) to a JSONL trace"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.started = time.time()
+        self.count = 0
+        self._lock = threading.Lock()
+        self._file = open(self.path, "w", encoding="utf-8")
+        self._write({"format": ADB_TRACE_FORMAT, "version": 1,
+                     "started": datetime.now().isoformat(timespec="seconds")})
+
+    def _write(self, entry):
+        with self._lock:
+            if self._file.closed:
+                return
+            self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._file.flush()
+
+    def record(self, args, started, latency, result=None, timed_out=False, stalled=False):
+        device, args = _trace_split(args)
+        entry = {"t": round(started - self.started, 4), "device": device, "args": args,
+                 "latency": round(latency, 4), "timeout": timed_out}
+        if stalled:
+            entry["stalled"] = True
+        if result is not None:
+            entry.update(returncode=result.returncode, stdout=result.stdout or "",
+                         stderr=result.stderr or "")
+        self._write(entry)
+        self.count += 1
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class AdbSessionReplayer:
+    """Answers adb invocations from a recorded trace instead of running adb
+
+    Responses are matched per device and command, in recorded order; once a
+    command's recorded responses are used up the last one is repeated (state
+    polls settle on their final answer). Transfers whose file lists differ from
+    the recording fall back to the next recorded transfer of the same kind. Each response is delayed by its
+    recorded latency times `time_scale` (1 = original timing, 0 = instant).
+    """
+
+    TRANSFER_VERBS = ("push", "pull", "install")
+
+    def __init__(self, path, time_scale=1.0):
+        self.path = Path(path)
+        self.time_scale = time_scale
+        self.misses = 0
+        self._queues = {}   # (device, key) -> recorded entries, oldest first
+        self._by_verb = {}  # (device, push/pull/install) -> entries, fallback for unmatched transfers
+        self._lock = threading.Lock()
+        with open(self.path, encoding="utf-8") as f:
+            header = json.loads(f.readline() or "{}")
+            if header.get("format") != ADB_TRACE_FORMAT:
+                raise ValueError(f"not an adb session trace: {self.path}")
+            self.entries = [json.loads(line) for line in f if line.strip()]
+        for entry in self.entries:
+            args = entry["args"]
+            self._queues.setdefault((entry["device"], _trace_key(args)), []).append(entry)
+            if args and args[0] in self.TRANSFER_VERBS:
+                self._by_verb.setdefault((entry["device"], args[0]), []).append(entry)
+
+    def devices(self):
+        """[(addr, version, model, serial)] of the devices identified in the trace"""
+        found = {}
+        for entry in self.entries:
+            device, args = entry["device"], entry["args"]
+            if device and device not in found:
+                found[device] = ("", "", None)
+            if device and args[:1] == ["shell"] and "getprop ro.build.version.release" in " ".join(args):
+                lines = entry.get("stdout", "").splitlines() + ["", "", ""]
+                version, model, serial = (line.strip() for line in lines[:3])
+                found[device] = (version, model, serial or None)
+        return [(addr,) + info for addr, info in found.items()]
+
+    def _next(self, queue):
+        return queue.pop(0) if len(queue) > 1 else queue[0]
+
+    def run(self, args, timeout):
+        device, rest = _trace_split(args)
+        with self._lock:
+            queue = self._queues.get((device, _trace_key(rest))) \
+                or self._by_verb.get((device, rest[0] if rest else ""))
+            entry = self._next(queue) if queue else None
+            if entry is None:
+                self.misses += 1
+        if entry is None:
+            print(f"[DEBUG] Replay: no recorded response for {device} {' '.join(rest)}")
+            return subprocess.CompletedProcess(args, 1, "", "error: no recorded response\n")
+
+        delay = entry["latency"] * self.time_scale
+        if entry.get("stalled"):
+            time.sleep(delay)
+            raise TransferStalled(f"transfer stalled (replayed): {' '.join(rest)}")
+        if entry.get("timeout"):
+            time.sleep(min(delay, timeout))
+            raise subprocess.TimeoutExpired(args, timeout)
+        time.sleep(delay)
+        return subprocess.CompletedProcess(args, entry.get("returncode", 0), entry.get("stdout", ""),
+                                           entry.get("stderr", ""))
+
+
+DEFAULT_STALL_TIMEOUT = 30  # Seconds without data before a watched transfer is aborted
+STALL_RETRIES = 2           # Retries of a stalled transfer (after reconnecting)
+
+
+class TransferStalled(Exception):
+    """An adb transfer moved no bytes for the whole stall window and was aborted"""
+
+
+class TransferProgress:
+    """Live byte count, throughput and ETA of one device transfer (one or more adb calls)
+
+    adb only prints "[ 45%] file" progress to a terminal, so while a call runs
+    the payload moved is estimated from the adb process's I/O counter, scaled
+    by `io_per_byte` (a push reads the file and writes the socket - about two
+    counter bytes per payload byte). The ratio is re-learned from every large
+    call whose payload size is known. The listener gets at most one update per
+    NOTIFY_INTERVAL, plus a final one when the transfer is closed.
+    """
+
+    NOTIFY_INTERVAL = 0.5
+    RATE_SMOOTHING = 0.3                 # Weight of the newest sample in the throughput average
+    CALIBRATE_MIN = 8 * 1024 * 1024      # Calls smaller than this do not re-learn io_per_byte
+    PERCENT_PATTERN = re.compile(r"\[\s*(\d{1,3})%\]")
+
+    io_per_byte = 2.0  # Process-wide; adb behaves the same for every device
+
+    def __init__(self, label, total=None, listener=None):
+        self.label = label
+        self.total = total       # Payload bytes of the whole transfer, None if unknown (pulls)
+        self.listener = listener
+        self.done = 0            # Payload bytes of finished adb calls
+        self.current = 0         # Estimated payload bytes of the running adb call
+        self.chunk = None        # Payload bytes of the running adb call, if known
+        self.rate = None         # Smoothed bytes per second
+        self.finished = False
+        self._io = 0
+        self._sample = (time.monotonic(), 0)
+        self._notified = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def transferred(self):
+        return self.done + self.current
+
+    @property
+    def fraction(self):
+        if not self.total:
+            return None
+        return min(1.0, self.transferred / self.total)
+
+    @property
+    def eta(self):
+        """Seconds left at the current rate, None while unknown"""
+        if not self.total or not self.rate:
+            return None
+        return max(0.0, (self.total - self.transferred) / self.rate)
+
+    def start(self, total, done=0):
+        """(Re)start the count, e.g. when a resumed push knows what already arrived"""
+        with self._lock:
+            self.total = total
+            self.done = done
+            self.current = 0
+            self.chunk = None
+            self._sample = (time.monotonic(), done)
+        self._notify(force=True)
+
+    def begin(self, nbytes=None):
+        """An adb call moving `nbytes` of payload (None if unknown) is starting"""
+        with self._lock:
+            self.chunk = nbytes
+            self.current = 0
+            self._io = 0
+
+    def observe_io(self, io_bytes):
+        """I/O counter bytes of the running call so far"""
+        self._io = io_bytes
+        self._advance(io_bytes / TransferProgress.io_per_byte)
+
+    def observe_line(self, line):
+        """adb output line; "[ 45%]" progress (when adb prints it) is exact"""
+        match = self.PERCENT_PATTERN.search(line)
+        if match and self.chunk:
+            self._advance(self.chunk * min(100, int(match.group(1))) / 100)
+
+    def _advance(self, current):
+        with self._lock:
+            if self.chunk is not None:
+                current = min(current, self.chunk)
+            self.current = max(self.current, int(current))
+        self._notify()
+
+    def end(self):
+        """The running call succeeded - count its payload and re-learn io_per_byte"""
+        with self._lock:
+            if self.chunk is not None:
+                if self.chunk >= self.CALIBRATE_MIN and self._io:
+                    ratio = min(4.0, max(1.0, self._io / self.chunk))
+                    TransferProgress.io_per_byte += self.RATE_SMOOTHING * (ratio - TransferProgress.io_per_byte)
+                self.done += self.chunk
+            else:
+                self.done += self.current
+            self.current = 0
+            self.chunk = None
+        self._notify(force=True)
+
+    def abort(self):
+        """The running call failed or stalled - whatever it moved will be sent again"""
+        with self._lock:
+            self.current = 0
+            self.chunk = None
+        self._notify(force=True)
+
+    def close(self):
+        self.finished = True
+        self._notify(force=True)
+
+    def _notify(self, force=False):
+        now = time.monotonic()
+        with self._lock:
+            if not force and now - self._notified < self.NOTIFY_INTERVAL:
+                return
+            self._notified = now
+            sampled_at, sampled_bytes = self._sample
+            if now - sampled_at >= self.NOTIFY_INTERVAL:
+                rate = max(0.0, (self.transferred - sampled_bytes) / (now - sampled_at))
+                self.rate = rate if self.rate is None else (
+                    self.rate + self.RATE_SMOOTHING * (rate - self.rate))
+                self._sample = (now, self.transferred)
+        if self.listener is not None:
+            try:
+                self.listener(self)
+            except Exception as e:
+                print(f"[DEBUG] Transfer progress listener failed: {str(e)}")
+
+    def describe(self):
+        """Short Korean status text, e.g. "SD카드 45% · 3.2 MB/s · 12초 남음" """
+        parts = [self.label]
+        fraction = self.fraction
+        if fraction is not None:
+            parts.append(f"{fraction * 100:.0f}%")
+        else:
+            parts.append(f"{self.transferred / (1024 * 1024):.1f} MB")
+        if self.rate:
+            parts.append(f"· {self.rate / (1024 * 1024):.1f} MB/s")
+        eta = self.eta
+        if eta is not None and not self.finished:
+            parts.append(f"· {eta:.0f}초 남음" if eta < 60 else f"· {eta / 60:.0f}분 남음")
+        return " ".join(parts)
+
+
+def process_io_bytes(pid):
+    """Bytes read + written so far by a process (files and sockets), or None if unavailable
+
+    A running `adb push`/`pull`/`install` reads or writes continuously, so a
+    counter that stops moving means the transfer is stalled.
+    """
+    if HAS_PSUTIL:
+        try:
+            counters = psutil.Process(pid).io_counters()
+            # read_chars/write_chars (Linux) include cached and socket I/O; Windows adds other_bytes
+            return (getattr(counters, "read_chars", counters.read_bytes)
+                    + getattr(counters, "write_chars", counters.write_bytes)
+                    + getattr(counters, "other_bytes", 0))
+        except Exception:
+            return None
+    if sys.platform.startswith("linux"):
+        try:
+            with open(f"/proc/{pid}/io", "r") as f:
+                fields = dict(line.split(":", 1) for line in f if ":" in line)
+            return int(fields["rchar"]) + int(fields["wchar"])
+        except (OSError, KeyError, ValueError):
+            return None
+    if sys.platform == "win32":
+        import ctypes
+
+        class IO_COUNTERS(ctypes.Structure):
+            _fields_ = [(name, ctypes.c_ulonglong) for name in (
+                "ReadOperationCount", "WriteOperationCount", "OtherOperationCount",
+                "ReadTransferCount", "WriteTransferCount", "OtherTransferCount")]
+
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return None
+        try:
+            counters = IO_COUNTERS()
+            if not kernel32.GetProcessIoCounters(handle, ctypes.byref(counters)):
+                return None
+            return counters.ReadTransferCount + counters.WriteTransferCount + counters.OtherTransferCount
+        finally:
+            kernel32.CloseHandle(handle)
+    return None
+
+
+def shell_quote(value):
+    """Quote a string as one word for the device shell (safe with spaces and apostrophes)"""
+    return "'" + str(value).replace("'", "'\\''") + "'"
+
+
+def adb_server_running(timeout=0.2):
+    """True when an adb server already listens locally (the next adb call is a warm start)"""
+    port = int(os.environ.get("ANDROID_ADB_SERVER_PORT", "5037"))
+    try:
+        with socket.create_connection(("127.0.0.1", port), timeout=timeout):
+            return True
+    except OSError:
+        return False
+
+
+class AdbRunner:
+    """Runs adb commands; every engine call to adb goes through here
+
+    With `recorder` set each call is written to a session trace; with
+    `replayer` set calls are answered from a trace and adb is not started.
+    """
+
+    STALL_CHECK_INTERVAL = 1.0  # Seconds between progress checks of a watched transfer
+    OUTPUT_TAIL = 200           # Output lines kept per stream of a watched transfer
+    WATCH_TIMEOUT = 600         # Fixed limit of a watched transfer when I/O counters are unavailable
+
+    def __init__(self, adb_exe):
+        self.adb_exe = adb_exe  # Callable returning the adb executable
+        self.recorder = None
+        self.replayer = None
+        self.timeouts = None    # AdaptiveTimeouts; `timeout` is then only the static default
+        self._io_warned = False
+
+    def run(self, args, timeout, step=None):
+        """Run one adb command; `step` (plan step id) keys its learned timeout"""
+        replayer = self.replayer
+        if replayer is not None:
+            return replayer.run(args, timeout)
+
+        timeouts = self.timeouts
+        target, operation = (AdaptiveTimeouts.operation(args, step) if timeouts is not None
+                             else (None, None))
+        if target is None:
+            return self._run(args, timeout)
+
+        budget = timeouts.budget(target, operation, timeout)
+        started = time.monotonic()
+        try:
+            result = self._run(args, budget)
+        except subprocess.TimeoutExpired:
+            # Never rerun a killed command here - the caller decides, as with the static timeout
+            timeouts.record(target, operation, budget, timed_out=True)
+            if budget < timeout:
+                print(f"[DEBUG] adb {operation} on {target} exceeded learned {budget:.1f}s")
+            raise
+        timeouts.record(target, operation, time.monotonic() - started)
+        return result
+
+    def _run(self, args, timeout):
+        recorder = self.recorder
+        started = time.time()
+        device, rest = _trace_split(args)
+        try:
+            with PROFILER.span(f"adb {rest[0] if rest else ''}", "adb", device=device):
+                result = subprocess.run([self.adb_exe()] + list(args), capture_output=True, text=True,
+                                        timeout=timeout, encoding="utf-8", errors="replace",
+                                        creationflags=SUBPROCESS_FLAGS)
+        except subprocess.TimeoutExpired:
+            if recorder is not None:
+                recorder.record(args, started, time.time() - started, timed_out=True)
+            raise
+        if recorder is not None:
+            recorder.record(args, started, time.time() - started, result)
+        return result
+
+    def run_watched(self, args, stall_window, on_output=None, progress=None, nbytes=None,
+                    timeout=None):
+        """Run a transfer with no fixed timeout, aborting it once nothing moved for stall_window s
+
+        Progress is the adb process's own I/O counter plus any output line it
+        prints (passed to on_output as it arrives). Slow transfers that keep
+        moving run to completion; a stall raises TransferStalled. Only the last
+        OUTPUT_TAIL lines of output are kept, so memory stays flat however many
+        files a push or pull covers. A TransferProgress given as `progress` is
+        fed the call's `nbytes` payload as it moves.
+
+        Where the process I/O counter cannot be read, output alone says nothing
+        about a silent push, so the stall window is not used: the call gets the
+        fixed `timeout` (WATCH_TIMEOUT if None) and raises TimeoutExpired.
+        """
+        if progress is not None:
+            progress.begin(nbytes)
+            try:
+                result = self._run_watched(args, stall_window, on_output, progress, timeout)
+            except BaseException:
+                progress.abort()
+                raise
+            if result.returncode == 0:
+                progress.end()
+            else:
+                progress.abort()
+            return result
+        return self._run_watched(args, stall_window, on_output, None, timeout)
+
+    def _run_watched(self, args, stall_window, on_output, progress, timeout):
+        replayer = self.replayer
+        if replayer is not None:
+            return replayer.run(args, stall_window)
+
+        recorder = self.recorder
+        started = time.time()
+        device, rest = _trace_split(args)
+        tails = {"stdout": collections.deque(maxlen=self.OUTPUT_TAIL),
+                 "stderr": collections.deque(maxlen=self.OUTPUT_TAIL)}
+        last_output = [time.monotonic()]
+
+        def pump(stream, tail):
+            for line in stream:
+                tail.append(line)
+                last_output[0] = time.monotonic()
+                if progress is not None:
+                    progress.observe_line(line)
+                if on_output is not None:
+                    try:
+                        on_output(line.rstrip())
+                    except Exception as e:
+                        print(f"[DEBUG] Transfer output handler failed: {str(e)}")
+
+        with PROFILER.span(f"adb {rest[0] if rest else ''}", "adb", device=device, watched=True):
+            process = subprocess.Popen([self.adb_exe()] + list(args), stdout=subprocess.PIPE,
+                                       stderr=subprocess.PIPE, text=True, encoding="utf-8",
+                                       errors="replace", creationflags=SUBPROCESS_FLAGS)
+            readers = [threading.Thread(target=pump, args=(getattr(process, name), tail), daemon=True)
+                       for name, tail in tails.items()]
+            for reader in readers:
+                reader.start()
+
+            moved = process_io_bytes(process.pid)
+            io_start = moved
+            deadline = None
+            if io_start is None:
+                # Without I/O counters a healthy silent push looks stalled - use a fixed limit
+                if timeout is None:
+                    timeout = self.WATCH_TIMEOUT
+                deadline = time.monotonic() + timeout
+                if not self._io_warned:
+                    self._io_warned = True
+                    print("[DEBUG] Process I/O counters unavailable - stall detection off, "
+                          "transfers use fixed timeouts")
+            last_progress = time.monotonic()
+            stalled = timed_out = False
+            while True:
+                try:
+                    process.wait(timeout=self.STALL_CHECK_INTERVAL)
+                    break
+                except subprocess.TimeoutExpired:
+                    pass
+                if deadline is not None:
+                    if time.monotonic() > deadline:
+                        timed_out = True
+                        process.kill()
+                        process.wait()
+                        break
+                    continue
+                now_moved = process_io_bytes(process.pid)
+                if now_moved is not None and now_moved != moved:
+                    moved = now_moved
+                    last_progress = time.monotonic()
+                    if progress is not None and io_start is not None:
+                        progress.observe_io(now_moved - io_start)
+                last_progress = max(last_progress, last_output[0])
+                if time.monotonic() - last_progress > stall_window:
+                    stalled = True
+                    process.kill()
+                    process.wait()
+                    break
+            for reader in readers:
+                reader.join(timeout=5)
+
+        latency = time.time() - started
+        if timed_out:
+            if recorder is not None:
+                recorder.record(args, started, latency, timed_out=True)
+            raise subprocess.TimeoutExpired(args, timeout)
+        if stalled:
+            if recorder is not None:
+                recorder.record(args, started, latency, timed_out=True, stalled=True)
+            raise TransferStalled(f"transfer stalled: no data for {stall_window:.0f}s ({' '.join(rest[:1])})")
+        result = subprocess.CompletedProcess(args, process.returncode, "".join(tails["stdout"]),
+                                             "".join(tails["stderr"]))
+        if recorder is not None:
+            recorder.record(args, started, latency, result)
+        return result
+
+
+class _Transport:
+    """Health bookkeeping for one `adb connect` session"""
+
+    __slots__ = ("addr", "healthy", "last_ok", "failures", "next_attempt", "borrowers", "lock")
+
+    def __init__(self, addr):
+        self.addr = addr
+        self.healthy = False
+        self.last_ok = 0.0
+        self.failures = 0
+        self.next_attempt = 0.0
+        self.borrowers = 0
+        self.lock = threading.Lock()  # Serializes reconnect attempts for this address
+
+
+class AdbTransportManager:
+    """Keeps `adb connect` sessions alive and lends out verified-healthy transports
+
+    A single heartbeat thread polls `adb devices` (one call covers every tracked
+    device) and reconnects dropped transports with jittered exponential backoff,
+    so operations only re-check a device when its last known-good state is stale.
+    """
+
+    def __init__(self, adb, heartbeat_interval=10, fresh_for=5, log=None):
+        self.adb = adb                          # AdbRunner
+        self.heartbeat_interval = heartbeat_interval
+        self.fresh_for = fresh_for              # Seconds a successful check stays valid
+        self.log = log or (lambda message, level="INFO": None)
+        self._transports = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _adb(self, args, timeout):
+        return self.adb.run(args, timeout)
+
+    def _transport(self, addr):
+        with self._lock:
+            transport = self._transports.get(addr)
+            if transport is None:
+                transport = self._transports[addr] = _Transport(addr)
+            return transport
+
+    def track(self, addr):
+        """Keep this device's session alive from the heartbeat"""
+        return self._transport(addr)
+
+    def untrack(self, addr):
+        with self._lock:
+            self._transports.pop(addr, None)
+
+    def _mark(self, transport, healthy):
+        transport.healthy = healthy
+        if healthy:
+            transport.last_ok = time.time()
+            transport.failures = 0
+            transport.next_attempt = 0.0
+        else:
+            transport.failures += 1
+
+    def mark_unhealthy(self, addr):
+        """Called when a command fails with a transport error"""
+        transport = self._transports.get(addr)
+        if transport:
+            transport.healthy = False
+            transport.last_ok = 0.0
+
+    def _backoff(self, failures, base=1.0, cap=16.0):
+        delay = min(cap, base * (2 ** max(failures - 1, 0)))
+        return random.uniform(delay / 2, delay)
+
+    def check(self, addr):
+        """Query get-state for one device"""
+        transport = self._transport(addr)
+        try:
+            result = self._adb(["-s", addr, "get-state"], timeout=5)
+            healthy = result.returncode == 0 and "device" in result.stdout
+        except Exception:
+            healthy = False
+        self._mark(transport, healthy)
+        return healthy
+
+    def connect(self, addr):
+        """Run `adb connect` and verify the device answers, returns True when healthy"""
+        transport = self._transport(addr)
+        with transport.lock:
+            try:
+                result = self._adb(["connect", addr], timeout=10)
+                output = result.stdout.lower()
+                if "connected" not in output or "cannot" in output or "failed" in output:
+                    self._mark(transport, False)
+                    return False
+            except Exception as e:
+                print(f"[DEBUG] adb connect {addr} failed: {str(e)}")
+                self._mark(transport, False)
+                return False
+        return self.check(addr)
+
+    def ensure(self, addr, max_retries=3):
+        """Return True once the device is healthy, reconnecting with jittered backoff"""
+        transport = self._transport(addr)
+        if transport.healthy and time.time() - transport.last_ok < self.fresh_for:
+            return True
+        if self.check(addr):
+            return True
+
+        for attempt in range(max_retries):
+            print(f"[DEBUG] Device offline, attempting reconnect ({attempt + 1}/{max_retries})...")
+            self.log(f"디바이스 재연결 시도 중... ({attempt + 1}/{max_retries})")
+            if self.connect(addr):
+                self.log("✓ 디바이스 재연결 성공")
+                return True
+            time.sleep(self._backoff(transport.failures))
+
+        self.log("디바이스 재연결 실패", "WARNING")
+        return False
+
+    @contextlib.contextmanager
+    def borrow(self, addr):
+        """Lend a verified-healthy transport, raising ConnectionError if the device is offline"""
+        transport = self.track(addr)
+        if not self.ensure(addr):
+            raise ConnectionError(f"device offline: {addr}")
+        with self._lock:
+            transport.borrowers += 1
+        try:
+            yield addr
+        finally:
+            with self._lock:
+                transport.borrowers -= 1
+
+    def wait_for_device(self, addr, max_wait=30, initial_delay=0):
+        """Wait for a device to come back (adbd restart or reboot), returns seconds or None
+
+        With learned timeouts on the runner, max_wait is the static default and
+        the device's own restart history sets the actual limit.
+        """
+        timeouts = self.adb.timeouts
+        if timeouts is not None:
+            max_wait = timeouts.budget(addr, "adbd restart", max_wait)
+        transport = self.track(addr)
+        transport.healthy = False
+        start = time.time()
+        time.sleep(initial_delay)
+        attempt = 0
+        while time.time() - start < max_wait:
+            # Network transports have to be re-attached after adbd restarts
+            if self.check(addr) or self.connect(addr):
+                elapsed = time.time() - start
+                if timeouts is not None:
+                    timeouts.record(addr, "adbd restart", elapsed)
+                return elapsed
+            attempt += 1
+            remaining = max_wait - (time.time() - start)
+            time.sleep(max(0.0, min(remaining, self._backoff(attempt, base=1.0, cap=4.0))))
+        if timeouts is not None:
+            timeouts.record(addr, "adbd restart", max_wait, timed_out=True)
+        return None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._heartbeat, name="adb-heartbeat", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def device_states(self):
+        """{serial or addr: state} for every transport the adb server knows, in one call"""
+        result = self._adb(["devices"], timeout=5)
+        states = {}
+        for line in result.stdout.splitlines()[1:]:
+            fields = line.split()
+            if len(fields) >= 2:
+                states[fields[0]] = fields[1]
+        return states
+
+    def _heartbeat(self):
+        while not self._stop.wait(self.heartbeat_interval):
+            with self._lock:
+                transports = list(self._transports.values())
+            if not transports:
+                continue
+            try:
+                states = self.device_states()
+            except Exception as e:
+                print(f"[DEBUG] Heartbeat failed: {str(e)}")
+                continue
+
+            now = time.time()
+            for transport in transports:
+                if states.get(transport.addr) == "device":
+                    self._mark(transport, True)
+                    continue
+                self._mark(transport, False)
+                # Reconnect in the background, spacing attempts with jittered backoff
+                if now >= transport.next_attempt and not transport.lock.locked():
+                    transport.next_attempt = now + self._backoff(transport.failures, cap=60.0)
+                    threading.Thread(target=self.connect, args=(transport.addr,),
+                                     daemon=True).start()
+
+
+class _RebootWaiter:
+    __slots__ = ("addr", "started", "not_before", "deadline", "next_connect", "attempts",
+                 "checking", "elapsed", "event")
+
+    def __init__(self, addr, initial_delay, max_wait):
+        self.addr = addr
+        self.started = time.time()
+        self.not_before = self.started + initial_delay
+        self.deadline = self.started + initial_delay + max_wait
+        self.next_connect = self.not_before
+        self.attempts = 0
+        self.checking = False
+        self.elapsed = None
+        self.event = threading.Event()
+
+
+class RebootCoordinator:
+    """Reboots devices and watches all of them coming back with one polling loop
+
+    Each caller blocks only on its own event; a single watcher thread issues
+    one `adb devices` per tick for the whole fleet, re-attaches network
+    transports with jittered backoff and confirms `sys.boot_completed` before
+    releasing the device, so reboot waits of many devices overlap.
+    """
+
+    def __init__(self, transports, run_adb, poll_interval=1.0):
+        self.transports = transports
+        self.run_adb = run_adb
+        self.poll_interval = poll_interval
+        self._waiters = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def pending(self):
+        with self._lock:
+            return list(self._waiters)
+
+    def reboot(self, addr, max_wait=60, initial_delay=5):
+        """Reboot one device and wait for it, returns seconds until ready or None
+
+        max_wait is a default: once the device has reboot history (learned
+        timeouts on the transports' runner) its own boot times set the limit.
+        """
+        timeouts = self.transports.adb.timeouts
+        if timeouts is not None:
+            max_wait = timeouts.budget(addr, "reboot", max_wait)
+        waiter = _RebootWaiter(addr, initial_delay, max_wait)
+        self.transports.track(addr).healthy = False
+        self.run_adb(addr, ["reboot"])
+        with self._lock:
+            self._waiters[addr] = waiter
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._watch, daemon=True,
+                                                name="reboot-watcher")
+                self._thread.start()
+        waiter.event.wait(initial_delay + max_wait + 10)
+        with self._lock:
+            self._waiters.pop(addr, None)
+        if timeouts is not None:
+            if waiter.elapsed is None:
+                timeouts.record(addr, "reboot", max_wait, timed_out=True)
+            else:
+                timeouts.record(addr, "reboot", max(0.0, waiter.elapsed - initial_delay))
+        return waiter.elapsed
+
+    def _finish(self, waiter, elapsed):
+        waiter.elapsed = elapsed
+        with self._lock:
+            self._waiters.pop(waiter.addr, None)
+        waiter.event.set()
+
+    def _watch(self):
+        while True:
+            with self._lock:
+                waiters = list(self._waiters.values())
+                if not waiters:
+                    self._thread = None
+                    return
+            now = time.time()
+            try:
+                states = self.transports.device_states()
+            except Exception as e:
+                print(f"[DEBUG] Reboot watcher: adb devices failed: {str(e)}")
+                states = {}
+            for waiter in waiters:
+                if now < waiter.not_before or waiter.checking:
+                    continue
+                if now > waiter.deadline:
+                    self._finish(waiter, None)
+                elif states.get(waiter.addr) == "device":
+                    waiter.checking = True
+                    threading.Thread(target=self._check_boot, args=(waiter,), daemon=True).start()
+                elif now >= waiter.next_connect:
+                    waiter.attempts += 1
+                    waiter.next_connect = now + self.transports._backoff(waiter.attempts, cap=4.0)
+                    threading.Thread(target=self.transports.connect, args=(waiter.addr,),
+                                     daemon=True).start()
+            time.sleep(self.poll_interval)
+
+    def _check_boot(self, waiter):
+        try:
+            booted = self.run_adb(waiter.addr, ["shell", "getprop", "sys.boot_completed"],
+                                  timeout=5).strip() == "1"
+        except Exception:
+            booted = False
+        if booted:
+            self.transports.check(waiter.addr)
+            self._finish(waiter, time.time() - waiter.started)
+        waiter.checking = False
+
+
+class InstallSlots:
+    """Counting semaphore for concurrent installs; devices back from a reboot go first
+
+    A rebooting device lends its slot to the next device in the batch (see
+    reboot_wait). When it comes back it takes the next free slot ahead of
+    devices that have not started, so its short post-reboot steps do not
+    wait for a whole other install.
+    """
+
+    def __init__(self, count):
+        self._cond = threading.Condition()
+        self._free = count
+        self._priority_waiting = 0
+
+    def acquire(self, priority=False):
+        with self._cond:
+            if priority:
+                self._priority_waiting += 1
+                try:
+                    while self._free == 0:
+                        self._cond.wait()
+                finally:
+                    self._priority_waiting -= 1
+            else:
+                while self._free == 0 or self._priority_waiting:
+                    self._cond.wait()
+            self._free -= 1
+
+    def release(self):
+        with self._cond:
+            self._free += 1
+            self._cond.notify_all()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class InstallJournal:
+    """Per-device checkpoint journal so an interrupted install resumes where it stopped
+
+    Stored as JSON: completed step ids plus, per push group, the files (relative
+    path -> size) known to be on the device. A journal written for a different
+    installation source (or format version) is deleted on open, as is any
+    journal when `fresh` is set.
+    """
+
+    VERSION = 1
+
+    def __init__(self, path, source_id, fresh=False):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._data = {"version": self.VERSION, "source": source_id, "steps": [], "files": {}}
+        if fresh:
+            self.discard()
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") == self.VERSION and data.get("source") == source_id:
+            self._data = data
+        else:
+            print(f"[DEBUG] Discarding stale install journal {self.path.name}")
+            self.discard()
+
+    @staticmethod
+    def source_fingerprint(source):
+        """Identify an installation source by path, file count, total size and newest mtime"""
+        count = total = newest = 0
+        for path in Path(source).rglob('*'):
+            if path.is_file():
+                stat = path.stat()
+                count += 1
+                total += stat.st_size
+                newest = max(newest, int(stat.st_mtime))
+        return f"{Path(source).resolve()}|{count}|{total}|{newest}"
+
+    @property
+    def source_id(self):
+        return self._data["source"]
+
+    def completed_steps(self):
+        with self._lock:
+            return list(self._data["steps"])
+
+    def is_done(self, step):
+        with self._lock:
+            return step in self._data["steps"]
+
+    def mark_done(self, step):
+        with self._lock:
+            if step not in self._data["steps"]:
+                self._data["steps"].append(step)
+            self._save()
+
+    def pushed_files(self, group):
+        """Files of a push group already on the device: {relative path: size}"""
+        with self._lock:
+            return dict(self._data["files"].get(group, {}))
+
+    def record_files(self, group, files):
+        if not files:
+            return
+        with self._lock:
+            self._data["files"].setdefault(group, {}).update(files)
+            self._save()
+
+    def finish(self):
+        """Install completed - drop the journal"""
+        self.discard()
+
+    def discard(self):
+        """Forget every checkpoint and delete the journal file"""
+        with self._lock:
+            self._data["steps"] = []
+            self._data["files"] = {}
+            try:
+                self.path.unlink()
+            except OSError:
+                pass
+
+    def _save(self):
+        # Write to a temp file first so a crash never leaves a truncated journal
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+class _TransferTicket:
+    __slots__ = ("addr", "nbytes", "priority", "seq", "rate")
+
+    def __init__(self, addr, nbytes, priority, seq):
+        self.addr = addr
+        self.nbytes = nbytes
+        self.priority = priority
+        self.seq = seq
+        self.rate = 0.0
+
+
+class TransferScheduler:
+    """Shares the store Wi-Fi between every device being provisioned
+
+    adb cannot be rate-limited per byte, so the cap is enforced by admission:
+    a transfer starts only when the measured throughput of the devices already
+    transferring plus the new device's expected rate fits under the cap (one
+    transfer always runs). Waiting transfers are served by priority, then by
+    fewest bytes already granted to their device (fair share), then FIFO.
+    """
+
+    CRITICAL = 0  # Small files the app needs to start (DB, prefs)
+    APP = 1       # APKs
+    BULK = 2      # Media trees
+
+    DEFAULT_RATE = 2 * 1024 * 1024  # Assumed bytes/s before a device has been measured
+    MIN_SAMPLE_BYTES = 256 * 1024   # Smaller transfers are dominated by adb latency
+
+    def __init__(self, bandwidth_cap=0, max_active=8):
+        self.bandwidth_cap = bandwidth_cap  # bytes/s, 0 = unlimited
+        self.max_active = max_active
+        self._cond = threading.Condition()
+        self._waiting = []
+        self._active = []
+        self._served = {}      # addr -> bytes granted so far
+        self._throughput = {}  # addr -> measured bytes/s (moving average)
+        self._seq = 0
+
+    def set_bandwidth_cap(self, bandwidth_cap):
+        with self._cond:
+            self.bandwidth_cap = max(0, bandwidth_cap)
+            self._cond.notify_all()
+
+    def throughput(self, addr):
+        with self._cond:
+            return self._throughput.get(addr)
+
+    def _expected_rate(self, addr):
+        rate = self._throughput.get(addr, self.DEFAULT_RATE)
+        return min(rate, self.bandwidth_cap) if self.bandwidth_cap else rate
+
+    def _can_start(self, ticket):
+        if not self._active:
+            return True
+        if len(self._active) >= self.max_active:
+            return False
+        if not self.bandwidth_cap:
+            return True
+        in_use = sum(active.rate for active in self._active)
+        return in_use + self._expected_rate(ticket.addr) <= self.bandwidth_cap
+
+    def _next(self):
+        return min(self._waiting,
+                   key=lambda t: (t.priority, self._served.get(t.addr, 0), t.seq))
+
+    @contextlib.contextmanager
+    def transfer(self, addr, nbytes, priority=BULK):
+        """Block until the transfer may start, then measure it"""
+        with PROFILER.span("transfer admission", "transfer", device=addr, bytes=nbytes), self._cond:
+            self._seq += 1
+            ticket = _TransferTicket(addr, nbytes, priority, self._seq)
+            self._waiting.append(ticket)
+            while self._next() is not ticket or not self._can_start(ticket):
+                self._cond.wait(timeout=1.0)
+            self._waiting.remove(ticket)
+            ticket.rate = self._expected_rate(addr)
+            self._active.append(ticket)
+            self._served[addr] = self._served.get(addr, 0) + nbytes
+            self._cond.notify_all()
+
+        started = time.monotonic()
+        try:
+            with PROFILER.span("transfer", "transfer", device=addr, bytes=nbytes):
+                yield ticket
+        finally:
+            elapsed = time.monotonic() - started
+            with self._cond:
+                self._active.remove(ticket)
+                if nbytes >= self.MIN_SAMPLE_BYTES and elapsed > 0:
+                    measured = nbytes / elapsed
+                    previous = self._throughput.get(addr)
+                    self._throughput[addr] = measured if previous is None \
+                        else 0.7 * previous + 0.3 * measured
+                self._cond.notify_all()
+
+
+class DeviceInventory:
+    """Facts learned about each device that outlive a session (JSON, keyed by serial)"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._data = None  # Read on first use, normally by the startup thread
+
+    def _loaded(self):
+        if self._data is None:
+            self._data = {}
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if isinstance(data, dict):
+                    self._data = data
+            except (OSError, ValueError):
+                pass
+        return self._data
+
+    @staticmethod
+    def key_for(device):
+        return device.serial or device.addr
+
+    def get(self, key, field, default=None):
+        with self._lock:
+            return self._loaded().get(key, {}).get(field, default)
+
+    def items(self):
+        """Snapshot of (key, fields) for every known device"""
+        with self._lock:
+            return [(key, dict(fields)) for key, fields in self._loaded().items()]
+
+    def update(self, key, **fields):
+        with self._lock:
+            self._loaded().setdefault(key, {}).update(fields)
+            self._save()
+
+    def _save(self):
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+class StepTimingHistory:
+    """Durations of past install steps and measured device throughput
+
+    Kept as JSON next to the program; the last SAMPLES values per step are
+    used so estimates follow the current devices and network.
+    """
+
+    SAMPLES = 20
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._data = {"steps": {}, "throughput": [], "runs": []}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if isinstance(data.get("steps"), dict):
+                self._data = data
+                self._data.setdefault("throughput", [])
+                self._data.setdefault("runs", [])
+        except (OSError, ValueError):
+            pass
+
+    @staticmethod
+    def _median(values):
+        values = sorted(values)
+        return values[len(values) // 2] if values else None
+
+    def step_duration(self, step_id):
+        with self._lock:
+            return self._median(self._data["steps"].get(step_id, []))
+
+    def throughput(self):
+        """Typical bytes/s of one device transfer, or None before the first install"""
+        with self._lock:
+            return self._median(self._data["throughput"])
+
+    def run_durations(self, rebooted):
+        """Recorded end-to-end install times with or without a reboot"""
+        with self._lock:
+            return [run["seconds"] for run in self._data["runs"] if run["rebooted"] == rebooted]
+
+    def record(self, results, throughput=None, wall_time=None, rebooted=False):
+        """Store the durations of successful steps of one executor run"""
+        with self._lock:
+            if wall_time:
+                self._data["runs"].append({"seconds": round(wall_time, 1), "rebooted": rebooted})
+                del self._data["runs"][:-self.SAMPLES * 2]
+            for step_id, result in results.items():
+                if result.get("status") == "success" and "end" in result:
+                    samples = self._data["steps"].setdefault(step_id, [])
+                    samples.append(round(result["end"] - result["start"], 2))
+                    del samples[:-self.SAMPLES]
+            if throughput:
+                self._data["throughput"].append(round(throughput))
+                del self._data["throughput"][:-self.SAMPLES]
+            self._save()
+
+    def _save(self):
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._data, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+class AdaptiveTimeouts:
+    """Per-device, per-operation timeout budgets learned from recorded latencies
+
+    Learned operations are reconnects ("connect", "get-state"), the waits for
+    "reboot" and "adbd restart", and the adb commands of install plan steps,
+    keyed by step id and first word ("step locale:global shell settings") -
+    a step runs the same command every install, while one script name can
+    take milliseconds in one place and minutes in another. Other commands
+    and transfers keep their static timeouts.
+
+    Once MIN_SAMPLES exist the budget is the p99 latency times a margin, at
+    most MAX_FACTOR times the caller's static timeout, so old, slow units get
+    more time. It drops below the static timeout (to at least MIN_BUDGET)
+    only for an operation that has timed out on that device before, so a
+    fast unit fails fast on a hang but never on a one-off Wi-Fi hiccup. A
+    call that times out is recorded at its budget, which raises the next
+    one. Samples, current budgets and timed-out operations are kept in the
+    device inventory ("latency", "timeouts", "timed_out"), written at most
+    every FLUSH_INTERVAL seconds.
+    """
+
+    OPERATIONS = ("connect", "get-state", "reboot", "adbd restart")
+    STEP_PREFIX = "step "  # Operations of install plan steps
+    SAMPLES = 50
+    MIN_SAMPLES = 10
+    MARGIN = 3.0
+    MARGINS = {"reboot": 1.5, "adbd restart": 1.5}  # Boot times vary far less than command latencies
+    MIN_BUDGET = 2.0
+    MAX_FACTOR = 4.0
+    FLUSH_INTERVAL = 30.0
+
+    def __init__(self, inventory, key_for=None):
+        self.inventory = inventory
+        self.key_for = key_for or (lambda addr: addr)  # adb address -> inventory key (serial)
+        self._samples = {}  # inventory key -> {operation: [seconds]}
+        self._timed_out = {}  # inventory key -> operations that ever timed out
+        self._dirty = set()
+        self._flushed = time.monotonic()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def operation(cls, args, step=None):
+        """(device, operation) of an adb argument list, (None, None) if its timeout is not learned
+
+        `step` is the id of the install plan step issuing the command, if any.
+        """
+        device, rest = _trace_split(args)
+        if device is None:
+            if len(rest) == 2 and rest[0] == "connect":
+                return rest[1], "connect"
+            return None, None
+        if rest == ["get-state"]:
+            return device, "get-state"
+        if step is None or not rest:
+            return None, None
+        command = rest[0]
+        if command == "shell" and len(rest) > 1 and rest[1].strip():
+            command = f"shell {rest[1].split(None, 1)[0]}"
+        return device, f"{cls.STEP_PREFIX}{step} {command}"
+
+    @classmethod
+    def learned(cls, operation):
+        return operation in cls.OPERATIONS or operation.startswith(cls.STEP_PREFIX)
+
+    def _device_samples(self, key):
+        samples = self._samples.get(key)
+        if samples is None:
+            stored = self.inventory.get(key, "latency") or {}
+            samples = self._samples[key] = {op: list(values) for op, values in stored.items()
+                                            if self.learned(op) and isinstance(values, list)}
+            self._timed_out[key] = set(self.inventory.get(key, "timed_out") or ())
+        return samples
+
+    @staticmethod
+    def _p99(values):
+        ordered = sorted(values)
+        return ordered[min(len(ordered) - 1, int(round(0.99 * (len(ordered) - 1))))]
+
+    def budget(self, addr, operation, default):
+        """Timeout in seconds for `operation` on the device at addr (default until learned)"""
+        key = self.key_for(addr)
+        with self._lock:
+            values = self._device_samples(key).get(operation)
+            if not values or len(values) < self.MIN_SAMPLES:
+                return default
+            learned = self._p99(values) * self.MARGINS.get(operation, self.MARGIN)
+            # Below the static timeout only once this device has hung on the operation
+            floor = self.MIN_BUDGET if operation in self._timed_out[key] else default
+        return min(default * self.MAX_FACTOR, max(floor, learned))
+
+    def record(self, addr, operation, seconds, timed_out=False):
+        key = self.key_for(addr)
+        with self._lock:
+            values = self._device_samples(key).setdefault(operation, [])
+            values.append(round(seconds, 2))
+            del values[:-self.SAMPLES]
+            if timed_out:
+                self._timed_out[key].add(operation)
+            self._dirty.add(key)
+            due = time.monotonic() - self._flushed >= self.FLUSH_INTERVAL
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Write changed samples and the budgets they give to the inventory"""
+        with self._lock:
+            self._flushed = time.monotonic()
+            dirty, self._dirty = self._dirty, set()
+            updates = {}
+            for key in dirty:
+                samples = self._samples[key]
+                # Unclamped - the caller's static timeout is not known here
+                budgets = {op: round(self._p99(values) * self.MARGINS.get(op, self.MARGIN), 1)
+                           for op, values in samples.items() if len(values) >= self.MIN_SAMPLES}
+                updates[key] = ({op: list(values) for op, values in samples.items()}, budgets,
+                                sorted(self._timed_out[key]))
+        for key, (samples, budgets, timed_out) in updates.items():
+            try:
+                self.inventory.update(key, latency=samples, timeouts=budgets, timed_out=timed_out)
+            except OSError as e:
+                print(f"[DEBUG] Could not save learned timeouts: {str(e)}")
+
+
+# Estimates used before a step has any recorded history (seconds)
+DEFAULT_STEP_SECONDS = {"root": 3, "prepare": 1, "install_apk": 15, "grant": 1, "launch_app": 6,
+                        "monitor": 3, "mkdir": 1, "push_tree": 10, "push_file": 2,
+                        "fix_ownership": 2, "verify": 2, "shell": 1, "reboot": 45}
+ASSUMED_WIFI_CAPACITY = 20 * 1024 * 1024  # bytes/s shared by all kiosks when no cap is set
+
+
+def estimate_plan_duration(steps, history, transfer_bytes, throughput):
+    """Predict one device's install time as the longest path through the plan DAG
+
+    `steps` must be in compile order. Transfer steps with a known byte count
+    use `throughput`; everything else uses the median recorded duration.
+    """
+    finish = {}
+    for step in steps:
+        duration = history.step_duration(step.id)
+        if step.id in transfer_bytes and throughput:
+            duration = transfer_bytes[step.id] / throughput + 1
+        elif duration is None:
+            duration = DEFAULT_STEP_SECONDS.get(step.action, 2)
+        finish[step.id] = max((finish[dep] for dep in step.after), default=0) + duration
+    return max(finish.values(), default=0)
+
+
+def plan_batch_parallelism(durations, total_bytes, capacity, max_parallel=32):
+    """Return (best parallelism, predicted batch seconds, {parallelism: seconds})
+
+    Each level is the larger of the device makespan (longest-first onto k
+    slots) and the time the shared network needs for every byte. The best
+    level is the smallest one within 5% of the fastest.
+    """
+    if not durations:
+        return 1, 0, {}
+    network_floor = total_bytes / capacity if capacity else 0
+    predictions = {}
+    for parallel in range(1, min(max_parallel, len(durations)) + 1):
+        slots = [0.0] * parallel
+        for duration in sorted(durations, reverse=True):
+            slots[slots.index(min(slots))] += duration
+        predictions[parallel] = max(max(slots), network_floor)
+    fastest = min(predictions.values())
+    best = min(k for k, seconds in predictions.items() if seconds <= fastest * 1.05)
+    return best, predictions[best], predictions
+
+
+def parse_df_output(output):
+    """Available bytes per line of `df -k <paths>` (toybox or legacy Android df)"""
+    units = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3, "T": 1024 ** 4}
+    available = []
+    for line in output.splitlines():
+        parts = line.split()
+        if len(parts) < 4 or parts[0] == "Filesystem":
+            continue
+        value = parts[3]
+        if value.isdigit():
+            available.append(int(value) * 1024)  # 1K blocks
+        elif value[:-1].replace(".", "", 1).isdigit() and value[-1].upper() in units:
+            available.append(int(float(value[:-1]) * units[value[-1].upper()]))
+    return available
+
+
+# Default kiosk install plan. Steps form a DAG through "after"; steps whose
+# dependencies are complete run concurrently. "{package}" and other
+# "variables" are substituted into every string parameter.
+DEFAULT_INSTALL_PLAN = {
+    "name": "default",
+    "variables": {
+        "package": "com.releasetech.eightpresso.basic",
+        "korean_ime": "com.google.android.inputmethod.korean/.KoreanIme",
+    },
+    "steps": [
+        {"id": "root", "action": "root", "label": "루트 권한 요청", "required": False,
+         "checkpoint": False},
+        # Host-side only: hashes the source files while the device installs APKs
+        {"id": "prepare", "action": "prepare", "label": "설치 파일 준비 (해시)", "checkpoint": False},
+
+        {"id": "apk:rustdesk", "action": "install_apk", "apk": "rustdesk-1.1.9.apk", "after": ["root"]},
+        {"id": "apk:keyboard", "action": "install_apk", "apk": "hangulkeyboard.apk", "after": ["root"]},
+        {"id": "apk:easycard", "action": "install_apk", "apk": "EasyCard-A_v1.0.3.0_mod.apk",
+         "after": ["root"]},
+        {"id": "apk:app", "action": "install_apk", "apk": "EightPresso.apk", "after": ["root"]},
+
+        {"id": "grant:secure_settings", "action": "grant",
+         "permission": "android.permission.WRITE_SECURE_SETTINGS", "after": ["apk:app"]},
+        {"id": "grant:fine_location", "action": "grant",
+         "permission": "android.permission.ACCESS_FINE_LOCATION", "after": ["apk:app"]},
+        {"id": "grant:coarse_location", "action": "grant",
+         "permission": "android.permission.ACCESS_COARSE_LOCATION", "after": ["apk:app"]},
+        {"id": "grant:read_storage", "action": "grant",
+         "permission": "android.permission.READ_EXTERNAL_STORAGE", "after": ["apk:app"]},
+        {"id": "grant:write_storage", "action": "grant",
+         "permission": "android.permission.WRITE_EXTERNAL_STORAGE", "after": ["apk:app"]},
+        {"id": "grant:camera", "action": "grant",
+         "permission": "android.permission.CAMERA", "after": ["apk:app"]},
+
+        {"id": "launch", "action": "launch_app", "label": "앱 초기화 시작", "wait": 5,
+         "after": ["grant:secure_settings", "grant:fine_location", "grant:coarse_location",
+                   "grant:read_storage", "grant:write_storage", "grant:camera"]},
+        {"id": "monitor", "action": "monitor", "label": "설치 모니터링 (scrcpy)", "required": False,
+         "checkpoint": False, "after": ["launch"]},
+
+        {"id": "remount", "action": "shell", "command": ["remount"], "adb": True, "label": "remount",
+         "required": False, "quiet": True, "checkpoint": False, "after": ["root"]},
+        # Shared storage does not depend on the app, so bulk media starts right after root
+        {"id": "mkdir:sdcard", "action": "mkdir", "label": "SD카드 디렉토리 생성", "required": False,
+         "checkpoint": False, "after": ["root"], "paths": ["/sdcard/Android/data/{package}/files"]},
+        {"id": "mkdir", "action": "mkdir", "label": "디렉토리 생성", "required": False,
+         "checkpoint": False, "after": ["launch", "remount"],
+         "paths": ["/data/data/{package}/files", "/data/data/{package}/databases",
+                   "/data/data/{package}/shared_prefs"]},
+
+        {"id": "push:sdcard", "action": "push_tree", "label": "SD카드", "source": "sdcard/files",
+         "target": "/sdcard/Android/data/{package}/files", "timeout": 600, "retries": 3,
+         "relay": True, "required": False, "checkpoint": False, "after": ["mkdir:sdcard", "prepare"]},
+        {"id": "push:app_files", "action": "push_tree", "label": "앱 파일", "source": "data/files",
+         "target": "/data/data/{package}/files", "timeout": 300,
+         "required": False, "checkpoint": False, "after": ["mkdir", "prepare"]},
+        {"id": "push:database", "action": "push_file", "label": "DB", "source": "data/MainDatabase.db",
+         "target": "/data/data/{package}/databases/", "timeout": 120,
+         "required": False, "after": ["mkdir", "prepare"]},
+        {"id": "push:prefs", "action": "push_file", "label": "설정",
+         "source": "data/{package}_preferences.xml",
+         "target": "/data/data/{package}/shared_prefs/", "timeout": 60,
+         "required": False, "after": ["mkdir", "prepare"]},
+
+        # Hashes every pushed file on the device and re-pushes mismatches before ownership is fixed
+        {"id": "verify", "action": "verify", "label": "파일 검증", "required": False,
+         "checkpoint": False, "after": ["push:sdcard", "push:app_files", "push:database", "push:prefs"]},
+        {"id": "ownership", "action": "fix_ownership", "label": "소유권", "required": False,
+         "checkpoint": False, "paths": ["/data/data/{package}", "/sdcard/Android/data/{package}"],
+         "after": ["verify"]},
+        {"id": "force_stop", "action": "shell", "label": "앱 중지",
+         "command": ["am", "force-stop", "{package}"], "after": ["ownership", "monitor"]},
+
+        # "check"/"expect": a setting that already has the value is reported as unchanged
+        {"id": "locale:global", "action": "shell", "label": "시스템 언어 설정 (global)",
+         "command": ["settings", "put", "global", "system_locales", "ko-KR"],
+         "check": ["settings", "get", "global", "system_locales"], "expect": "ko-KR", "after": ["root"]},
+        {"id": "locale:system", "action": "shell", "label": "시스템 언어 설정 (system)",
+         "command": ["settings", "put", "system", "system_locales", "ko-KR"],
+         "check": ["settings", "get", "system", "system_locales"], "expect": "ko-KR", "after": ["root"]},
+        {"id": "locale:language", "action": "shell", "label": "persist.sys.language",
+         "command": ["setprop", "persist.sys.language", "ko"],
+         "check": ["getprop", "persist.sys.language"], "expect": "ko", "after": ["root"]},
+        {"id": "locale:country", "action": "shell", "label": "persist.sys.country",
+         "command": ["setprop", "persist.sys.country", "KR"],
+         "check": ["getprop", "persist.sys.country"], "expect": "KR", "after": ["root"]},
+        {"id": "ime:enable", "action": "shell", "label": "키보드 활성화",
+         "command": ["ime", "enable", "{korean_ime}"], "after": ["apk:keyboard"]},
+        {"id": "ime:set", "action": "shell", "label": "키보드 설정",
+         "command": ["ime", "set", "{korean_ime}"], "after": ["ime:enable"]},
+
+        # Barrier: runs after every step that does not come after it. Only the locale is read
+        # at boot; IME and home activity apply live, so the reboot is skipped when no locale
+        # setting changed.
+        {"id": "reboot", "action": "reboot", "label": "디바이스 재부팅", "max_wait": 60, "settle": 5,
+         "when_changed": ["locale:global", "locale:system", "locale:language", "locale:country"]},
+
+        {"id": "ime:reenable", "action": "shell", "label": "키보드 재활성화",
+         "command": ["ime", "enable", "{korean_ime}"], "after": ["reboot"]},
+        {"id": "ime:reset", "action": "shell", "label": "키보드 재설정",
+         "command": ["ime", "set", "{korean_ime}"], "after": ["ime:reenable"]},
+        {"id": "set_home", "action": "shell", "label": "홈 앱 설정",
+         "command": ["cmd", "package", "set-home-activity", "{package}/.MainActivity"],
+         "after": ["reboot"]},
+        {"id": "home:start", "action": "shell", "label": "홈 앱 실행", "checkpoint": False,
+         "command": ["am", "start", "-a", "android.intent.action.MAIN",
+                     "-c", "android.intent.category.HOME"], "after": ["set_home"]},
+    ],
+}
+
+
+MMAP_THRESHOLD = 8 * 1024 * 1024  # Files at least this large (APKs, videos) are memory-mapped
+
+
+def hash_file(path, chunk_size=1024 * 1024):
+    """MD5 of a file (matches `md5sum` on the device)"""
+    digest = hashlib.md5()
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size >= MMAP_THRESHOLD:
+            # One update over the mapping: no read() copies, and hashlib drops the GIL
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+                digest.update(view)
+        else:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _hash_batch(paths):
+    """Worker task: MD5 of each path"""
+    return [hash_file(path) for path in paths]
+
+
+def _pack_file(path, part_path, level=6, chunk_size=1024 * 1024):
+    """Worker task for InstallBundle.build: zlib-compress one file into part_path
+
+    Returns (size, md5, length, compression). When compression saves less
+    than 10% the part is removed and the file is to be stored as is.
+    """
+    digest = hashlib.md5()
+    compressor = zlib.compressobj(level)
+    size = 0
+    with open(path, "rb") as f, open(part_path, "wb") as out:
+        total = os.fstat(f.fileno()).st_size
+        if total >= MMAP_THRESHOLD:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+                digest.update(view)
+                for offset in range(0, total, chunk_size):
+                    out.write(compressor.compress(view[offset:offset + chunk_size]))
+            size = total
+        else:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                size += len(chunk)
+                digest.update(chunk)
+                out.write(compressor.compress(chunk))
+        out.write(compressor.flush())
+        length = out.tell()
+    if length >= size * 0.9:
+        # Already compressed data (APKs, images, video)
+        os.remove(part_path)
+        return size, digest.hexdigest(), size, "none"
+    return size, digest.hexdigest(), length, "zlib"
+
+
+class ComputePool:
+    """Worker processes for CPU-bound file work (hashing, bundle compression)
+
+    Keeps MD5 and zlib of large sources off the threads that scan, install and
+    run the Tk loop. Shared by installs, backups and bundle building; the pool
+    starts on first use and falls back to the calling thread when processes
+    cannot be started. Hashes are cached by (path, size, mtime), so devices
+    installing the same source at once hash each file only once.
+    """
+
+    BATCH_BYTES = 16 * 1024 * 1024  # Small files are hashed several per task
+    BATCH_FILES = 64
+    INLINE_BYTES = 1024 * 1024      # Below this a process round trip costs more than it saves
+    CACHE_SIZE = 50000
+
+    def __init__(self, workers=None):
+        self.workers = workers or max(1, min(8, (os.cpu_count() or 2) - 1))
+        self._executor = None
+        self._broken = False
+        self._lock = threading.Lock()
+        self._hashes = {}  # (path, size, mtime_ns) -> md5, or (Future, index) while hashing
+
+    def _pool(self):
+        with self._lock:
+            if self._broken:
+                return None
+            if self._executor is None:
+                try:
+                    # Imported here: multiprocessing is only loaded once there is work for it
+                    from concurrent.futures import ProcessPoolExecutor
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                except (OSError, NotImplementedError, ImportError) as e:
+                    print(f"[DEBUG] Compute pool unavailable, using threads: {str(e)}")
+                    self._broken = True
+            return self._executor
+
+    def submit(self, fn, *args):
+        """Run fn(*args) in a worker process; returns a Future"""
+        pool = self._pool()
+        if pool is not None:
+            try:
+                return pool.submit(fn, *args)
+            except (BrokenExecutor, RuntimeError) as e:
+                print(f"[DEBUG] Compute pool failed, using threads: {str(e)}")
+                with self._lock:
+                    self._broken = True
+        future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def hash_files(self, paths):
+        """{path: md5} for paths, hashing in worker processes what is not cached yet"""
+        keys = {}
+        for path in paths:
+            stat = os.stat(path)
+            keys[path] = (str(path), stat.st_size, stat.st_mtime_ns)
+
+        waiting = {}
+        batch, batch_bytes, batches = [], 0, []
+        with self._lock:
+            if len(self._hashes) > self.CACHE_SIZE:
+                self._hashes.clear()
+            for path, key in keys.items():
+                cached = self._hashes.get(key)
+                if cached is not None:
+                    waiting[path] = cached
+                    continue
+                batch.append(path)
+                batch_bytes += key[1]
+                if len(batch) >= self.BATCH_FILES or batch_bytes >= self.BATCH_BYTES:
+                    batches.append(batch)
+                    batch, batch_bytes = [], 0
+            if batch:
+                batches.append(batch)
+            for batch in batches:
+                # Reserved under the lock so a concurrent call waits for these instead
+                future = Future()
+                for index, path in enumerate(batch):
+                    self._hashes[keys[path]] = waiting[path] = (future, index)
+
+        total = sum(keys[path][1] for batch in batches for path in batch)
+        for batch in batches:
+            placeholder = waiting[batch[0]][0]
+            if total < self.INLINE_BYTES:
+                work = Future()
+                try:
+                    work.set_result(_hash_batch(batch))
+                except Exception as e:
+                    work.set_exception(e)
+            else:
+                work = self.submit(_hash_batch, [str(path) for path in batch])
+            work.add_done_callback(lambda done, placeholder=placeholder: self._settle(done, placeholder))
+
+        hashes = {}
+        for path, entry in waiting.items():
+            if isinstance(entry, str):
+                hashes[path] = entry
+                continue
+            future, index = entry
+            try:
+                hashes[path] = future.result()[index]
+            except BrokenExecutor:
+                # A worker died (killed, out of memory) - finish here and stop using the pool
+                with self._lock:
+                    self._broken = True
+                hashes[path] = hash_file(path)
+            except Exception:
+                with self._lock:
+                    self._hashes.pop(keys[path], None)
+                raise
+            with self._lock:
+                self._hashes[keys[path]] = hashes[path]
+        return hashes
+
+    @staticmethod
+    def _settle(done, placeholder):
+        if done.exception() is not None:
+            placeholder.set_exception(done.exception())
+        else:
+            placeholder.set_result(done.result())
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Process-wide so installs, backups and bundle building share the workers and the hash cache
+COMPUTE = ComputePool()
+
+
+def build_source_manifest(local_path):
+    """Return {relative path: (size, md5)} for a file or every file under a directory"""
+    local_path = Path(local_path)
+    if local_path.is_file():
+        paths = {local_path.name: local_path}
+    else:
+        paths = {path.relative_to(local_path).as_posix(): path
+                 for path in sorted(local_path.rglob('*')) if path.is_file()}
+    hashes = COMPUTE.hash_files(list(paths.values()))
+    return {rel: (path.stat().st_size, hashes[path]) for rel, path in paths.items()}
+
+
+BUNDLE_MAGIC = b"RT1018B\x01"
+BUNDLE_MANIFEST_NAME = "bundle_manifest.json"  # Written last into an extracted bundle
+BUNDLE_SUFFIX = ".rtb"
+
+
+class InstallBundle:
+    """Single-file install source built once and reused for every device
+
+    Layout: magic, 4-byte big-endian header length, JSON header (per-file
+    size, md5, mtime, payload offset/length, compression), then the payload.
+    Each file is compressed on its own - or stored when zlib does not help,
+    as for APKs and images - so any file can be read without the others.
+    """
+
+    CHUNK_SIZE = 1024 * 1024
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            if f.read(len(BUNDLE_MAGIC)) != BUNDLE_MAGIC:
+                raise ValueError(f"설치 번들 형식이 아님: {self.path.name}")
+            (length,) = struct.unpack(">I", f.read(4))
+            raw_header = f.read(length)
+        try:
+            if len(raw_header) != length:
+                raise ValueError("truncated header")
+            self.header = json.loads(raw_header.decode("utf-8"))
+            self.files = {entry["path"]: entry for entry in self.header["files"]}
+        except (ValueError, KeyError, TypeError) as e:
+            raise ValueError(f"손상된 설치 번들: {self.path.name} ({str(e)})")
+        self.bundle_id = hashlib.md5(raw_header).hexdigest()
+        self.payload_offset = len(BUNDLE_MAGIC) + 4 + length
+
+    @classmethod
+    def build(cls, source_dir, bundle_path):
+        """Pack every file under source_dir into bundle_path and return the opened bundle
+
+        Files are hashed and compressed in parallel by the compute pool, each
+        into its own part file; the parts are then joined in path order.
+        """
+        source_dir = Path(source_dir)
+        bundle_path = Path(bundle_path)
+        parts_dir = bundle_path.with_suffix(".parts.tmp")
+        if parts_dir.exists():
+            shutil.rmtree(parts_dir)  # Left over from an interrupted build
+        parts_dir.mkdir(parents=True)
+        tmp_path = bundle_path.with_suffix(".tmp")
+        futures = []
+        try:
+            paths = [path for path in sorted(source_dir.rglob('*')) if path.is_file()]
+            futures = [COMPUTE.submit(_pack_file, str(path), str(parts_dir / f"{index}.part"))
+                       for index, path in enumerate(paths)]
+            entries = []
+            offset = 0
+            for index, (path, future) in enumerate(zip(paths, futures)):
+                size, md5, length, compression = future.result()
+                entries.append({"path": path.relative_to(source_dir).as_posix(), "size": size,
+                                "md5": md5, "mtime": int(path.stat().st_mtime),
+                                "offset": offset, "length": length, "compression": compression,
+                                "part": parts_dir / f"{index}.part" if compression == "zlib" else path})
+                offset += length
+
+            header = json.dumps({"version": 1, "source": source_dir.name,
+                                 "created": datetime.now().isoformat(timespec="seconds"),
+                                 "files": [{key: value for key, value in entry.items() if key != "part"}
+                                           for entry in entries]}, ensure_ascii=False).encode("utf-8")
+            with open(tmp_path, "wb") as out:
+                out.write(BUNDLE_MAGIC)
+                out.write(struct.pack(">I", len(header)))
+                out.write(header)
+                for entry in entries:
+                    with open(entry["part"], "rb") as part:
+                        shutil.copyfileobj(part, out, cls.CHUNK_SIZE)
+                    if out.tell() != len(BUNDLE_MAGIC) + 4 + len(header) + entry["offset"] + entry["length"]:
+                        raise ValueError(f"파일이 번들 생성 중 변경됨: {entry['path']}")
+            os.replace(tmp_path, bundle_path)
+        finally:
+            for future in futures:
+                future.cancel()
+            shutil.rmtree(parts_dir, ignore_errors=True)
+            if tmp_path.exists():
+                tmp_path.unlink()
+        return cls(bundle_path)
+
+    def iter_file(self, rel):
+        """Yield the decompressed content of one file in chunks"""
+        entry = self.files[rel]
+        decompressor = zlib.decompressobj() if entry["compression"] == "zlib" else None
+        with open(self.path, "rb") as f:
+            f.seek(self.payload_offset + entry["offset"])
+            remaining = entry["length"]
+            while remaining:
+                chunk = f.read(min(self.CHUNK_SIZE, remaining))
+                if not chunk:
+                    raise ValueError(f"손상된 설치 번들: {self.path.name}")
+                remaining -= len(chunk)
+                yield decompressor.decompress(chunk) if decompressor else chunk
+        if decompressor:
+            yield decompressor.flush()
+
+    def read(self, rel):
+        return b"".join(self.iter_file(rel))
+
+    def extract(self, dest_dir):
+        """Write every file under dest_dir (mtimes preserved) and mark the extraction complete"""
+        dest_dir = Path(dest_dir)
+        for rel, entry in self.files.items():
+            target = dest_dir / rel
+            target.parent.mkdir(parents=True, exist_ok=True)
+            digest = hashlib.md5()
+            with open(target, "wb") as out:
+                for chunk in self.iter_file(rel):
+                    digest.update(chunk)
+                    out.write(chunk)
+            if digest.hexdigest() != entry["md5"]:
+                raise ValueError(f"설치 번들 해시 불일치: {rel}")
+            os.utime(target, (entry["mtime"], entry["mtime"]))
+        with open(dest_dir / BUNDLE_MANIFEST_NAME, "w", encoding="utf-8") as f:
+            json.dump(self.header, f, ensure_ascii=False)
+        return dest_dir
+
+
+def bundle_manifest_for(files, rel_source):
+    """Slice a bundle's file table to one push source: {relative path: (size, md5)}"""
+    prefix = rel_source.strip("/")
+    if prefix in files:
+        entry = files[prefix]
+        return {Path(prefix).name: (entry["size"], entry["md5"])}
+    return {path[len(prefix) + 1:]: (entry["size"], entry["md5"])
+            for path, entry in files.items() if path.startswith(prefix + "/")}
+
+
+class _RelayRequestHandler:
+    """Serves files under the relay root with HEAD and single byte-range support
+
+    Only paths under /<token>/ are served, so a device has to be told the URL.
+
+    Mixed into http.server.BaseHTTPRequestHandler by RelayServer, so http.server
+    is only imported when relay mode is used.
+    """
+
+    server_version = "RT1018Relay/1.0"
+
+    def log_request(self, code="-", size="-"):
+        pass  # One line per file is too noisy; errors still go through log_message
+
+    def log_message(self, format, *args):
+        print(f"[DEBUG] Relay {self.client_address[0]}: {format % args}")
+
+    def _resolve(self):
+        url_path = urllib.parse.unquote(urllib.parse.urlsplit(self.path).path)
+        token, _, rel = url_path.lstrip("/").partition("/")
+        if not secrets.compare_digest(token.encode("utf-8"), self.server.token.encode("utf-8")):
+            return None
+        root = self.server.root
+        path = (root / rel).resolve()
+        if root not in path.parents or not path.is_file():
+            return None
+        return path
+
+    def do_HEAD(self):
+        self._send(head=True)
+
+    def do_GET(self):
+        self._send(head=False)
+
+    def _send(self, head):
+        path = self._resolve()
+        if path is None:
+            self.send_error(404)
+            return
+        size = path.stat().st_size
+        start, end, status = 0, size - 1, 200
+        range_header = self.headers.get("Range")
+        if range_header:
+            match = re.match(r"bytes=(\d*)-(\d*)$", range_header.strip())
+            if match and match.group(1):
+                start = int(match.group(1))
+                end = min(int(match.group(2)), size - 1) if match.group(2) else size - 1
+            elif match and match.group(2):
+                start = max(0, size - int(match.group(2)))  # Suffix range: last N bytes
+            if not match or not (match.group(1) or match.group(2)) or start > end:
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{size}")
+                self.end_headers()
+                return
+            status = 206
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Length", str(end - start + 1))
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.end_headers()
+        if head:
+            return
+        with open(path, "rb") as f:
+            f.seek(start)
+            remaining = end - start + 1
+            while remaining:
+                chunk = f.read(min(1024 * 1024, remaining))
+                if not chunk:
+                    break
+                self.wfile.write(chunk)
+                remaining -= len(chunk)
+                self.server.bytes_served += len(chunk)
+
+
+class RelayServer:
+    """Lightweight HTTP server for devices that can download the media set themselves
+
+    Listens only on `bind_ip` (the interface facing the kiosks) and serves
+    files only under a random token path, so other clients on the store
+    network cannot list or download the media set.
+    """
+
+    def __init__(self, root, bind_ip, port=0):
+        import http.server
+        handler = type("RelayRequestHandler",
+                       (_RelayRequestHandler, http.server.BaseHTTPRequestHandler), {})
+        self._httpd = http.server.ThreadingHTTPServer((bind_ip, port), handler)
+        self._httpd.daemon_threads = True
+        self._httpd.root = self.root = Path(root).resolve()
+        self._httpd.token = secrets.token_urlsafe(16)
+        self._httpd.bytes_served = 0
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True,
+                                        name="relay-http")
+        self._thread.start()
+
+    @property
+    def port(self):
+        return self._httpd.server_address[1]
+
+    @property
+    def url(self):
+        """Base URL of the served tree (no trailing slash)"""
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/{self._httpd.token}"
+
+    @property
+    def bytes_served(self):
+        return self._httpd.bytes_served
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+def local_ip_for(remote_ip):
+    """Host address on the interface that routes to remote_ip"""
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.connect((remote_ip, 9))
+        return sock.getsockname()[0]
+
+
+class _RelayPeer:
+    __slots__ = ("addr", "ip", "group", "source_id", "remote_dir", "busy")
+
+    def __init__(self, addr, ip, group, source_id, remote_dir):
+        self.addr = addr
+        self.ip = ip
+        self.group = group
+        self.source_id = source_id
+        self.remote_dir = remote_dir
+        self.busy = False
+
+
+class MediaRelay:
+    """Optional relay for bulk media so the host does not send every copy itself
+
+    A device that finished a relay-enabled push becomes a peer for that media
+    set: later devices stream a tar of it over the store network with toybox
+    `nc`. Without a free peer, a device that has curl or wget downloads from
+    the host's RelayServer (resumable through Range requests). Anything the
+    relay did not deliver intact is pushed over adb by the caller.
+    """
+
+    PEER_PORT = 18018
+    PEER_READY_TIMEOUT = 15  # Seconds for a peer's `nc -l` to start listening
+    BATCH_FILES = 40  # Files per shell round trip for HTTP downloads and peer file lists
+    PEER_FILE_LIST = "/data/local/tmp/rt1018_relay_files.txt"  # Paths a peer streams
+
+    def __init__(self, run_adb, log, http_port=0):
+        self.run_adb = run_adb
+        self.log = log
+        self.http_port = http_port
+        self._lock = threading.Lock()
+        self._servers = {}  # (resolved root, bind ip) -> RelayServer; devices may still be downloading
+        self._peers = []
+        self._tools = {}  # addr -> set of available device commands
+
+    def device_tools(self, addr):
+        with self._lock:
+            if addr in self._tools:
+                return self._tools[addr]
+        try:
+            output = self.run_adb(addr, ["shell", "for t in curl wget nc tar; do "
+                                         "command -v $t >/dev/null && echo $t; done"])
+            tools = set(output.split())
+        except Exception:
+            tools = set()
+        with self._lock:
+            self._tools[addr] = tools
+        return tools
+
+    def add_peer(self, addr, ip, group, source_id, remote_dir):
+        if not {"nc", "tar"} <= self.device_tools(addr):
+            return
+        with self._lock:
+            self._peers = [peer for peer in self._peers if peer.addr != addr or peer.group != group]
+            self._peers.append(_RelayPeer(addr, ip, group, source_id, remote_dir))
+
+    def remove_peer(self, addr):
+        with self._lock:
+            self._peers = [peer for peer in self._peers if peer.addr != addr]
+
+    def _claim_peer(self, addr, group, source_id):
+        with self._lock:
+            for peer in self._peers:
+                if (peer.group == group and peer.source_id == source_id and not peer.busy
+                        and peer.addr != addr):
+                    peer.busy = True
+                    return peer
+        return None
+
+    def server_for(self, root, bind_ip):
+        """The HTTP server for one source root on one host interface, kept until stop()"""
+        root = Path(root).resolve()
+        with self._lock:
+            server = self._servers.get((root, bind_ip))
+            if server is None:
+                # A fixed http_port fits only one server, later ones get a free port
+                port = self.http_port if not self._servers else 0
+                server = self._servers[(root, bind_ip)] = RelayServer(root, bind_ip, port)
+                print(f"[DEBUG] Relay HTTP server on {bind_ip}:{server.port} for {root}")
+            return server
+
+    def fetch_tree(self, addr, ip, group, source_id, source_root, rel_source, remote_dir, files,
+                   timeout=600):
+        """Deliver a media tree to a device without adb push; returns the method used or None"""
+        tools = self.device_tools(addr)
+        if {"nc", "tar"} <= tools:
+            peer = self._claim_peer(addr, group, source_id)
+            if peer is not None:
+                try:
+                    self._fetch_from_peer(peer, addr, remote_dir, files, timeout)
+                    return f"peer {peer.ip}"
+                except Exception as e:
+                    self.log(f"  피어 {peer.ip} 전송 실패, 다른 방법 사용: {str(e)}", "WARNING")
+                    self.remove_peer(peer.addr)
+                finally:
+                    peer.busy = False
+        if "curl" in tools or "wget" in tools:
+            self._fetch_from_host(addr, ip, tools, source_root, rel_source, remote_dir, files, timeout)
+            return "host HTTP"
+        return None
+
+    def _peer_listening(self, peer):
+        """True once the peer has a TCP socket listening on PEER_PORT (state 0A in /proc/net/tcp)"""
+        pattern = f":{self.PEER_PORT:04X} [0-9A-Fa-f]+:[0-9A-Fa-f]+ 0A"
+        output = self.run_adb(peer.addr, ["shell", f"grep -qE {shell_quote(pattern)} "
+                                          f"/proc/net/tcp /proc/net/tcp6 2>/dev/null && echo up"],
+                              timeout=5)
+        return "up" in output
+
+    def _stop_peer_server(self, peer):
+        try:
+            self.run_adb(peer.addr, ["shell", f"pkill -f {shell_quote(f'nc -q 1 -l -p {self.PEER_PORT}')}"],
+                         timeout=10)
+        except Exception as e:
+            print(f"[DEBUG] Could not stop relay listener on {peer.addr}: {str(e)}")
+
+    def _write_peer_file_list(self, peer, files):
+        """Store the pending paths on the peer, BATCH_FILES per shell round trip"""
+        rels = sorted(files)
+        target = shell_quote(self.PEER_FILE_LIST)
+        self.run_adb(peer.addr, ["shell", f": > {target}"], timeout=10)
+        for i in range(0, len(rels), self.BATCH_FILES):
+            quoted = " ".join(shell_quote(rel) for rel in rels[i:i + self.BATCH_FILES])
+            self.run_adb(peer.addr, ["shell", f"printf '%s\\n' {quoted} >> {target}"], timeout=10)
+
+    def _fetch_from_peer(self, peer, addr, remote_dir, files, timeout):
+        # Only the pending files: the peer's copy also holds runtime files its app wrote since
+        self._write_peer_file_list(peer, files)
+        serve_error = []
+
+        def serve():
+            try:
+                self.run_adb(peer.addr, ["shell", f"cd {shell_quote(peer.remote_dir)} && "
+                                         f"tar -cf - -T {shell_quote(self.PEER_FILE_LIST)} | "
+                                         f"nc -q 1 -l -p {self.PEER_PORT}"], timeout=timeout)
+            except Exception as e:
+                serve_error.append(e)
+
+        server = threading.Thread(target=serve, daemon=True)
+        server.start()
+        try:
+            # Connecting before the peer listens would end the client at once and leave
+            # the peer waiting for the whole timeout
+            deadline = time.monotonic() + self.PEER_READY_TIMEOUT
+            while not self._peer_listening(peer):
+                if serve_error:
+                    raise serve_error[0]
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"peer {peer.ip} did not start listening")
+                time.sleep(0.3)
+            quoted = shell_quote(remote_dir)
+            self.run_adb(addr, ["shell", f"mkdir -p {quoted} && cd {quoted} && "
+                                f"nc {peer.ip} {self.PEER_PORT} | tar -xf -"], timeout=timeout)
+            server.join(timeout=10)
+        finally:
+            if server.is_alive():
+                self._stop_peer_server(peer)
+                server.join(timeout=10)
+                if not serve_error:
+                    serve_error.append(RuntimeError(f"peer {peer.ip} did not finish sending"))
+        if serve_error:
+            raise serve_error[0]
+
+    def _fetch_from_host(self, addr, ip, tools, source_root, rel_source, remote_dir, files, timeout):
+        # Only the relayed tree is exposed, never the app data next to it
+        server = self.server_for(Path(source_root) / rel_source, local_ip_for(ip))
+        base_url = server.url
+        if "curl" in tools:
+            fetch = 'curl -sf -C - -o "$f" "$u"'  # Resumes partial files with a Range request
+        else:
+            fetch = 'wget -q -O "$f" "$u"'
+        rels = sorted(files)
+        quoted = shell_quote(remote_dir)
+        for i in range(0, len(rels), self.BATCH_FILES):
+            pairs = " ".join(f"{shell_quote(rel)} {shell_quote(f'{base_url}/{urllib.parse.quote(rel)}')}"
+                             for rel in rels[i:i + self.BATCH_FILES])
+            script = (f"mkdir -p {quoted} && cd {quoted} && set -- {pairs}; "
+                      f'while [ $# -gt 0 ]; do f=$1; u=$2; shift 2; '
+                      f'mkdir -p "$(dirname "$f")"; {fetch} || echo "FAIL $f"; done')
+            self.run_adb(addr, ["shell", script], timeout=timeout)
+
+    def stop(self):
+        with self._lock:
+            for server in self._servers.values():
+                server.stop()
+            self._servers = {}
+            self._peers = []
+            self._tools = {}
+
+
+class PlanStep:
+    """One compiled node of an install plan"""
+
+    __slots__ = ("id", "action", "params", "after", "required", "checkpoint", "quiet",
+                 "retries", "label")
+
+    def __init__(self, spec, variables):
+        spec = dict(spec)
+        self.id = spec.pop("id")
+        self.action = spec.pop("action")
+        self.after = tuple(spec.pop("after", ()))
+        self.required = bool(spec.pop("required", True))
+        self.checkpoint = bool(spec.pop("checkpoint", True))
+        self.quiet = bool(spec.pop("quiet", False))
+        self.retries = max(1, int(spec.pop("retries", 1)))
+        self.params = _substitute_plan_variables(spec, variables)
+        self.label = self.params.pop("label", None)
+        if not self.label and self.action == "install_apk":
+            self.label = f"APK 설치: {self.params.get('apk')}"
+        elif not self.label and self.action == "grant":
+            self.label = f"권한 부여: {str(self.params.get('permission')).rsplit('.', 1)[-1]}"
+        self.label = self.label or self.id
+
+
+def _substitute_plan_variables(value, variables):
+    if isinstance(value, str):
+        for name, replacement in variables.items():
+            value = value.replace("{" + name + "}", str(replacement))
+        return value
+    if isinstance(value, list):
+        return [_substitute_plan_variables(item, variables) for item in value]
+    if isinstance(value, dict):
+        return {key: _substitute_plan_variables(item, variables) for key, item in value.items()}
+    return value
+
+
+def compile_install_plan(plan):
+    """Validate a plan and return its steps in a dependency-respecting order"""
+    variables = plan.get("variables", {})
+    steps = [PlanStep(spec, variables) for spec in plan.get("steps", [])]
+    by_id = {}
+    for step in steps:
+        if step.id in by_id:
+            raise ValueError(f"설치 계획 오류: 중복된 단계 ID '{step.id}'")
+        if step.action not in InstallPlanExecutor.ACTIONS:
+            raise ValueError(f"설치 계획 오류: 알 수 없는 동작 '{step.action}' ({step.id})")
+        by_id[step.id] = step
+    for step in steps:
+        for dep in step.after:
+            if dep not in by_id:
+                raise ValueError(f"설치 계획 오류: '{step.id}'의 선행 단계 '{dep}' 없음")
+
+    # Reboot-like steps are barriers: they also wait for every step that does not depend on them
+    for step in steps:
+        if step.params.pop("barrier", step.action == "reboot"):
+            descendants = {step.id}
+            changed = True
+            while changed:
+                changed = False
+                for other in steps:
+                    if other.id not in descendants and descendants.intersection(other.after):
+                        descendants.add(other.id)
+                        changed = True
+            step.after = tuple(other.id for other in steps if other.id not in descendants)
+
+    # Kahn's algorithm - also rejects cycles
+    remaining = {step.id: set(step.after) for step in steps}
+    ordered = []
+    while remaining:
+        ready = [step_id for step_id, deps in remaining.items() if not deps]
+        if not ready:
+            raise ValueError(f"설치 계획 오류: 순환 의존성 ({', '.join(sorted(remaining))})")
+        for step_id in ready:
+            ordered.append(by_id[step_id])
+            del remaining[step_id]
+        for deps in remaining.values():
+            deps.difference_update(ready)
+    return ordered
+
+
+def load_install_plan(path):
+    """Load a plan profile from a JSON or YAML file"""
+    path = Path(path)
+    with open(path, "r", encoding="utf-8") as f:
+        if path.suffix.lower() in (".yaml", ".yml"):
+            if not HAS_YAML:
+                raise ValueError(f"YAML 계획을 읽으려면 PyYAML이 필요합니다: {path.name}")
+            import yaml
+            plan = yaml.safe_load(f)
+        else:
+            plan = json.load(f)
+    plan.setdefault("name", path.stem)
+    # Profiles may override only some variables of the default plan
+    variables = dict(DEFAULT_INSTALL_PLAN["variables"])
+    variables.update(plan.get("variables", {}))
+    plan["variables"] = variables
+    if "steps" not in plan:
+        plan["steps"] = DEFAULT_INSTALL_PLAN["steps"]
+    return plan
+
+
+class StepFailed(Exception):
+    """A required install step failed"""
+
+
+class InstallPlanExecutor:
+    """Runs a compiled install plan on one device, overlapping independent steps
+
+    `host` supplies the device plumbing (log, run_adb_command, transports,
+    transfers, reboots, reboot_wait, relay, inventory, history, push_tree_resumable, list_remote_file_sizes,
+    get_error_message, files_dir, on_install_monitor, on_transfer_progress). Steps that move data over the link share
+    `max_transfers` slots so concurrent pushes do not split one device's
+    bandwidth too thin, and every transfer is admitted by the host's global
+    TransferScheduler.
+    """
+
+    ACTIONS = ("root", "prepare", "install_apk", "grant", "launch_app", "monitor", "mkdir",
+               "push_tree", "push_file", "fix_ownership", "verify", "shell", "reboot")
+    TRANSFER_ACTIONS = ("install_apk", "push_tree", "push_file")
+    MAX_CHANGED_FILES = 64  # Beyond this a tree is chown'd recursively instead of per file
+
+    def __init__(self, host, plan, device, source, journal, max_parallel=4, max_transfers=2,
+                 log_prefix=""):
+        self.host = host
+        self.plan = plan
+        self.steps = compile_install_plan(plan)
+        self.variables = plan.get("variables", {})
+        self.device = device
+        self.device_addr = device.addr
+        self.source = Path(source)
+        self.journal = journal
+        self.max_parallel = plan.get("max_parallel", max_parallel)
+        self.results = {}  # step id -> {"status", "error", "start", "end"}
+        self.manifest = {}  # push step id -> {relative path: (size, md5)}, filled by "prepare"
+        self.critical_path = []
+        self.pushed_this_run = 0
+        self.changed_paths = {}  # remote path -> recursive, for the ownership fix-up
+        self._md5_tool = None    # Device md5sum command ("" when it has none), probed by verify
+        self.rebooted = False
+        self.wall_time = None
+        self._lock = threading.Lock()
+        self._transfer_slots = threading.Semaphore(plan.get("max_transfers", max_transfers))
+        self._current = threading.local()  # .step: the step running on this worker thread
+        self.log_prefix = log_prefix
+
+    def log(self, message, level="INFO"):
+        self.host.log(f"{self.log_prefix}{message}", level)
+
+    def adb(self, command, timeout=60, watch=False, progress=None, nbytes=None):
+        step = getattr(self._current, "step", None)  # Keys the command's learned timeout
+        return self.host.run_adb_command(self.device_addr, command, timeout=timeout, watch=watch,
+                                         progress=progress, nbytes=nbytes,
+                                         step=step.id if step is not None else None)
+
+    def progress(self, label, total=None):
+        """TransferProgress reported to the host's per-device progress display"""
+        return TransferProgress(label, total,
+                                lambda progress: self.host.on_transfer_progress(self.device_addr, progress))
+
+    def mark_changed(self, path, recursive=False):
+        with self._lock:
+            self.changed_paths[path] = recursive or self.changed_paths.get(path, False)
+
+    def _mark_tree_changed(self, target, rels, total):
+        """Whole or large re-pushes are fixed recursively, a few files individually"""
+        target = target.rstrip("/")
+        if len(rels) == total or len(rels) > self.MAX_CHANGED_FILES:
+            self.mark_changed(target, recursive=True)
+            return
+        for rel in rels:
+            parts = rel.split("/")
+            for depth in range(1, len(parts) + 1):
+                self.mark_changed(f"{target}/{'/'.join(parts[:depth])}")
+
+    def transfer(self, step, nbytes, default_priority):
+        """Wait for the global transfer scheduler; plans may override "priority"."""
+        return self.host.transfers.transfer(self.device_addr, nbytes,
+                                            step.params.get("priority", default_priority))
+
+    def run(self):
+        """Execute the plan; raises StepFailed when a required step fails"""
+        pending = {step.id: step for step in self.steps}
+        finished = set()
+        failure = None
+        total = len(self.steps)
+        self._started = time.monotonic()
+
+        with ThreadPoolExecutor(max_workers=self.max_parallel,
+                                thread_name_prefix=f"plan-{self.device.ip}") as pool:
+            running = {}
+            while pending or running:
+                if failure is None:
+                    ready = [step for step in pending.values()
+                             if all(dep in finished for dep in step.after)]
+                    for step in ready:
+                        del pending[step.id]
+                        running[pool.submit(self._run_step, step, len(finished) + len(running) + 1,
+                                            total)] = step
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    step = running.pop(future)
+                    finished.add(step.id)
+                    if self.results[step.id]["status"] == "failed" and step.required and failure is None:
+                        failure = step
+
+        self.wall_time = time.monotonic() - self._started
+        self.report_critical_path()
+        self.report_summary()
+        if failure is not None:
+            raise StepFailed(f"{failure.label}: {self.results[failure.id]['error']}")
+        if pending:
+            raise StepFailed(f"실행되지 않은 단계: {', '.join(pending)}")
+        # Every required step completed (optional ones may have failed, e.g. remount on user
+        # builds) - the next install starts from scratch
+        self.journal.finish()
+
+    def _run_step(self, step, number, total):
+        start = time.monotonic()
+        try:
+            with PROFILER.span(step.id, "plan", device=self.device.addr, action=step.action):
+                self._run_step_attempts(step, number, total)
+        finally:
+            self.results.setdefault(step.id, {"status": "failed", "error": "interrupted"}).update(
+                start=start, end=time.monotonic())
+
+    def _run_step_attempts(self, step, number, total):
+        if step.checkpoint and self.journal.is_done(step.id):
+            self.log(f"[{number}/{total}] {step.label} - 이전 실행에서 완료됨 (건너뜀)")
+            self.results[step.id] = {"status": "skipped", "error": None}
+            return
+
+        if step.action not in ("root", "prepare") and self.device.state != AndroidDevice.INSTALLING:
+            if self.device.can_transition(AndroidDevice.INSTALLING):
+                self.device.set_state(AndroidDevice.INSTALLING)
+
+        self.log(f"[{number}/{total}] {step.label}...")
+        handler = getattr(self, f"_action_{step.action}")
+        self._current.step = step
+        for attempt in range(step.retries):
+            try:
+                if attempt > 0:
+                    self.host.ensure_device_connection(self.device_addr)
+                if step.action in self.TRANSFER_ACTIONS:
+                    with self._transfer_slots:
+                        status = handler(step) or "success"
+                else:
+                    status = handler(step) or "success"
+                self.results[step.id] = {"status": status, "error": None}
+                if step.checkpoint and status in ("success", "unchanged"):
+                    self.journal.mark_done(step.id)
+                return
+            except Exception as e:
+                error = "timeout" if isinstance(e, subprocess.TimeoutExpired) else str(e)
+                if attempt < step.retries - 1:
+                    err_msg, _ = self.host.get_error_message(error)
+                    self.log(f"  ⚠ {step.label} 실패: {err_msg} (재시도 {attempt + 2}/{step.retries})")
+                    continue
+                self.results[step.id] = {"status": "failed", "error": error}
+                if step.quiet:
+                    return
+                err_msg, solution = self.host.get_error_message(error)
+                level = "ERROR" if step.required else "WARNING"
+                self.log(f"  ⚠ {step.label} 실패: {err_msg}", level)
+                self.log(f"    → 해결: {solution}", level)
+
+    def report_critical_path(self):
+        """Log wall time, summed step time and the chain of steps that bounded the run"""
+        timed = {step.id: step for step in self.steps if "end" in self.results.get(step.id, {})}
+        if not timed:
+            return
+        wall = max(self.results[step_id]["end"] for step_id in timed) - self._started
+        busy = sum(self.results[step_id]["end"] - self.results[step_id]["start"] for step_id in timed)
+
+        # Walk back from the last step to finish, always through the dependency that finished last
+        current = max(timed.values(), key=lambda step: self.results[step.id]["end"])
+        path = [current]
+        while True:
+            deps = [timed[dep] for dep in current.after if dep in timed]
+            if not deps:
+                break
+            current = max(deps, key=lambda step: self.results[step.id]["end"])
+            path.append(current)
+        path.reverse()
+        self.critical_path = [(step.id, self.results[step.id]["end"] - self.results[step.id]["start"])
+                              for step in path]
+
+        self.log(f"⏱ 총 소요: {wall:.1f}초 (단계 합계 {busy:.1f}초, 병렬화 {busy / max(wall, 0.001):.1f}배)")
+        self.log("⏱ 크리티컬 패스: " + " → ".join(f"{step_id} {duration:.1f}s"
+                                                 for step_id, duration in self.critical_path))
+
+    def report_summary(self):
+        """Log failed optional steps, like the old transfer summary"""
+        failed = [step for step in self.steps
+                  if self.results.get(step.id, {}).get("status") == "failed" and not step.quiet]
+        if not failed:
+            return
+        attempted = sum(1 for step in self.steps if step.id in self.results and not step.quiet)
+        self.log(f"━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━")
+        self.log(f"⚠ 단계 결과: {attempted - len(failed)}/{attempted} 성공")
+        for step in failed:
+            err_msg, _ = self.host.get_error_message(str(self.results[step.id]["error"]))
+            self.log(f"  - {step.label}: 실패 ({err_msg})")
+        self.log(f"━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━")
+
+    # Step actions -------------------------------------------------------
+
+    def _action_root(self, step):
+        result = self.adb(["root"])
+        if "restarting" in result:
+            self.log("디바이스 재시작 대기 중...")
+            elapsed = self.host.transports.wait_for_device(self.device_addr, max_wait=30,
+                                                           initial_delay=1)
+            if elapsed is not None:
+                self.log(f"디바이스 준비 완료: {elapsed:.0f}초")
+        if self.device.can_transition(AndroidDevice.ROOTED):
+            self.device.set_state(AndroidDevice.ROOTED)
+
+    def _action_prepare(self, step):
+        # Runs on the host only, overlapping root and APK installs on the device
+        bundle_files = None
+        bundle_manifest = self.source / BUNDLE_MANIFEST_NAME
+        if bundle_manifest.exists():
+            # Extracted bundle: hashes were computed once when the bundle was built
+            with open(bundle_manifest, "r", encoding="utf-8") as f:
+                bundle_files = {entry["path"]: entry for entry in json.load(f)["files"]}
+        total_files = total_bytes = 0
+        for other in self.steps:
+            if other.action in ("push_tree", "push_file"):
+                local_path = self.source / other.params["source"]
+                if local_path.exists():
+                    if bundle_files is not None:
+                        manifest = bundle_manifest_for(bundle_files, other.params["source"])
+                    else:
+                        manifest = build_source_manifest(local_path)
+                    with self._lock:
+                        self.manifest[other.id] = manifest
+                    total_files += len(manifest)
+                    total_bytes += sum(size for size, _ in manifest.values())
+        self.log(f"  ✓ {step.label}: {total_files}개 파일, {total_bytes / (1024 * 1024):.1f} MB")
+
+    def _action_install_apk(self, step):
+        apk_path = self.host.files_dir / "apk_files" / step.params["apk"]
+        if not apk_path.exists():
+            self.log(f"APK를 찾을 수 없음: {apk_path.name}", "WARNING")
+            return "skipped"
+        self.log(f"설치 중: {apk_path.name}...")
+        nbytes = apk_path.stat().st_size
+        progress = self.progress(step.label, nbytes)
+        try:
+            with self.transfer(step, nbytes, TransferScheduler.APP):
+                self.adb(["install", "-r", str(apk_path)], timeout=step.params.get("timeout", 120),
+                         watch=True, progress=progress, nbytes=nbytes)
+        finally:
+            progress.close()
+
+    def _action_grant(self, step):
+        try:
+            self.adb(["shell", "pm", "grant", self.variables["package"], step.params["permission"]])
+        except Exception:
+            return "skipped"  # Some permissions might not be available on all Android versions
+
+    def _action_launch_app(self, step):
+        self.adb(["shell", "monkey", "-p", step.params.get("package", self.variables["package"]),
+                  "-c", "android.intent.category.LAUNCHER", "1"])
+        time.sleep(step.params.get("wait", 5))
+
+    def _action_monitor(self, step):
+        self.host.on_install_monitor(self.device)
+
+    def _action_mkdir(self, step):
+        # One shell round trip for every directory
+        self.adb(["shell", "mkdir", "-p"] + [shell_quote(path) for path in step.params["paths"]])
+        for path in step.params["paths"]:
+            self.mark_changed(path)
+
+    def _action_push_tree(self, step):
+        local_dir = self.source / step.params["source"]
+        if not local_dir.exists():
+            return "skipped"
+        manifest = self.manifest.get(step.id)
+        if manifest:
+            local_files = {rel: size for rel, (size, _) in manifest.items()}
+        else:
+            local_files = {path.relative_to(local_dir).as_posix(): path.stat().st_size
+                           for path in local_dir.rglob('*') if path.is_file()}
+        file_count = len(local_files)
+        done = self.journal.pushed_files(step.id)
+        pending = {rel: size for rel, size in local_files.items() if done.get(rel) != size}
+        relay = self.host.relay if step.params.get("relay") else None
+        relayed = 0
+        self.log(f"  {step.label} 전송 중... ({file_count}개 파일)")
+        with self.transfer(step, sum(pending.values()), TransferScheduler.BULK), \
+                self.host.transports.borrow(self.device_addr):
+            if relay is not None and pending:
+                relayed = self._relay_tree(step, relay, pending)
+            progress = self.progress(step.label)
+            try:
+                pushed = self.host.push_tree_resumable(self.device_addr, self.journal, step.id,
+                                                       local_dir, step.params["target"],
+                                                       local_files=local_files, progress=progress,
+                                                       timeout=step.params.get("timeout", 300))
+            finally:
+                progress.close()
+        with self._lock:
+            self.pushed_this_run += pushed + relayed
+        if pending:
+            self._mark_tree_changed(step.params["target"], list(pending), file_count)
+        if pushed + relayed < file_count:
+            self.log(f"  (이전 전송분 {file_count - pushed - relayed}개 건너뜀)")
+        self.log(f"  ✓ {step.label}: {file_count}개 파일")
+        if relay is not None:
+            # This device now holds the media set and can seed the next ones
+            relay.add_peer(self.device_addr, self.device.ip, step.id, self.journal.source_id,
+                           step.params["target"])
+
+    def _relay_tree(self, step, relay, pending):
+        """Let the relay deliver what it can; returns files that arrived intact"""
+        try:
+            method = relay.fetch_tree(self.device_addr, self.device.ip, step.id,
+                                      self.journal.source_id, self.source, step.params["source"],
+                                      step.params["target"], pending,
+                                      timeout=step.params.get("timeout", 300))
+            if method is None:
+                return 0
+            remote = self.host.list_remote_file_sizes(self.device_addr, step.params["target"])
+        except Exception as e:
+            self.log(f"  릴레이 전송 실패, adb push 사용: {str(e)}", "WARNING")
+            return 0
+        delivered = {rel: size for rel, size in pending.items() if remote.get(rel) == size}
+        self.journal.record_files(step.id, delivered)
+        self.log(f"  릴레이 ({method}): {len(delivered)}/{len(pending)}개 파일")
+        return len(delivered)
+
+    def _action_push_file(self, step):
+        local_file = self.source / step.params["source"]
+        if not local_file.exists():
+            return "skipped"
+        nbytes = local_file.stat().st_size
+        progress = self.progress(step.label, nbytes)
+        try:
+            with self.transfer(step, nbytes, TransferScheduler.CRITICAL):
+                self.adb(["push", str(local_file), step.params["target"]],
+                         timeout=step.params.get("timeout", 60), watch=True,
+                         progress=progress, nbytes=nbytes)
+        finally:
+            progress.close()
+        with self._lock:
+            self.pushed_this_run += 1
+        target = step.params["target"]
+        self.mark_changed(target + local_file.name if target.endswith("/") else target)
+        self.log(f"  ✓ {step.label}: {local_file.name}")
+
+    def _action_fix_ownership(self, step):
+        roots = [path.rstrip("/") for path in step.params["paths"]]
+        with self._lock:
+            changed = {path: recursive for path, recursive in self.changed_paths.items()
+                       if any(path == root or path.startswith(root + "/") for root in roots)}
+        if self.journal.is_done(step.id) and not changed:
+            self.log(f"  ✓ {step.label}: 이전 실행에서 완료됨")
+            return "skipped"
+        if not changed:
+            # Files came from an interrupted earlier run - fix the whole app directories
+            changed = {root: True for root in roots}
+
+        package = self.variables["package"]
+        package_dir = f"/data/data/{package}"
+        inventory_key = DeviceInventory.key_for(self.device)
+        app_owner = self.host.inventory.get(inventory_key, "app_owner", {}).get(package)
+        if not app_owner:
+            app_owner = self._query_app_owner(package_dir)
+
+        timeout = step.params.get("timeout", 120)
+        output = self.adb(["shell", self._fixup_script(package_dir, app_owner, changed)],
+                          timeout=timeout)
+        if "OWNER_CHANGED" in output:
+            # Cached UID is stale (app reinstalled) - look it up again and retry once
+            app_owner = self._query_app_owner(package_dir)
+            output = self.adb(["shell", self._fixup_script(package_dir, app_owner, changed)],
+                              timeout=timeout)
+        if "FIXUP_DONE" not in output:
+            raise Exception("ownership fix-up did not complete")
+        self.log(f"  ✓ {step.label}: {app_owner} ({len(changed)}개 경로)")
+        self.journal.mark_done(step.id)
+
+    @staticmethod
+    def _fixup_script(package_dir, app_owner, changed):
+        """chown + restorecon of every changed path in one shell invocation
+
+        The leading owner guard catches a stale cached UID without a separate
+        stat round trip.
+        """
+        recursive = " ".join(shell_quote(path) for path, rec in sorted(changed.items()) if rec)
+        single = " ".join(shell_quote(path) for path, rec in sorted(changed.items()) if not rec)
+        owner = shell_quote(f"{app_owner}:{app_owner}")
+        commands = [f"[ \"$(stat -c %U {shell_quote(package_dir)})\" = {shell_quote(app_owner)} ] || "
+                    f"{{ echo OWNER_CHANGED; exit 0; }}"]
+        if recursive:
+            commands.append(f"chown -R {owner} {recursive} 2>/dev/null")
+            commands.append(f"restorecon -R {recursive} 2>/dev/null")
+        if single:
+            commands.append(f"chown {owner} {single} 2>/dev/null")
+            commands.append(f"restorecon {single} 2>/dev/null")
+        commands.append("echo FIXUP_DONE")
+        return "; ".join(commands)
+
+    def _query_app_owner(self, package_dir):
+        app_owner = self.adb(["shell", "stat", "-c", "%U", package_dir]).strip()
+        if not app_owner or app_owner == "unknown":
+            raise Exception("unknown owner")
+        key = DeviceInventory.key_for(self.device)
+        owners = dict(self.host.inventory.get(key, "app_owner", {}))
+        owners[self.variables["package"]] = app_owner
+        self.host.inventory.update(key, app_owner=owners)
+        return app_owner
+
+    def _expected_checksums(self, step):
+        """{remote path: (md5, local path)} for every file the selected push steps deliver"""
+        step_ids = step.params.get("steps")
+        expected = {}
+        trees = []
+        for other in self.steps:
+            if other.action not in ("push_tree", "push_file") or (step_ids and other.id not in step_ids):
+                continue
+            local_path = self.source / other.params["source"]
+            if not local_path.exists():
+                continue
+            manifest = self.manifest.get(other.id) or build_source_manifest(local_path)
+            target = other.params["target"]
+            if other.action == "push_tree":
+                trees.append(target.rstrip("/"))
+                for rel, (_, md5) in manifest.items():
+                    expected[f"{target.rstrip('/')}/{rel}"] = (md5, local_path / rel)
+            else:
+                remote = target + local_path.name if target.endswith("/") else target
+                expected[remote] = (manifest[local_path.name][1], local_path)
+        return expected, trees
+
+    def _checksum_tool(self):
+        """md5sum, toybox md5sum or busybox md5sum - whichever the device has, "" if none"""
+        if self._md5_tool is None:
+            output = self.adb(["shell", 'for t in md5sum "toybox md5sum" "busybox md5sum"; do '
+                                        'if echo | $t >/dev/null 2>&1; then echo "$t"; break; fi; done'])
+            self._md5_tool = output.strip()
+        return self._md5_tool
+
+    def _remote_checksums(self, trees, files, tool="md5sum"):
+        """md5 of every file under `trees` plus `files`, in one shell round trip"""
+        commands = [f"find {shell_quote(tree)} -type f -exec {tool} {{}} + 2>/dev/null" for tree in trees]
+        if files:
+            commands.append(f"{tool} " + " ".join(shell_quote(path) for path in files) + " 2>/dev/null")
+        output = self.adb(["shell", "; ".join(commands) + "; true"], timeout=120)
+        checksums = {}
+        for line in output.splitlines():
+            md5, _, path = line.strip().partition("  ")
+            if len(md5) == 32 and path:
+                checksums[path] = md5
+        return checksums
+
+    def _remote_sizes(self, trees, files):
+        """Size of every file under `trees` plus `files` - the check for devices without md5sum"""
+        commands = [f"find {shell_quote(tree)} -type f -exec stat -c '%s %n' {{}} + 2>/dev/null"
+                    for tree in trees]
+        if files:
+            commands.append("stat -c '%s %n' " + " ".join(shell_quote(path) for path in files)
+                            + " 2>/dev/null")
+        output = self.adb(["shell", "; ".join(commands) + "; true"], timeout=120)
+        sizes = {}
+        for line in output.splitlines():
+            size, _, path = line.strip().partition(" ")
+            if size.isdigit() and path:
+                sizes[path] = int(size)
+        return sizes
+
+    def _remote_fingerprints(self, trees, files):
+        """({path: md5}, mismatch label), or ({path: size}, label) when the device has no md5sum"""
+        tool = self._checksum_tool()
+        if tool:
+            return self._remote_checksums(trees, files, tool), "해시 불일치"
+        return self._remote_sizes(trees, files), "크기 불일치"
+
+    def _action_verify(self, step):
+        expected, trees = self._expected_checksums(step)
+        if not expected:
+            return "skipped"
+        in_trees = lambda path: any(path.startswith(tree + "/") for tree in trees)
+        remote, mismatch = self._remote_fingerprints(trees, [path for path in expected
+                                                             if not in_trees(path)])
+        if self._md5_tool:
+            wanted = lambda path: expected[path][0]
+            checked = "해시"
+        else:
+            # Older images without md5sum: sizes still catch missing and truncated files
+            self.log("  검증: 디바이스에 md5sum 없음 - 파일 크기로 비교", "WARNING")
+            wanted = lambda path: expected[path][1].stat().st_size
+            checked = "크기"
+        mismatched = {path: ("없음" if path not in remote else mismatch)
+                      for path in expected if remote.get(path) != wanted(path)}
+        if not mismatched:
+            self.log(f"  ✓ 검증: {len(expected)}개 파일 {checked} 일치")
+            return
+
+        self.log(f"  ⚠ 검증: {len(mismatched)}/{len(expected)}개 파일 불일치 - 해당 파일만 재전송",
+                 "WARNING")
+        for path, reason in sorted(mismatched.items())[:20]:
+            self.log(f"    - {path} ({reason})", "WARNING")
+        if len(mismatched) > 20:
+            self.log(f"    ... 외 {len(mismatched) - 20}개", "WARNING")
+
+        # Re-push only the mismatched files, one adb call per remote directory
+        by_dir = {}
+        for path in mismatched:
+            by_dir.setdefault(path.rpartition("/")[0], []).append(path)
+        nbytes = sum(expected[path][1].stat().st_size for path in mismatched)
+        progress = self.progress(step.label, nbytes)
+        try:
+            with self.transfer(step, nbytes, TransferScheduler.CRITICAL):
+                self.adb(["shell", "mkdir", "-p"] + [shell_quote(d) for d in by_dir])
+                for remote_dir, paths in by_dir.items():
+                    self.adb(["push"] + [str(expected[path][1]) for path in paths] + [remote_dir + "/"],
+                             timeout=step.params.get("timeout", 300), watch=True, progress=progress,
+                             nbytes=sum(expected[path][1].stat().st_size for path in paths))
+        finally:
+            progress.close()
+        with self._lock:
+            self.pushed_this_run += len(mismatched)
+        for tree in trees:
+            rels = [path[len(tree) + 1:] for path in mismatched if path.startswith(tree + "/")]
+            if rels:
+                self._mark_tree_changed(tree, rels, len(expected))
+        for path in mismatched:
+            if not in_trees(path):
+                self.mark_changed(path)
+
+        remote, _ = self._remote_fingerprints([], list(mismatched))
+        still_bad = [path for path in mismatched if remote.get(path) != wanted(path)]
+        if still_bad:
+            kind = "hash" if self._md5_tool else "size"
+            raise Exception(f"{kind} mismatch after re-push: {', '.join(still_bad[:5])}")
+        self.log(f"  ✓ 검증: 재전송 {len(mismatched)}개 포함 {len(expected)}개 파일 {checked} 일치")
+
+    def _action_shell(self, step):
+        check = step.params.get("check")
+        if check:
+            current = self.adb(["shell"] + list(check)).strip()
+            if current == str(step.params.get("expect", "")):
+                self.log(f"  = {step.label}: 이미 적용됨 ({current})")
+                return "unchanged"
+        command = list(step.params["command"])
+        if not step.params.get("adb"):
+            command = ["shell"] + command
+        self.adb(command, timeout=step.params.get("timeout", 60))
+
+    def _action_reboot(self, step):
+        triggers = step.params.get("when_changed")
+        if triggers is not None:
+            # Steps skipped through the journal ran in an earlier session, so they still count
+            changed = [step_id for step_id in triggers
+                       if self.results.get(step_id, {}).get("status") in ("success", "skipped")]
+            if not changed:
+                saved = self.host.history.step_duration(step.id)
+                estimate = f" (약 {saved:.0f}초 절약)" if saved else ""
+                self.log(f"  재부팅 생략: 재부팅이 필요한 설정 변경 없음{estimate}")
+                return "unchanged"
+            self.log(f"  재부팅 필요: {', '.join(changed)}")
+        self.device.set_state(AndroidDevice.REBOOTING)
+
+        # The fleet watcher tracks the return; this device's install slot is lent to others meanwhile
+        self.log("디바이스 온라인 대기 중...")
+        with self.host.reboot_wait(self.device):
+            elapsed = self.host.reboots.reboot(self.device_addr,
+                                               max_wait=step.params.get("max_wait", 60) + 5,
+                                               initial_delay=5)
+        # The remaining steps run either way - leave REBOOTING like the success path does
+        self.device.set_state(AndroidDevice.INSTALLING)
+        if elapsed is None:
+            self.log("디바이스 재부팅이 예상보다 오래 걸림, 그래도 계속 진행...", "WARNING")
+            return "skipped"  # Not checkpointed, so a rerun reboots again
+        self.log(f"디바이스 온라인 복귀: {elapsed:.0f}초")
+        self.rebooted = True
+        time.sleep(step.params.get("settle", 5))  # Wait for system to stabilize
+
+
+LOG_DRAIN_MS = 100     # Interval of writing queued log lines into the log window
+LOG_DRAIN_LINES = 500  # Lines written per interval, so a burst never blocks the Tk thread
+
+
 class RT1018InstallerGUI:
     """Main GUI application for RT1018 Android device installer"""
 
     def __init__(self, root):
+        self.startup_began = time.perf_counter()
         self.root = root
+        self.log_lines = collections.deque()  # Written by any thread, drained on the Tk thread
         self.root.title("RT1018 안드로이드 디바이스 설치 프로그램")
         self.root.geometry("1600x900")  # Wide enough for device list + 960×540 scrcpy frame + padding
 
@@ -66,6 +3592,11 @@ class RT1018InstallerGUI:
         self.files_dir = self.base_dir / "install_files"
         self.backup_dir = self.base_dir / "backups"
         self.backup_dir.mkdir(exist_ok=True)
+        self.journal_dir = self.base_dir / "install_journals"
+        self.plans_dir = self.base_dir / "install_plans"
+        self.history = StepTimingHistory(self.base_dir / "install_history.json")
+        self.bundle_cache_dir = self.base_dir / "bundle_cache"
+        self.bundle_lock = threading.Lock()
 
         # Local ADB and Scrcpy paths (bundled with application)
         self.adb_dir = self.base_dir / "adb"
@@ -73,8 +3604,9 @@ class RT1018InstallerGUI:
         self.scrcpy_path = self.adb_dir / "scrcpy.exe"
 
         # Application state
-        self.devices = []
-        self.device_vars = []
+        self.registry = DeviceRegistry()
+        self.registry.add_listener(self.on_device_changed)
+        self.device_rows = {}  # device addr -> row widgets, updated only when the device changes
         self.scanning = False
         self.installing = False
         self.scrcpy_process = None
@@ -87,20 +3619,83 @@ class RT1018InstallerGUI:
         self.scrcpy_retry_count = 0  # Track retry attempts
         self.scrcpy_max_retries = 10  # Maximum retry attempts
 
-        # APK and file paths
-        self.app_package = "com.releasetech.eightpresso.basic"
-        self.apk_files = [
-            "rustdesk-1.1.9.apk",
-            "hangulkeyboard.apk",
-            "EasyCard-A_v1.0.3.0_mod.apk",
-            "EightPresso.apk"
-        ]
+        # App package (install steps, APK list and settings live in the install plan)
+        self.app_package = DEFAULT_INSTALL_PLAN["variables"]["package"]
+
+        # Every adb call goes through one runner (session recording/replay hooks in here)
+        self.adb = AdbRunner(lambda: str(self.adb_path) if self.adb_path.exists() else "adb")
+        self.trace_dir = self.base_dir / "adb_traces"
+        self.stall_timeout = DEFAULT_STALL_TIMEOUT
+        self.fresh_install = False  # Ignore checkpoint journals for the current batch
+        self.profile_dir = self.base_dir / "profiles"
+
+        # Shared ADB transport pool (heartbeat + reconnect with backoff)
+        self.transports = AdbTransportManager(self.adb, log=self.log)
+
+        # Global transfer scheduler shared by all concurrent installs (bandwidth cap + fair share)
+        self.transfers = TransferScheduler()
+        self.inventory = DeviceInventory(self.base_dir / "device_inventory.json")
+        # Per-device timeout budgets learned from past latencies (kept in the inventory)
+        self.adb.timeouts = AdaptiveTimeouts(self.inventory, key_for=self.inventory_key)
+        self.relay = None  # MediaRelay while relay mode is enabled
+        self.reboots = RebootCoordinator(self.transports, self.run_adb_command)
+        self.install_slots = None  # InstallSlots of the running batch (see reboot_wait)
+        self.monitor_with_scrcpy = True  # Off while several devices can reach "monitor" at once
+
+        # Background discovery (ARP/neighbor table + mDNS), keeps the device list live
+        self.discovery = DeviceDiscoveryService(self.registry, self.identify_device,
+                                                self.register_device)
 
         self.setup_ui()
-        self.check_adb_availability()
+        self.drain_log()
+        self.root.after_idle(self.on_window_ready)
+
+        # adb check/server start, network detection and known devices run off the Tk thread
+        threading.Thread(target=self.warm_up, name="startup", daemon=True).start()
+
+    def on_window_ready(self):
+        """First idle moment after the window is built - it is interactive from here"""
+        elapsed = time.perf_counter() - self.startup_began
+        print(f"[DEBUG] Window interactive after {elapsed:.2f}s")
+        self.log(f"창 준비: {elapsed:.2f}초")
+
+    def warm_up(self):
+        """Background startup: adb server, scan targets, known devices, discovery"""
+        warm = adb_server_running()
+        if self.check_adb_availability():
+            try:
+                self.adb.run(["start-server"], timeout=30)
+            except Exception as e:
+                print(f"[DEBUG] adb start-server failed: {str(e)}")
+            elapsed = time.perf_counter() - self.startup_began
+            self.log(f"ADB 서버 준비: {elapsed:.2f}초 ({'웜' if warm else '콜드'} 스타트)")
 
-        # Auto-detect IP range after UI is set up
-        self.auto_detect_ip_range()
+        # Interface enumeration may spawn ipconfig/ifconfig; the result is applied on the Tk thread
+        try:
+            interfaces = enumerate_ipv4_interfaces()
+        except Exception as e:
+            print(f"[DEBUG] Interface enumeration failed: {str(e)}")
+            interfaces = []
+        self.root.after(0, lambda: self.auto_detect_ip_range(interfaces))
+
+        self.transports.start()
+        self.reconnect_known_devices()
+        if self.auto_discovery_var.get():
+            self.discovery.start()
+
+    def reconnect_known_devices(self):
+        """Reconnect devices remembered in the inventory so they are listed without a scan"""
+        known = [fields["addr"] for _, fields in self.inventory.items() if fields.get("addr")]
+        if not known:
+            return
+        found = 0
+        with ThreadPoolExecutor(max_workers=10) as executor:
+            endpoints = [addr.rpartition(":") for addr in known]
+            for result in executor.map(lambda ep: self.identify_device(ep[0], int(ep[2])), endpoints):
+                if result:
+                    self.register_device(*result)
+                    found += 1
+        self.log(f"이전 디바이스 재연결: {found}/{len(known)}개")
 
     def setup_ui(self):
         """Setup the main UI components"""
@@ -132,9 +3727,13 @@ class RT1018InstallerGUI:
         scan_frame = ttk.Frame(device_frame)
         scan_frame.pack(fill=tk.X, pady=(0, 10))
 
-        ttk.Label(scan_frame, text="IP 범위:").pack(side=tk.LEFT)
-        self.ip_range_var = tk.StringVar(value="192.168.1")
-        ttk.Entry(scan_frame, textvariable=self.ip_range_var, width=15).pack(side=tk.LEFT, padx=5)
+        ttk.Label(scan_frame, text="스캔 대상 (CIDR):").pack(side=tk.LEFT)
+        self.ip_range_var = tk.StringVar(value="192.168.1.0/24")
+        ttk.Entry(scan_frame, textvariable=self.ip_range_var, width=28).pack(side=tk.LEFT, padx=5)
+
+        ttk.Label(scan_frame, text="포트:").pack(side=tk.LEFT)
+        self.scan_ports_var = tk.StringVar(value=",".join(str(p) for p in DEFAULT_ADB_PORTS))
+        ttk.Entry(scan_frame, textvariable=self.scan_ports_var, width=10).pack(side=tk.LEFT, padx=5)
 
         # Auto-detect button
         self.detect_btn = ttk.Button(scan_frame, text="자동", command=self.auto_detect_ip_range, width=6)
@@ -146,6 +3745,15 @@ class RT1018InstallerGUI:
         self.scan_progress = ttk.Progressbar(scan_frame, mode='indeterminate', length=100)
         self.scan_progress.pack(side=tk.LEFT, padx=5)
 
+        # Continuous background discovery toggle
+        self.auto_discovery_var = tk.BooleanVar(value=True)
+        ttk.Checkbutton(scan_frame, text="자동 검색", variable=self.auto_discovery_var,
+                        command=self.toggle_auto_discovery).pack(side=tk.LEFT, padx=5)
+
+        # Per-target scan progress
+        self.scan_status_label = ttk.Label(device_frame, text="", foreground="gray")
+        self.scan_status_label.pack(fill=tk.X, pady=(0, 5))
+
         # Device list with scrollbar
         list_frame = ttk.Frame(device_frame)
         list_frame.pack(fill=tk.BOTH, expand=True)
@@ -217,6 +3825,54 @@ class RT1018InstallerGUI:
         self.backup_combo.pack(side=tk.LEFT, padx=5)
         self.refresh_backup_list()
 
+        ttk.Label(source_frame, text="설치 프로필:").pack(side=tk.LEFT, padx=(15, 0))
+        self.plan_profile_var = tk.StringVar(value="default")
+        self.plan_combo = ttk.Combobox(source_frame, textvariable=self.plan_profile_var,
+                                       values=self.list_install_plans(), state="readonly", width=15)
+        self.plan_combo.pack(side=tk.LEFT, padx=5)
+
+        # Fleet provisioning: devices installed at once and the shared Wi-Fi budget
+        fleet_frame = ttk.Frame(button_frame)
+        fleet_frame.pack(fill=tk.X, pady=(0, 5))
+
+        ttk.Label(fleet_frame, text="동시 설치:").pack(side=tk.LEFT, padx=5)
+        self.install_concurrency_var = tk.StringVar(value="1")
+        ttk.Spinbox(fleet_frame, from_=1, to=32, textvariable=self.install_concurrency_var,
+                    width=4).pack(side=tk.LEFT)
+
+        ttk.Label(fleet_frame, text="대역폭 제한 (MB/s, 0=무제한):").pack(side=tk.LEFT, padx=(15, 5))
+        self.bandwidth_cap_var = tk.StringVar(value="0")
+        ttk.Entry(fleet_frame, textvariable=self.bandwidth_cap_var, width=6).pack(side=tk.LEFT)
+
+        ttk.Label(fleet_frame, text="전송 정지 감지 (초):").pack(side=tk.LEFT, padx=(15, 5))
+        self.stall_timeout_var = tk.StringVar(value=str(DEFAULT_STALL_TIMEOUT))
+        ttk.Entry(fleet_frame, textvariable=self.stall_timeout_var, width=4).pack(side=tk.LEFT)
+
+        # Relay: provisioned kiosks (or a local HTTP server) seed the media set to the rest
+        self.relay_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(fleet_frame, text="릴레이 모드 (피어/HTTP)",
+                        variable=self.relay_var).pack(side=tk.LEFT, padx=(15, 0))
+
+        # Deletes each device's checkpoint journal so every step runs again
+        self.fresh_install_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(fleet_frame, text="처음부터 설치",
+                        variable=self.fresh_install_var).pack(side=tk.LEFT, padx=(15, 0))
+
+        # Session trace of every adb call, replayable with benchmark.py --replay
+        self.record_adb_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(fleet_frame, text="ADB 세션 기록", variable=self.record_adb_var,
+                        command=self.toggle_adb_recording).pack(side=tk.LEFT, padx=(15, 0))
+
+        # Keeping the adb server (and its connections) alive makes the next start warm
+        self.kill_server_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(fleet_frame, text="종료 시 ADB 서버 종료",
+                        variable=self.kill_server_var).pack(side=tk.LEFT, padx=(15, 0))
+
+        # Span tracing + stack sampling, written to profiles/ (Chrome trace / speedscope)
+        self.profile_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(fleet_frame, text="프로파일링", variable=self.profile_var,
+                        command=self.toggle_profiling).pack(side=tk.LEFT, padx=(15, 0))
+
         # Action buttons
         action_frame = ttk.Frame(button_frame)
         action_frame.pack(fill=tk.X, pady=5)
@@ -225,10 +3881,17 @@ class RT1018InstallerGUI:
                                      command=self.start_installation, state=tk.DISABLED)
         self.install_btn.pack(side=tk.LEFT, padx=5)
 
+        self.preflight_btn = ttk.Button(action_frame, text="사전 점검",
+                                        command=self.start_preflight, state=tk.DISABLED)
+        self.preflight_btn.pack(side=tk.LEFT, padx=5)
+
         self.backup_btn = ttk.Button(action_frame, text="디바이스에서 백업",
                                     command=self.start_backup, state=tk.DISABLED)
         self.backup_btn.pack(side=tk.LEFT, padx=5)
 
+        self.bundle_btn = ttk.Button(action_frame, text="번들 생성", command=self.build_bundle)
+        self.bundle_btn.pack(side=tk.LEFT, padx=5)
+
         self.cleanup_btn = ttk.Button(action_frame, text="데이터베이스 이미지 정리",
                                      command=self.cleanup_database_images)
         self.cleanup_btn.pack(side=tk.LEFT, padx=5)
@@ -254,13 +3917,22 @@ class RT1018InstallerGUI:
         self.log_text.pack(fill=tk.BOTH, expand=True, pady=(5, 0))
 
     def log(self, message, level="INFO"):
-        """Add a log message to the log text area"""
+        """Queue a log message for the log text area (safe from any thread, see drain_log)"""
         timestamp = datetime.now().strftime("%H:%M:%S")
-        self.log_text.configure(state=tk.NORMAL)
-        self.log_text.insert(tk.END, f"[{timestamp}] [{level}] {message}\n")
-        self.log_text.see(tk.END)
-        self.log_text.configure(state=tk.DISABLED)
-        self.root.update_idletasks()
+        self.log_lines.append(f"[{timestamp}] [{level}] {message}\n")
+
+    def drain_log(self):
+        """Write queued log lines on the Tk thread, then check again after LOG_DRAIN_MS"""
+        lines = []
+        while self.log_lines and len(lines) < LOG_DRAIN_LINES:
+            lines.append(self.log_lines.popleft())
+        if lines:
+            with PROFILER.span("log", "tk", lines=len(lines)):
+                self.log_text.configure(state=tk.NORMAL)
+                self.log_text.insert(tk.END, "".join(lines))
+                self.log_text.see(tk.END)
+                self.log_text.configure(state=tk.DISABLED)
+        self.root.after(LOG_DRAIN_MS, self.drain_log)
 
     def check_adb_availability(self):
         """Check if ADB is available (bundled or system)"""
@@ -284,241 +3956,305 @@ class RT1018InstallerGUI:
                 return True
             else:
                 self.log("ADB를 찾을 수 없음", "ERROR")
-                messagebox.showerror("ADB를 찾을 수 없음",
-                                   "ADB가 설치되지 않았거나 찾을 수 없습니다.")
+                self.root.after(0, lambda: messagebox.showerror(
+                    "ADB를 찾을 수 없음", "ADB가 설치되지 않았거나 찾을 수 없습니다."))
                 return False
         except Exception as e:
             self.log(f"ADB 확인 오류: {str(e)}", "ERROR")
-            messagebox.showerror("ADB 오류", f"ADB 확인 실패: {str(e)}")
+            self.root.after(0, lambda msg=str(e): messagebox.showerror("ADB 오류", f"ADB 확인 실패: {msg}"))
             return False
 
-    def auto_detect_ip_range(self):
-        """Automatically detect the local network IP range"""
+    def auto_detect_ip_range(self, interfaces=None):
+        """Fill scan targets with the networks of all local IPv4 interfaces
+
+        `interfaces` may be enumerated beforehand (startup does it off the Tk thread).
+        """
         try:
-            # Method 1: Connect to external address to determine local IP
-            s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-            s.settimeout(0.1)
+            ports = parse_ports(self.scan_ports_var.get())
+        except ValueError:
+            ports = DEFAULT_ADB_PORTS
+
+        if interfaces is None:
             try:
-                # Doesn't actually connect, just determines which interface would be used
-                s.connect(('8.8.8.8', 80))
-                local_ip = s.getsockname()[0]
-                s.close()
-            except:
-                s.close()
-                # Method 2: Get hostname and resolve it
-                local_ip = socket.gethostbyname(socket.gethostname())
-
-            # Extract network prefix (first three octets)
-            if local_ip and local_ip != '127.0.0.1':
-                ip_parts = local_ip.split('.')
-                if len(ip_parts) == 4:
-                    network_prefix = '.'.join(ip_parts[:3])
-                    self.ip_range_var.set(network_prefix)
-                    self.log(f"IP 범위 자동 감지: {network_prefix}.* (현재 IP: {local_ip})")
-                    return network_prefix
-
-            # Fallback: try all network interfaces
-            import socket as sock
-            hostname = sock.gethostname()
-            local_ips = sock.getaddrinfo(hostname, None)
-
-            for ip_info in local_ips:
-                ip = ip_info[4][0]
-                if ip.startswith('192.168.') or ip.startswith('10.') or ip.startswith('172.'):
-                    ip_parts = ip.split('.')
-                    if len(ip_parts) == 4:
-                        network_prefix = '.'.join(ip_parts[:3])
-                        self.ip_range_var.set(network_prefix)
-                        self.log(f"IP 범위 자동 감지: {network_prefix}.* (현재 IP: {ip})")
-                        return network_prefix
-
-            # If no suitable IP found, keep default
-            self.log("IP 범위를 자동 감지할 수 없음, 기본값 사용: 192.168.1", "WARNING")
-            self.ip_range_var.set("192.168.1")
+                interfaces = enumerate_ipv4_interfaces()
+            except Exception as e:
+                self.log(f"네트워크 인터페이스 조회 실패: {str(e)}", "WARNING")
+                interfaces = []
 
-        except Exception as e:
-            self.log(f"IP 범위 자동 감지 실패: {str(e)}", "WARNING")
-            self.log("기본 IP 범위 사용: 192.168.1")
-            self.ip_range_var.set("192.168.1")
+        if not interfaces:
+            # Fallback: interface used for the default route, assumed /24
+            try:
+                s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+                s.settimeout(0.1)
+                try:
+                    # Doesn't actually connect, just determines which interface would be used
+                    s.connect(('8.8.8.8', 80))
+                    local_ip = s.getsockname()[0]
+                finally:
+                    s.close()
+                if local_ip and local_ip != '127.0.0.1':
+                    interfaces = [ipaddress.ip_interface(f"{local_ip}/24")]
+            except Exception as e:
+                print(f"[DEBUG] Default route detection failed: {str(e)}")
+
+        targets = []
+        for interface in interfaces:
+            target = scan_target_for_interface(interface, ports)
+            if target not in targets:
+                targets.append(target)
+            if target.network != interface.network:
+                self.log(f"{interface.network} 네트워크가 너무 큼 - {target.network}만 스캔", "WARNING")
+
+        if not targets:
+            self.log("IP 범위를 자동 감지할 수 없음, 기본값 사용: 192.168.1.0/24", "WARNING")
+            targets = [ScanTarget("192.168.1.0/24", ports)]
+        else:
+            for interface in interfaces:
+                self.log(f"네트워크 감지: {interface.network} (현재 IP: {interface.ip})")
+
+        text = ", ".join(str(target) for target in targets)
+        self.ip_range_var.set(text)
+        self.log(f"스캔 대상 자동 설정: {text}")
+        return targets
 
     def scan_network(self):
-        """Scan the network for Android devices on ports 5555 and 1206 using multithreading"""
+        """Scan all target networks (CIDRs) concurrently for Android devices"""
         if self.scanning:
             return
 
+        try:
+            ports = parse_ports(self.scan_ports_var.get())
+            targets = parse_scan_targets(self.ip_range_var.get(), ports)
+        except ValueError as e:
+            messagebox.showerror("스캔 대상 오류", str(e))
+            return
+
         self.scanning = True
-        # Disable all buttons during scan
+        # Only the scan controls are locked - install/backup keep working on known devices
         self.scan_btn.config(state=tk.DISABLED, text="스캔 중...")
         self.detect_btn.config(state=tk.DISABLED)
-        self.install_btn.config(state=tk.DISABLED)
-        self.backup_btn.config(state=tk.DISABLED)
-        self.scan_progress.start()
-        self.log("네트워크 스캔 시작... (멀티스레드)")
-
-        # Clear existing devices
-        for widget in self.device_list_frame.winfo_children():
-            widget.destroy()
-        self.devices.clear()
-        self.device_vars.clear()
-
-        def scan_single_ip(ip, ports):
-            """Scan a single IP for open ports"""
-            results = []
-            for port in ports:
-                try:
-                    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                    sock.settimeout(0.1)
-                    result = sock.connect_ex((ip, port))
-                    sock.close()
-                    if result == 0:
-                        results.append((ip, port))
-                except Exception:
-                    pass
-            return results
-
-        def connect_device(ip, port, adb_exe):
-            """Connect to a device and get its info"""
-            try:
-                result = subprocess.run(
-                    [adb_exe, "connect", f"{ip}:{port}"],
-                    capture_output=True, text=True, timeout=10,
-                    creationflags=SUBPROCESS_FLAGS
-                )
-                if "connected" in result.stdout.lower():
-                    # Get Android version
-                    version_result = subprocess.run(
-                        [adb_exe, "-s", f"{ip}:{port}",
-                         "shell", "getprop", "ro.build.version.release"],
-                        capture_output=True, text=True, timeout=5,
-                        creationflags=SUBPROCESS_FLAGS
-                    )
-                    version = version_result.stdout.strip()
-
-                    # Get device model
-                    model_result = subprocess.run(
-                        [adb_exe, "-s", f"{ip}:{port}",
-                         "shell", "getprop", "ro.product.model"],
-                        capture_output=True, text=True, timeout=5,
-                        creationflags=SUBPROCESS_FLAGS
-                    )
-                    model = model_result.stdout.strip()
-
-                    return (ip, port, version, model, "Connected")
-            except Exception as e:
-                print(f"[DEBUG] Exception connecting to {ip}:{port} - {str(e)}")
-            return None
+        self.scan_progress.config(mode='determinate', value=0)
+        self.log(f"네트워크 스캔 시작... (대상 {len(targets)}개, 멀티스레드)")
+        self.discovery.ports = tuple(ports)
 
         def scan_thread():
-            ip_range = self.ip_range_var.get()
-            ports = [5555, 1206]
             found_ports = []
-
-            print(f"[DEBUG] Starting multithreaded scan on {ip_range}.* with ports {ports}")
-
-            # Phase 1: Parallel port scanning (much faster)
-            ips_to_scan = [f"{ip_range}.{i}" for i in range(1, 255)]
-
-            with ThreadPoolExecutor(max_workers=50) as executor:
-                futures = {executor.submit(scan_single_ip, ip, ports): ip for ip in ips_to_scan}
+            skipped = []
+            jobs = [(target, ip) for target in targets for ip in target.hosts()]
+            done = {target: 0 for target in targets}
+            totals = {target: len(target.hosts()) for target in targets}
+            last_update = [0.0]
+
+            print(f"[DEBUG] Starting multithreaded scan on {[str(t) for t in targets]} ({len(jobs)} hosts)")
+
+            def report_progress(force=False):
+                # Throttle UI updates to ~5/s
+                now = time.time()
+                if not force and now - last_update[0] < 0.2:
+                    return
+                last_update[0] = now
+                text = "  ".join(f"{t.network}: {done[t]}/{totals[t]}" for t in targets)
+                pct = sum(done.values()) * 100 / max(len(jobs), 1)
+                self.root.after(0, PROFILER.wrap(lambda: (self.scan_status_label.config(text=text),
+                                                          self.scan_progress.config(value=pct)),
+                                                 "scan progress"))
+
+            # Phase 1: Parallel port scanning over every target at once; open ports are
+            # fingerprinted with the ADB CNXN handshake so printers/NAS never reach adb connect
+            with PROFILER.span("scan sweep", "scan", hosts=len(jobs)), \
+                    ThreadPoolExecutor(max_workers=50) as executor:
+                futures = {executor.submit(probe_adb_endpoints, ip, target.ports): target
+                           for target, ip in jobs}
                 for future in as_completed(futures):
-                    results = future.result()
-                    for ip, port in results:
-                        print(f"[DEBUG] Port open at {ip}:{port}")
-                        self.root.after(0, lambda i=ip, p=port: self.log(f"디바이스 발견: {i}:{p}"))
+                    target = futures[future]
+                    done[target] += 1
+                    for ip, port, kind in future.result():
+                        print(f"[DEBUG] Port open at {ip}:{port} ({kind})")
+                        if kind == NOT_ADB:
+                            skipped.append((ip, port))
+                            continue
+                        note = " (인증 필요)" if kind == ADB_UNAUTHORIZED else ""
+                        self.root.after(0, lambda i=ip, p=port, n=note: self.log(f"디바이스 발견: {i}:{p}{n}"))
                         found_ports.append((ip, port))
+                    if done[target] == totals[target]:
+                        self.root.after(0, lambda t=target: self.log(f"  {t.network} 스캔 완료"))
+                    report_progress()
+            report_progress(force=True)
 
             print(f"[DEBUG] Port scan complete. Found {len(found_ports)} potential devices")
+            if skipped:
+                self.root.after(0, lambda: self.log(
+                    f"ADB가 아닌 호스트 {len(skipped)}개 건너뜀: "
+                    + ", ".join(f"{ip}:{port}" for ip, port in skipped[:5])
+                    + (" ..." if len(skipped) > 5 else "")))
 
             # Phase 2: Connect to found devices (parallel ADB connections)
-            adb_exe = str(self.adb_path) if self.adb_path.exists() else "adb"
-
-            with ThreadPoolExecutor(max_workers=10) as executor:
-                futures = {executor.submit(connect_device, ip, port, adb_exe): (ip, port)
+            seen_devices = set()
+            with PROFILER.span("scan identify", "scan", devices=len(found_ports)), \
+                    ThreadPoolExecutor(max_workers=10) as executor:
+                futures = {executor.submit(self.identify_device, ip, port): (ip, port)
                           for ip, port in found_ports}
                 for future in as_completed(futures):
                     result = future.result()
                     if result:
-                        ip, port, version, model, status = result
-                        device = AndroidDevice(ip, port)
-                        device.version = version
-                        device.model = model
-                        device.status = status
-                        self.devices.append(device)
-                        print(f"[DEBUG] Device connected: {device}")
-                        self.root.after(0, lambda d=device: self.log(f"연결됨: {d}"))
+                        seen_devices.add(self.register_device(*result))
+
+            # Drop devices in the scanned networks that did not answer (unless busy)
+            busy_states = (AndroidDevice.INSTALLING, AndroidDevice.REBOOTING)
+            for device in self.registry:
+                in_targets = any(device.ip in target for target in targets)
+                if in_targets and device not in seen_devices and device.state not in busy_states:
+                    self.registry.remove(device.addr)
 
-            print(f"[DEBUG] All connections complete. Total devices: {len(self.devices)}")
+            print(f"[DEBUG] All connections complete. Total devices: {len(self.registry)}")
 
             # Update UI
             def finish_scan():
-                self.update_device_list()
-                self.scan_progress.stop()
+                self.scan_progress.config(value=100)
                 self.scan_btn.config(state=tk.NORMAL, text="네트워크 스캔")
                 self.detect_btn.config(state=tk.NORMAL)
                 self.update_button_states()
                 self.scanning = False
-                self.log(f"스캔 완료. 발견된 디바이스: {len(self.devices)}개")
+                self.log(f"스캔 완료. 발견된 디바이스: {len(self.registry)}개")
 
-            self.root.after(0, finish_scan)
+            self.root.after(0, PROFILER.wrap(finish_scan, "finish scan"))
             print(f"[DEBUG] Scan thread complete")
 
         threading.Thread(target=scan_thread, daemon=True).start()
 
-    def update_device_list(self):
-        """Update the device list UI"""
-        print(f"[DEBUG] update_device_list called")
-        print(f"[DEBUG] Number of devices: {len(self.devices)}")
-        print(f"[DEBUG] Devices: {[str(d) for d in self.devices]}")
+    def toggle_auto_discovery(self):
+        """Start or stop the background discovery service"""
+        if self.auto_discovery_var.get():
+            self.discovery.start()
+            self.log("자동 디바이스 검색 시작 (ARP/mDNS)")
+        else:
+            self.discovery.stop()
+            self.log("자동 디바이스 검색 중지")
+
+    def toggle_adb_recording(self):
+        """Start or stop writing every adb call to adb_traces/session_<time>.jsonl"""
+        if self.record_adb_var.get():
+            path = self.trace_dir / f"session_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl"
+            self.adb.recorder = AdbSessionRecorder(path)
+            self.log(f"ADB 세션 기록 시작: {path.name}")
+        else:
+            recorder, self.adb.recorder = self.adb.recorder, None
+            if recorder is not None:
+                recorder.close()
+                self.log(f"ADB 세션 기록 저장: {recorder.path} (명령 {recorder.count}개)")
+
+    def toggle_profiling(self):
+        """Start or stop profiling; GUI callbacks are timed where they are scheduled"""
+        if self.profile_var.get():
+            PROFILER.start()
+            self.log("프로파일링 시작 (스팬 + 스택 샘플링)")
+        else:
+            try:
+                for path in PROFILER.stop(self.profile_dir):
+                    self.log(f"프로파일 저장: {path}")
+            except OSError as e:
+                self.log(f"프로파일 저장 실패: {str(e)}", "ERROR")
 
-        for widget in self.device_list_frame.winfo_children():
-            widget.destroy()
-        self.device_vars.clear()
+    def identify_device(self, ip, port):
+        """Connect to a device and get its info, returns (ip, port, version, model, serial) or None"""
+        try:
+            if self.transports.connect(f"{ip}:{port}"):
+                # Get Android version, model and serial in one shell round trip
+                info_result = self.adb.run(
+                    ["-s", f"{ip}:{port}", "shell",
+                     "getprop ro.build.version.release; getprop ro.product.model; "
+                     "getprop ro.serialno"],
+                    timeout=5
+                )
+                lines = info_result.stdout.splitlines() + ["", "", ""]
+                version, model, serial = (line.strip() for line in lines[:3])
 
-        if not self.devices:
-            print("[DEBUG] No devices to display - returning early")
-            self.log("표시할 디바이스 없음")
+                return (ip, port, version, model, serial or None)
+        except Exception as e:
+            print(f"[DEBUG] Exception connecting to {ip}:{port} - {str(e)}")
+        return None
+
+    def register_device(self, ip, port, version, model, serial):
+        """Add an identified device to the registry and mark it connected"""
+        device, created = self.registry.upsert(ip, port, version=version,
+                                               model=model, serial=serial)
+        if device.state == AndroidDevice.DISCOVERED:
+            device.set_state(AndroidDevice.CONNECTED)
+        print(f"[DEBUG] Device connected: {device}")
+        try:
+            # Remembered so the next start reconnects it without a scan
+            self.inventory.update(DeviceInventory.key_for(device), addr=device.addr, model=model,
+                                  version=version, last_seen=datetime.now().isoformat(timespec="seconds"))
+        except OSError as e:
+            print(f"[DEBUG] Could not save device inventory: {str(e)}")
+        if created:
+            self.root.after(0, lambda d=device: self.log(f"연결됨: {d}"))
+        return device
+
+    def on_device_changed(self, device, changed):
+        """Registry listener - schedule a refresh of just this device's row"""
+        self.root.after(0, PROFILER.wrap(lambda: self.refresh_device_row(device, changed), "refresh device row"))
+
+    def refresh_device_row(self, device, changed):
+        """Create, update or remove the UI row of a single device"""
+        row = self.device_rows.get(device.addr)
+
+        if "removed" in changed:
+            if row:
+                row["frame"].destroy()
+                del self.device_rows[device.addr]
+                self.update_button_states()
             return
 
-        self.log(f"디바이스 목록 업데이트 중: {len(self.devices)}개")
-        print(f"[DEBUG] Creating UI elements for {len(self.devices)} devices")
-
-        for idx, device in enumerate(self.devices):
-            print(f"[DEBUG] Creating UI for device {idx}: {device}")
+        if row is None:
+            if self.registry.get(device.addr) is not device:
+                return  # Removed before the row was created
+            print(f"[DEBUG] Creating UI row for device: {device}")
             frame = ttk.Frame(self.device_list_frame)
             frame.pack(fill=tk.X, pady=2)
-            print(f"[DEBUG] Frame created and packed")
-
-            var = tk.BooleanVar(value=False)
-            self.device_vars.append((device, var))
-            print(f"[DEBUG] BooleanVar created, device_vars length: {len(self.device_vars)}")
 
-            cb = ttk.Checkbutton(frame, variable=var,
-                               text=str(device),
-                               command=self.update_button_states)
+            var = tk.BooleanVar(value=device.selected)
+            cb = ttk.Checkbutton(frame, variable=var, text=str(device),
+                                 command=lambda d=device, v=var: self.on_device_toggled(d, v))
             cb.pack(side=tk.LEFT, fill=tk.X, expand=True)
-            print(f"[DEBUG] Checkbutton created and packed: {str(device)}")
 
             # Status label
             status_label = ttk.Label(frame, text=device.status, width=15)
             status_label.pack(side=tk.RIGHT)
-            print(f"[DEBUG] Status label created: {device.status}")
 
-        print("[DEBUG] All UI elements created")
+            # Transfer progress - packed only while a push/pull is running
+            progress_bar = ttk.Progressbar(frame, length=100, maximum=100)
+            progress_text = ttk.Label(frame, width=30, foreground="gray")
 
-        # Force update the canvas scroll region
-        self.device_list_frame.update_idletasks()
-        self.device_list_canvas.configure(scrollregion=self.device_list_canvas.bbox("all"))
-        print(f"[DEBUG] Canvas scroll region updated: {self.device_list_canvas.bbox('all')}")
+            self.device_rows[device.addr] = {"frame": frame, "var": var,
+                                             "checkbox": cb, "status": status_label,
+                                             "progress": progress_bar,
+                                             "progress_text": progress_text}
 
-        self.log(f"디바이스 목록 업데이트 완료 - {len(self.device_vars)}개 표시됨")
-        print(f"[DEBUG] Calling update_button_states...")
+            # Force update the canvas scroll region
+            self.device_list_frame.update_idletasks()
+            self.device_list_canvas.configure(scrollregion=self.device_list_canvas.bbox("all"))
+            self.update_button_states()
+            return
+
+        if changed & {"version", "model"}:
+            row["checkbox"].config(text=str(device))
+        if "state" in changed:
+            row["status"].config(text=device.status)
+        if "selected" in changed and row["var"].get() != device.selected:
+            row["var"].set(device.selected)
+            self.update_button_states()
+
+    def on_device_toggled(self, device, var):
+        """Checkbox handler - store the selection on the device record"""
+        device.update(selected=var.get())
         self.update_button_states()
-        print(f"[DEBUG] update_device_list complete")
 
     def update_button_states(self):
         """Update button states based on device selection"""
-        any_selected = any(var.get() for _, var in self.device_vars)
+        any_selected = bool(self.registry.selected())
         self.install_btn.config(state=tk.NORMAL if any_selected else tk.DISABLED)
+        self.preflight_btn.config(state=tk.NORMAL if any_selected else tk.DISABLED)
         self.backup_btn.config(state=tk.NORMAL if any_selected else tk.DISABLED)
         # Scrcpy button should be enabled if device selected OR scrcpy is running
         scrcpy_running = self.scrcpy_process and self.scrcpy_process.poll() is None
@@ -529,7 +4265,7 @@ class RT1018InstallerGUI:
         if self.installing:
             return
 
-        selected_devices = [device for device, var in self.device_vars if var.get()]
+        selected_devices = self.registry.selected()
         if not selected_devices:
             messagebox.showwarning("디바이스 없음", "최소 1개 이상의 디바이스를 선택해주세요")
             return
@@ -540,38 +4276,74 @@ class RT1018InstallerGUI:
                                f"설치 파일을 찾을 수 없음: {self.files_dir}")
             return
 
+        try:
+            concurrency = max(1, int(self.install_concurrency_var.get()))
+            bandwidth_cap = float(self.bandwidth_cap_var.get() or 0)
+            self.stall_timeout = max(5.0, float(self.stall_timeout_var.get() or DEFAULT_STALL_TIMEOUT))
+        except ValueError:
+            messagebox.showerror("잘못된 설정", "동시 설치 수, 대역폭 제한과 전송 정지 감지 시간은 숫자로 입력해주세요")
+            return
+        self.transfers.set_bandwidth_cap(int(bandwidth_cap * 1024 * 1024))
+        self.fresh_install = self.fresh_install_var.get()
+        if self.relay_var.get():
+            self.relay = self.relay or MediaRelay(self.run_adb_command, self.log)
+        elif self.relay is not None:
+            self.relay.stop()
+            self.relay = None
+
         self.installing = True
         self.install_btn.config(state=tk.DISABLED)
         self.backup_btn.config(state=tk.DISABLED)
 
-        def install_thread():
-            total_devices = len(selected_devices)
+        total_devices = len(selected_devices)
+        finished = [0]
+        finished_lock = threading.Lock()
+        # `concurrency` devices actively install; a rebooting device hands its slot to the next one
+        self.install_slots = InstallSlots(concurrency)
+        overlap = total_devices > concurrency
+        # One embedded scrcpy view: only follow the device when a single one installs at a time.
+        # A rebooting device lends its slot, but reboots come after "monitor", so at concurrency 1
+        # the device reaching "monitor" is always the one holding the slot.
+        self.monitor_with_scrcpy = concurrency == 1
+
+        def install_one(idx, device):
+            # With concurrent or overlapping installs every log line is tagged with its device
+            log_prefix = f"[{device.ip}] " if concurrency > 1 or overlap else ""
+            self.install_slots.acquire()
+            try:
+                self.log(f"\n{'='*60}")
+                self.log(f"디바이스에 설치 중 {idx+1}/{total_devices}: {device.ip}")
+                self.log(f"{'='*60}\n")
 
-            for idx, device in enumerate(selected_devices):
-                try:
-                    self.log(f"\n{'='*60}")
-                    self.log(f"디바이스에 설치 중 {idx+1}/{total_devices}: {device.ip}")
-                    self.log(f"{'='*60}\n")
+                self.root.after(0, lambda d=device:
+                              self.progress_label.config(text=f"설치 중: to {d.ip}..."))
+                # Set up front: when the journal skips every step no step would set it
+                if device.can_transition(AndroidDevice.INSTALLING):
+                    device.set_state(AndroidDevice.INSTALLING)
 
-                    # Update progress
-                    progress_pct = (idx / total_devices) * 100
-                    self.root.after(0, lambda p=progress_pct: self.progress.config(value=p))
-                    self.root.after(0, lambda d=device:
-                                  self.progress_label.config(text=f"설치 중: to {d.ip}..."))
+                # Install to device first (scrcpy will be started after root/reboot)
+                self.install_to_device(device, log_prefix=log_prefix)
 
-                    # Install to device first (scrcpy will be started after root/reboot)
-                    self.install_to_device(device)
+                self.log(f"✅ 설치 완료: {device.ip}")
+                device.set_state(AndroidDevice.DONE)
 
-                    self.log(f"✅ 설치 완료: {device.ip}")
+            except Exception as e:
+                self.log(f"❌ 설치 실패: {device.ip}: {str(e)}", "ERROR")
+                device.update(state=AndroidDevice.FAILED, error=str(e))
+            finally:
+                self.install_slots.release()
 
-                    # Update device status
-                    for d, var in self.device_vars:
-                        if d.ip == device.ip:
-                            self.root.after(0, lambda: self.update_device_list())
-                            break
+            # Update progress
+            with finished_lock:
+                finished[0] += 1
+                progress_pct = (finished[0] / total_devices) * 100
+            self.root.after(0, PROFILER.wrap(lambda p=progress_pct: self.progress.config(value=p), "progress"))
 
-                except Exception as e:
-                    self.log(f"❌ 설치 실패: {device.ip}: {str(e)}", "ERROR")
+        def install_thread():
+            with ThreadPoolExecutor(max_workers=min(total_devices, 64),
+                                    thread_name_prefix="install") as pool:
+                for idx, device in enumerate(selected_devices):
+                    pool.submit(install_one, idx, device)
 
             # Complete
             self.root.after(0, lambda: self.progress.config(value=100))
@@ -580,384 +4352,383 @@ class RT1018InstallerGUI:
             self.root.after(0, lambda: self.backup_btn.config(state=tk.NORMAL))
             self.installing = False
             self.log("\n🎉 모든 설치 완료!")
+            self.root.after(0, self.report_scrcpy_after_install)
 
-            # Keep scrcpy running for last device so user can verify
-            self.log("Scrcpy가 마지막 디바이스에서 계속 실행 중 - 완료되면 'Scrcpy 중지'를 클릭하세요")
+        threading.Thread(target=PROFILER.wrap(install_thread, "install batch", "plan"), daemon=True).start()
 
-        threading.Thread(target=install_thread, daemon=True).start()
+    def install_to_device(self, device, log_prefix=""):
+        """Install apps and files to a specific device by running the selected install plan"""
+        plan = self.get_install_plan()
+        source = self.get_installation_source()
+        android_ver = device.version or "Unknown"
+        self.log(f"{log_prefix}설치 계획: {plan['name']} (Android {android_ver}, 소스: {source.name})")
 
-    def install_to_device(self, device):
-        """Install apps and files to a specific device"""
-        device_addr = f"{device.ip}:{device.port}"
-        adb_exe = str(self.adb_path) if self.adb_path.exists() else "adb"
+        # Checkpoint journal - a rerun resumes after the last completed step
+        journal = self.open_install_journal(device, source, fresh=self.fresh_install)
+        if self.fresh_install:
+            self.log(f"{log_prefix}처음부터 설치 - 이전 설치 기록 삭제")
+        elif journal.completed_steps():
+            self.log(f"{log_prefix}이전 설치 기록 발견 - 완료된 단계 {len(journal.completed_steps())}개 건너뜀")
 
-        # Step 1: Root access
-        self.log(f"[1/10] 루트 권한 요청 중...")
+        executor = InstallPlanExecutor(self, plan, device, source, journal, log_prefix=log_prefix)
         try:
-            result = self.run_adb_command(device_addr, ["root"])
-            if "restarting" in result:
-                self.log("디바이스 재시작 대기 중...")
-                time.sleep(3)
-
-                # Reconnect to the device
-                try:
-                    adb_exe = str(self.adb_path) if self.adb_path.exists() else "adb"
-                    subprocess.run([adb_exe, "connect", device_addr],
-                                 capture_output=True, text=True, timeout=5,
-                                 creationflags=SUBPROCESS_FLAGS)
-                except:
-                    pass
-
-                # Wait for this specific device to be ready
-                max_wait = 30
-                for i in range(0, max_wait, 2):
-                    try:
-                        result = subprocess.run(
-                            [adb_exe, "-s", device_addr, "get-state"],
-                            capture_output=True, text=True, timeout=2,
-                            creationflags=SUBPROCESS_FLAGS
-                        )
-                        if result.returncode == 0 and "device" in result.stdout:
-                            self.log(f"디바이스 준비 완료: {i+2}초")
-                            break
-                    except:
-                        pass
-                    time.sleep(2)
-        except Exception as e:
-            self.log(f"루트 접근: {str(e)}", "WARNING")
-
-        # Step 2: Install APKs
-        self.log(f"[2/10] APK 파일 설치 중...")
-        apk_dir = self.files_dir / "apk_files"
-        for apk in self.apk_files:
-            apk_path = apk_dir / apk
-            if apk_path.exists():
-                self.log(f"설치 중: {apk}...")
-                self.run_adb_command(device_addr, ["install", "-r", str(apk_path)])
-            else:
-                self.log(f"APK를 찾을 수 없음: {apk}", "WARNING")
-
-        # Step 3: Grant permissions
-        self.log(f"[3/10] 앱 권한 부여 중...")
-        permissions = [
-            "android.permission.WRITE_SECURE_SETTINGS",
-            "android.permission.ACCESS_FINE_LOCATION",
-            "android.permission.ACCESS_COARSE_LOCATION",
-            "android.permission.READ_EXTERNAL_STORAGE",
-            "android.permission.WRITE_EXTERNAL_STORAGE",
-            "android.permission.CAMERA"
-        ]
-        for perm in permissions:
+            executor.run()
+        finally:
+            # Timings feed the pre-flight estimate of later batches
+            throughput = self.transfers.throughput(device.addr)
             try:
-                self.run_adb_command(device_addr,
-                                   ["shell", "pm", "grant", self.app_package, perm])
-            except:
-                pass  # Some permissions might not be available on all Android versions
-
-        # Step 4: Launch app to create directories
-        self.log(f"[4/10] 앱 초기화 시작...")
-        self.run_adb_command(device_addr,
-                           ["shell", "monkey", "-p", self.app_package,
-                            "-c", "android.intent.category.LAUNCHER", "1"])
-        time.sleep(5)
+                completed = not any(result["status"] == "failed" for result in executor.results.values())
+                self.history.record(executor.results, throughput,
+                                    executor.wall_time if completed else None, executor.rebooted)
+            except OSError as e:
+                print(f"[DEBUG] Could not save install history: {str(e)}")
+        if throughput:
+            self.log(f"{log_prefix}측정된 전송 속도: {throughput / (1024 * 1024):.1f} MB/s")
+
+        # Measured comparison of installs with and without the reboot
+        with_reboot = self.history.run_durations(True)
+        without_reboot = self.history.run_durations(False)
+        if with_reboot and without_reboot:
+            avg_with = sum(with_reboot) / len(with_reboot)
+            avg_without = sum(without_reboot) / len(without_reboot)
+            self.log(f"{log_prefix}⏱ 평균 설치 시간: 재부팅 포함 {avg_with:.0f}초 ({len(with_reboot)}회), "
+                     f"재부팅 생략 {avg_without:.0f}초 ({len(without_reboot)}회)")
+
+    def start_preflight(self):
+        """Estimate transfer volume, free space and batch duration for the selected devices"""
+        selected_devices = self.registry.selected()
+        if not selected_devices:
+            return
+        try:
+            plan = self.get_install_plan()
+            bandwidth_cap = float(self.bandwidth_cap_var.get() or 0) * 1024 * 1024
+        except ValueError as e:
+            messagebox.showerror("사전 점검 실패", str(e))
+            return
+        self.preflight_btn.config(state=tk.DISABLED)
 
-        # NOW start scrcpy - device is stable after root restart and app launch
+        def preflight_thread():
+            try:
+                source = self.get_installation_source()
+                self.log(f"\n🔍 사전 점검: {len(selected_devices)}개 디바이스, 계획 {plan['name']}")
+                steps = compile_install_plan(plan)
+                local = {}  # step id -> {relative path: size}
+                for step in steps:
+                    if step.action in ("push_tree", "push_file"):
+                        local_path = source / step.params["source"]
+                        if local_path.is_file():
+                            local[step.id] = {local_path.name: local_path.stat().st_size}
+                        elif local_path.exists():
+                            local[step.id] = {path.relative_to(local_path).as_posix(): path.stat().st_size
+                                              for path in local_path.rglob('*') if path.is_file()}
+                apk_bytes = {}
+                for step in steps:
+                    if step.action == "install_apk":
+                        apk_path = self.files_dir / "apk_files" / step.params["apk"]
+                        if apk_path.exists():
+                            apk_bytes[step.id] = apk_path.stat().st_size
+
+                with ThreadPoolExecutor(max_workers=8) as pool:
+                    reports = list(pool.map(lambda d: self.preflight_device(d, steps, local, apk_bytes),
+                                            selected_devices))
+
+                throughput = self.history.throughput() or TransferScheduler.DEFAULT_RATE
+                durations = []
+                total_bytes = 0
+                for device, report in zip(selected_devices, reports):
+                    duration = estimate_plan_duration(steps, self.history, report["bytes"], throughput)
+                    durations.append(duration)
+                    device_bytes = sum(report["bytes"].values())
+                    total_bytes += device_bytes
+                    self.log(f"  {device.ip}: 전송 {device_bytes / (1024 * 1024):.1f} MB, "
+                             f"예상 {duration / 60:.1f}분")
+                    for mount, needed in report["needed"].items():
+                        free = report["free"].get(mount)
+                        if free is None:
+                            self.log(f"    {mount}: 여유 공간 확인 불가", "WARNING")
+                        elif free < needed * 1.1:
+                            self.log(f"    ⚠ {mount}: 여유 공간 부족 ({free / (1024 * 1024):.0f} MB, "
+                                     f"필요 {needed / (1024 * 1024):.0f} MB)", "WARNING")
+                        else:
+                            self.log(f"    {mount}: 여유 {free / (1024 * 1024):.0f} MB")
+
+                capacity = bandwidth_cap or ASSUMED_WIFI_CAPACITY
+                best, seconds, predictions = plan_batch_parallelism(durations, total_bytes, capacity)
+                current = max(1, int(self.install_concurrency_var.get() or 1))
+                self.log(f"📊 총 전송량 {total_bytes / (1024 * 1024):.1f} MB, "
+                         f"예상 소요 {seconds / 60:.1f}분 (권장 동시 설치: {best})")
+                if current in predictions and current != best:
+                    self.log(f"   현재 설정 ({current}대 동시): 예상 {predictions[current] / 60:.1f}분")
+                if not self.history.throughput():
+                    self.log("   (설치 기록이 없어 기본값으로 추정 - 설치 후 더 정확해집니다)")
+            except Exception as e:
+                self.log(f"사전 점검 실패: {str(e)}", "ERROR")
+            finally:
+                self.root.after(0, PROFILER.wrap(self.update_button_states))
+
+        threading.Thread(target=preflight_thread, daemon=True).start()
+
+    def preflight_device(self, device, steps, local, apk_bytes):
+        """Bytes each transfer step would move to this device, and free vs needed space"""
+        report = {"bytes": dict(apk_bytes), "free": {}, "needed": {"/sdcard": 0, "/data": 0}}
+        report["needed"]["/data"] = sum(apk_bytes.values())
+        for step in steps:
+            if step.id not in local:
+                continue
+            target = step.params["target"].rstrip("/")
+            try:
+                remote = self.list_remote_file_sizes(device.addr, target)
+            except Exception:
+                remote = {}  # Missing directory or no permission yet - everything is sent
+            pending = sum(size for rel, size in local[step.id].items() if remote.get(rel) != size)
+            report["bytes"][step.id] = pending
+            report["needed"]["/sdcard" if target.startswith("/sdcard") else "/data"] += pending
+        try:
+            output = self.run_adb_command(device.addr, ["shell", "df", "-k", "/sdcard", "/data"])
+            available = parse_df_output(output)
+            if len(available) == 2:
+                report["free"] = {"/sdcard": available[0], "/data": available[1]}
+        except Exception as e:
+            print(f"[DEBUG] df failed on {device.addr}: {str(e)}")
+        return report
+
+    @contextlib.contextmanager
+    def reboot_wait(self, device):
+        """Plan hook: free the device's install slot while it reboots, reclaim it afterwards
+
+        Reclaiming has priority over devices waiting to start (InstallSlots).
+        """
+        slots = self.install_slots
+        if slots is None:
+            yield
+            return
+        slots.release()
+        try:
+            yield
+        finally:
+            slots.acquire(priority=True)
+
+    def on_install_monitor(self, device):
+        """Plan hook: start scrcpy once the device is stable after root restart and app launch"""
+        if not self.monitor_with_scrcpy:
+            print(f"[DEBUG] Concurrent installs - scrcpy not started for {device.ip}")
+            return
         self.log(f"설치 모니터링을 위해 scrcpy 시작...")
         self.root.after(0, lambda d=device: self.auto_start_scrcpy(d))
         time.sleep(3)  # Give scrcpy time to embed
 
-        # Step 5: Push files
-        android_ver = device.version or "Unknown"
-        self.log(f"[5/10] 파일 전송 중... (Android {android_ver})")
-        source = self.get_installation_source()
-
-        # Track transfer results for summary
-        transfer_results = {
-            'sdcard': {'status': None, 'count': 0, 'error': None},
-            'app_files': {'status': None, 'count': 0, 'error': None},
-            'database': {'status': None, 'error': None},
-            'prefs': {'status': None, 'error': None},
-            'ownership': {'status': None, 'owner': None, 'error': None},
-        }
-
-        # Ensure device is connected before file transfer
-        self.ensure_device_connection(device_addr)
-
-        # Push files to sdcard with retry logic
-        sdcard_src = source / "sdcard"
-        if sdcard_src.exists():
-            files_src = sdcard_src / "files"
-            if files_src.exists():
-                # Count files
-                file_count = sum(1 for _ in files_src.rglob('*') if _.is_file())
-                self.log(f"  SD카드 전송 중... ({file_count}개 파일)")
-
-                # Retry logic for file transfer
-                max_retries = 3
-                for attempt in range(max_retries):
-                    try:
-                        # Ensure connection before each attempt
-                        if attempt > 0:
-                            err_msg, solution = self.get_error_message(str(transfer_results['sdcard']['error']))
-                            self.log(f"  ⚠ SD카드 실패: {err_msg} (재시도 {attempt + 1}/{max_retries})")
-                            self.log(f"    → 재연결 중...")
-                            self.ensure_device_connection(device_addr)
-                            time.sleep(2)
-
-                        print(f"[DEBUG] Pushing {files_src} to /sdcard/Android/data/{self.app_package}/")
-                        result = subprocess.run(
-                            [adb_exe, "-s", device_addr, "push", str(files_src),
-                             f"/sdcard/Android/data/{self.app_package}/"],
-                            capture_output=True, text=True, timeout=600,
-                            creationflags=SUBPROCESS_FLAGS
-                        )
-                        if result.returncode != 0:
-                            error_msg = result.stderr if result.stderr else result.stdout
-                            print(f"[DEBUG] Push failed: {error_msg}")
-                            raise Exception(error_msg)
-                        self.log(f"  ✓ SD카드: {file_count}개 파일")
-                        transfer_results['sdcard'] = {'status': 'success', 'count': file_count, 'error': None}
-                        break
-                    except subprocess.TimeoutExpired:
-                        transfer_results['sdcard']['error'] = 'timeout'
-                        if attempt == max_retries - 1:
-                            self.log(f"  ⚠ SD카드 최종 실패: 시간 초과", "WARNING")
-                            self.log(f"    → 해결: 네트워크 확인", "WARNING")
-                            transfer_results['sdcard']['status'] = 'failed'
-                    except Exception as e:
-                        transfer_results['sdcard']['error'] = str(e)
-                        if attempt == max_retries - 1:
-                            err_msg, solution = self.get_error_message(str(e))
-                            self.log(f"  ⚠ SD카드 최종 실패: {err_msg}", "WARNING")
-                            self.log(f"    → 해결: {solution}", "WARNING")
-                            transfer_results['sdcard']['status'] = 'failed'
-
-        # Push data files (database, preferences, app files)
-        data_src = source / "data"
-        if data_src.exists():
-            # Ensure device is still connected before continuing
-            self.ensure_device_connection(device_addr)
-
-            try:
-                self.run_adb_command(device_addr, ["remount"])
-            except:
-                pass
-
-            # Create necessary directories first
-            try:
-                self.run_adb_command(device_addr,
-                    ["shell", "mkdir", "-p", f"/data/data/{self.app_package}/files"])
-                self.run_adb_command(device_addr,
-                    ["shell", "mkdir", "-p", f"/data/data/{self.app_package}/databases"])
-                self.run_adb_command(device_addr,
-                    ["shell", "mkdir", "-p", f"/data/data/{self.app_package}/shared_prefs"])
-                self.run_adb_command(device_addr,
-                    ["shell", "mkdir", "-p", f"/sdcard/Android/data/{self.app_package}/files"])
-            except Exception as e:
-                err_msg, _ = self.get_error_message(str(e))
-                self.log(f"  ⚠ 디렉토리 생성 실패: {err_msg}", "WARNING")
-
-            # Push app files to /data/data
-            data_files = data_src / "files"
-            if data_files.exists():
-                file_count = sum(1 for _ in data_files.rglob('*') if _.is_file())
-                try:
-                    self.run_adb_command(device_addr,
-                                       ["push", str(data_files) + "/.",
-                                        f"/data/data/{self.app_package}/files/"],
-                                       timeout=300)
-                    self.log(f"  ✓ 앱 파일: {file_count}개")
-                    transfer_results['app_files'] = {'status': 'success', 'count': file_count, 'error': None}
-                except Exception as e:
-                    err_msg, solution = self.get_error_message(str(e))
-                    self.log(f"  ⚠ 앱 파일 실패: {err_msg}", "WARNING")
-                    self.log(f"    → 해결: {solution}", "WARNING")
-                    transfer_results['app_files'] = {'status': 'failed', 'count': 0, 'error': str(e)}
-
-            # Push database
-            db_file = data_src / "MainDatabase.db"
-            if db_file.exists():
-                try:
-                    self.run_adb_command(device_addr,
-                                       ["push", str(db_file),
-                                        f"/data/data/{self.app_package}/databases/"],
-                                       timeout=120)
-                    self.log(f"  ✓ DB: MainDatabase.db")
-                    transfer_results['database'] = {'status': 'success', 'error': None}
-                except Exception as e:
-                    err_msg, solution = self.get_error_message(str(e))
-                    self.log(f"  ⚠ DB 실패: {err_msg}", "WARNING")
-                    self.log(f"    → 해결: {solution}", "WARNING")
-                    transfer_results['database'] = {'status': 'failed', 'error': str(e)}
-
-            # Push preferences
-            prefs_file = data_src / f"{self.app_package}_preferences.xml"
-            if prefs_file.exists():
+    def report_scrcpy_after_install(self):
+        """Tell the user which device scrcpy was left running on after a batch (Tk thread)"""
+        device = self.scrcpy_current_device
+        if self.scrcpy_process and self.scrcpy_process.poll() is None and device is not None:
+            # Keep scrcpy running so user can verify
+            self.log(f"Scrcpy가 {device.ip}에서 계속 실행 중 - 완료되면 'Scrcpy 중지'를 클릭하세요")
+
+    def on_transfer_progress(self, device_addr, progress):
+        """TransferProgress listener (worker thread) - show a snapshot in the device's row"""
+        fraction = None if progress.finished else progress.fraction
+        text = None if progress.finished else progress.describe()
+        self.root.after(0, PROFILER.wrap(lambda: self.show_transfer_progress(device_addr, fraction, text),
+                                         "transfer progress"))
+
+    def show_transfer_progress(self, device_addr, fraction, text):
+        """Fill the progress bar of a device row; text None hides it again"""
+        row = self.device_rows.get(device_addr)
+        if row is None:
+            return
+        bar, label = row["progress"], row["progress_text"]
+        if text is None:
+            bar.stop()
+            bar.pack_forget()
+            label.pack_forget()
+            return
+        if not bar.winfo_ismapped():
+            label.pack(side=tk.RIGHT, padx=(0, 5))
+            bar.pack(side=tk.RIGHT, padx=(0, 5))
+        if fraction is None:
+            # Pulls have no known size - keep the bar moving instead
+            if str(bar.cget("mode")) != "indeterminate":
+                bar.config(mode="indeterminate")
+                bar.start(50)
+        else:
+            if str(bar.cget("mode")) != "determinate":
+                bar.stop()
+                bar.config(mode="determinate")
+            bar["value"] = fraction * 100
+        label.config(text=text)
+
+    def list_install_plans(self):
+        """Available plan profiles: the built-in default plus install_plans/*.json|yaml"""
+        names = ["default"]
+        if self.plans_dir.exists():
+            for path in sorted(self.plans_dir.iterdir()):
+                if path.suffix.lower() in (".json", ".yaml", ".yml") and path.stem not in names:
+                    names.append(path.stem)
+        return names
+
+    def get_install_plan(self):
+        """Load the plan profile selected in the UI"""
+        name = self.plan_profile_var.get() or "default"
+        for suffix in (".json", ".yaml", ".yml"):
+            path = self.plans_dir / f"{name}{suffix}"
+            if path.exists():
+                plan = load_install_plan(path)
+                compile_install_plan(plan)  # Validate before touching the device
+                return plan
+        return DEFAULT_INSTALL_PLAN
+
+    def open_install_journal(self, device, source, fresh=False):
+        """Open the checkpoint journal for a device and installation source (`fresh`: start over)"""
+        key = device.serial or device.addr
+        safe_key = re.sub(r"[^A-Za-z0-9_.-]", "_", key)
+        return InstallJournal(self.journal_dir / f"{safe_key}.json",
+                              InstallJournal.source_fingerprint(source), fresh=fresh)
+
+    def push_tree_resumable(self, device_addr, journal, group, local_dir, remote_dir,
+                            local_files=None, progress=None, timeout=300):
+        """Push a directory tree, skipping files the journal records as transferred
+
+        `local_files` ({relative path: size}) may come from a prepared manifest;
+        otherwise the tree is walked. Returns the number of files pushed in this
+        call. On failure the files that did reach the device (by size) are
+        recorded before the error is re-raised. `progress` (a TransferProgress)
+        is restarted with the pending bytes and follows every push. `timeout`
+        only applies where stall detection is unavailable (see run_watched).
+        """
+        if local_files is None:
+            local_files = {path.relative_to(local_dir).as_posix(): path.stat().st_size
+                           for path in local_dir.rglob('*') if path.is_file()}
+        done = journal.pushed_files(group)
+        pending = sum(1 for rel, size in local_files.items() if done.get(rel) != size)
+        pending_bytes = sum(size for rel, size in local_files.items() if done.get(rel) != size)
+
+        with PROFILER.span("push_tree", "transfer", device=device_addr, group=group):
+            # A stalled push is resumed (not restarted) from the files that already arrived
+            for attempt in range(STALL_RETRIES + 1):
                 try:
-                    self.run_adb_command(device_addr,
-                                       ["push", str(prefs_file),
-                                        f"/data/data/{self.app_package}/shared_prefs/"],
-                                       timeout=60)
-                    self.log(f"  ✓ 설정: {prefs_file.name}")
-                    transfer_results['prefs'] = {'status': 'success', 'error': None}
-                except Exception as e:
-                    err_msg, solution = self.get_error_message(str(e))
-                    self.log(f"  ⚠ 설정 실패: {err_msg}", "WARNING")
-                    self.log(f"    → 해결: {solution}", "WARNING")
-                    transfer_results['prefs'] = {'status': 'failed', 'error': str(e)}
+                    if progress is not None:
+                        # A resume counts the files that arrived before the stall as done
+                        done = journal.pushed_files(group)
+                        remaining = sum(size for rel, size in local_files.items()
+                                        if done.get(rel) != size)
+                        progress.start(pending_bytes, done=pending_bytes - remaining)
+                    self._push_tree_resumable(device_addr, journal, group, local_dir, remote_dir,
+                                              local_files, progress, timeout)
+                    return pending
+                except TransferStalled:
+                    if attempt == STALL_RETRIES:
+                        raise
+                    self.log(f"  ⚠ 전송 정지 감지 - 받은 파일 이후부터 이어서 전송 "
+                             f"({attempt + 1}/{STALL_RETRIES})", "WARNING")
+                    self.transports.mark_unhealthy(device_addr)
+                    self.ensure_device_connection(device_addr)
+
+    def _push_tree_resumable(self, device_addr, journal, group, local_dir, remote_dir, local_files,
+                             progress=None, timeout=300):
+        done = journal.pushed_files(group)
+        pending = [rel for rel, size in local_files.items() if done.get(rel) != size]
+        if not pending:
+            return 0
 
-        # Step 6: Fix ownership (always run, not just Android 12+)
-        self.log(f"[6/10] 파일 소유권 수정 중...")
         try:
-            # Get app owner
-            result = self.run_adb_command(device_addr,
-                                        ["shell", "stat", "-c", "%U",
-                                         f"/data/data/{self.app_package}"])
-            app_owner = result.strip()
-
-            if app_owner and app_owner != "unknown":
+            if len(pending) == len(local_files):
+                # Nothing transferred yet - one push of the whole tree is fastest
                 self.run_adb_command(device_addr,
-                                   ["shell", "chown", "-R",
-                                    f"{app_owner}:{app_owner}",
-                                    f"/data/data/{self.app_package}"])
-                self.run_adb_command(device_addr,
-                                   ["shell", "chown", "-R",
-                                    f"{app_owner}:{app_owner}",
-                                    f"/sdcard/Android/data/{self.app_package}"])
-                self.log(f"  ✓ 소유권: {app_owner}")
-                transfer_results['ownership'] = {'status': 'success', 'owner': app_owner, 'error': None}
-            else:
-                self.log(f"  ⚠ 소유권 실패: 앱 소유자 불명", "WARNING")
-                self.log(f"    → 해결: 앱 설치 확인", "WARNING")
-                transfer_results['ownership'] = {'status': 'failed', 'owner': None, 'error': 'unknown owner'}
-        except Exception as e:
-            err_msg, solution = self.get_error_message(str(e))
-            self.log(f"  ⚠ 소유권 실패: {err_msg}", "WARNING")
-            self.log(f"    → 해결: {solution}", "WARNING")
-            transfer_results['ownership'] = {'status': 'failed', 'owner': None, 'error': str(e)}
-
-        # Verification: Check if key files exist on device
-        self.log(f"  파일 검증 중...")
-        verified_count = 0
-        missing_files = []
-        try:
-            # Check database
-            result = self.run_adb_command(device_addr,
-                                        ["shell", "ls", f"/data/data/{self.app_package}/databases/MainDatabase.db"])
-            if "MainDatabase.db" in result:
-                verified_count += 1
+                                   ["push", str(local_dir) + "/.", remote_dir + "/"], timeout=timeout,
+                                   watch=True, stall_retries=0, progress=progress,
+                                   nbytes=sum(local_files.values()))
             else:
-                missing_files.append("DB")
-        except:
-            missing_files.append("DB")
-
-        try:
-            # Check app files directory
-            result = self.run_adb_command(device_addr,
-                                        ["shell", "ls", f"/data/data/{self.app_package}/files/"])
-            if result.strip():
-                verified_count += 1
-            else:
-                missing_files.append("앱 파일")
-        except:
-            missing_files.append("앱 파일")
-
-        if missing_files:
-            self.log(f"  ⚠ 검증: {len(missing_files)}개 항목 누락 ({', '.join(missing_files)})", "WARNING")
-        else:
-            self.log(f"  ✓ 검증: 주요 파일 확인됨")
-
-        # Transfer Summary
-        success_count = sum(1 for k, v in transfer_results.items() if v.get('status') == 'success')
-        failed_count = sum(1 for k, v in transfer_results.items() if v.get('status') == 'failed')
-        total_count = success_count + failed_count
-
-        if failed_count > 0:
-            self.log(f"━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━")
-            self.log(f"⚠ 전송 결과: {success_count}/{total_count} 성공")
-            for key, val in transfer_results.items():
-                if val.get('status') == 'failed':
-                    name_map = {'sdcard': 'SD카드', 'app_files': '앱 파일', 'database': 'DB', 'prefs': '설정', 'ownership': '소유권'}
-                    err_msg, _ = self.get_error_message(str(val.get('error', '')))
-                    self.log(f"  - {name_map.get(key, key)}: 실패 ({err_msg})")
-            self.log(f"━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━")
-
-        # Step 7: Force stop app
-        self.log(f"[7/10] 앱 중지 중...")
-        self.run_adb_command(device_addr, ["shell", "am", "force-stop", self.app_package])
-
-        # Step 8: Set language and keyboard
-        self.log(f"[8/10] 시스템 언어 및 키보드 설정 중...")
-        korean_kb = "com.google.android.inputmethod.korean/.KoreanIme"
-
-        # Set language
-        self.run_adb_command(device_addr,
-                           ["shell", "settings", "put", "global",
-                            "system_locales", "ko-KR"])
-        self.run_adb_command(device_addr,
-                           ["shell", "settings", "put", "system",
-                            "system_locales", "ko-KR"])
-        self.run_adb_command(device_addr,
-                           ["shell", "setprop", "persist.sys.language", "ko"])
-        self.run_adb_command(device_addr,
-                           ["shell", "setprop", "persist.sys.country", "KR"])
-
-        # Set keyboard
-        self.run_adb_command(device_addr, ["shell", "ime", "enable", korean_kb])
-        self.run_adb_command(device_addr, ["shell", "ime", "set", korean_kb])
-
-        # Step 9: Reboot
-        self.log(f"[9/10] 디바이스 재부팅 중...")
-        self.run_adb_command(device_addr, ["reboot"])
-
-        self.log("디바이스 재부팅 대기 중...")
-        time.sleep(5)  # Initial wait for reboot to start
-
-        # Wait for this specific device to come back online
-        self.log("디바이스 온라인 대기 중...")
-        max_wait = 60  # Wait up to 60 seconds
-        wait_interval = 2
-        for i in range(0, max_wait, wait_interval):
+                # Resume: push only missing files, one adb call per directory
+                by_dir = {}
+                for rel in pending:
+                    parent = rel.rpartition("/")[0]
+                    by_dir.setdefault(parent, []).append(rel)
+                remote_dirs = [f"{remote_dir}/{parent}".rstrip("/") for parent in by_dir]
+                self.run_adb_command(device_addr,
+                                   ["shell", "mkdir", "-p"] + [shell_quote(d) for d in remote_dirs])
+                for parent, rels in by_dir.items():
+                    target = f"{remote_dir}/{parent}".rstrip("/") + "/"
+                    self.run_adb_command(device_addr,
+                                       ["push"] + [str(local_dir / rel) for rel in rels] + [target],
+                                       timeout=timeout, watch=True, stall_retries=0, progress=progress,
+                                       nbytes=sum(local_files[rel] for rel in rels))
+            journal.record_files(group, {rel: local_files[rel] for rel in pending})
+        except Exception:
             try:
-                # Try to get device state
-                result = subprocess.run(
-                    [adb_exe, "-s", device_addr, "get-state"],
-                    capture_output=True, text=True, timeout=2,
-                    creationflags=SUBPROCESS_FLAGS
-                )
-                if result.returncode == 0 and "device" in result.stdout:
-                    self.log(f"디바이스 온라인 복귀: {i+wait_interval}초")
-                    break
-            except:
-                pass
-            time.sleep(wait_interval)
-        else:
-            self.log("디바이스 재부팅이 예상보다 오래 걸림, 그래도 계속 진행...", "WARNING")
-
-        # Step 10: Set home app
-        self.log(f"[10/10] 홈 앱 설정 중...")
-        time.sleep(5)  # Wait for system to stabilize
-
-        # Re-enable keyboard after reboot
-        self.run_adb_command(device_addr, ["shell", "ime", "enable", korean_kb])
-        self.run_adb_command(device_addr, ["shell", "ime", "set", korean_kb])
-
-        # Set as home app
-        home_component = f"{self.app_package}/.MainActivity"
-        self.run_adb_command(device_addr,
-                           ["shell", "cmd", "package", "set-home-activity", home_component])
+                remote = self.list_remote_file_sizes(device_addr, remote_dir)
+                journal.record_files(group, {rel: size for rel, size in local_files.items()
+                                             if remote.get(rel) == size})
+            except Exception as e:
+                print(f"[DEBUG] Could not record partial push progress: {str(e)}")
+            raise
+        return len(pending)
+
+    def list_remote_file_sizes(self, device_addr, remote_dir):
+        """Return {relative path: size} for every file under a device directory"""
+        output = self.run_adb_command(device_addr,
+                                    ["shell", f"find {shell_quote(remote_dir)} -type f -exec stat -c '%s %n' {{}} +"])
+        sizes = {}
+        prefix = remote_dir.rstrip("/") + "/"
+        for line in output.splitlines():
+            size, _, path = line.strip().partition(" ")
+            if size.isdigit() and path.startswith(prefix):
+                sizes[path[len(prefix):]] = int(size)
+        return sizes
 
     def get_installation_source(self):
         """Get the installation source directory based on user selection"""
         if self.install_source_var.get() == "backup":
             selected = self.backup_combo.get()
+            if selected.endswith(BUNDLE_SUFFIX):
+                return self.open_bundle_source(self.backup_dir / selected)
             if selected:
                 return self.backup_dir / selected
         return self.files_dir
 
+    def open_bundle_source(self, bundle_path):
+        """Extract a bundle once into bundle_cache/ and reuse it for every device"""
+        with self.bundle_lock:
+            bundle = InstallBundle(bundle_path)
+            cache_dir = self.bundle_cache_dir / f"{bundle_path.stem}-{bundle.bundle_id[:12]}"
+            if not (cache_dir / BUNDLE_MANIFEST_NAME).exists():
+                self.log(f"설치 번들 준비 중: {bundle_path.name} ({len(bundle.files)}개 파일)")
+                if cache_dir.exists():
+                    shutil.rmtree(cache_dir)  # Left over from an interrupted extraction
+                bundle.extract(cache_dir)
+            return cache_dir
+
+    def build_bundle(self):
+        """Pack the current installation source into a single bundle file in backups/"""
+        source = self.get_installation_source()
+        if (source / BUNDLE_MANIFEST_NAME).exists():
+            messagebox.showinfo("설치 번들", "이미 번들에서 불러온 소스입니다")
+            return
+        if not source.exists():
+            messagebox.showerror("파일을 찾을 수 없음", f"설치 소스를 찾을 수 없음: {source}")
+            return
+        bundle_path = self.backup_dir / f"{source.name}{BUNDLE_SUFFIX}"
+        self.bundle_btn.config(state=tk.DISABLED)
+
+        def bundle_thread():
+            try:
+                self.log(f"설치 번들 생성 중: {source.name}...")
+                start = time.time()
+                bundle = InstallBundle.build(source, bundle_path)
+                size = sum(entry["size"] for entry in bundle.files.values())
+                self.log(f"✓ 설치 번들 생성 완료: {bundle_path.name} ({len(bundle.files)}개 파일, "
+                         f"{size / (1024 * 1024):.1f} MB → {bundle_path.stat().st_size / (1024 * 1024):.1f} MB, "
+                         f"{time.time() - start:.1f}초)")
+                self.root.after(0, PROFILER.wrap(self.refresh_backup_list))
+            except Exception as e:
+                self.log(f"설치 번들 생성 실패: {str(e)}", "ERROR")
+            finally:
+                self.root.after(0, lambda: self.bundle_btn.config(state=tk.NORMAL))
+
+        threading.Thread(target=bundle_thread, daemon=True).start()
+
     def start_backup(self):
         """Backup apps and files from selected device"""
-        selected_devices = [device for device, var in self.device_vars if var.get()]
+        selected_devices = self.registry.selected()
         if not selected_devices:
             messagebox.showwarning("디바이스 없음", "백업할 디바이스를 선택해주세요")
             return
@@ -967,6 +4738,12 @@ class RT1018InstallerGUI:
                                  "백업할 디바이스를 1개만 선택해주세요")
             return
 
+        try:
+            self.stall_timeout = max(5.0, float(self.stall_timeout_var.get() or DEFAULT_STALL_TIMEOUT))
+        except ValueError:
+            messagebox.showerror("잘못된 설정", "전송 정지 감지 시간은 숫자로 입력해주세요")
+            return
+
         device = selected_devices[0]
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         backup_name = f"backup_{device.ip.replace('.', '_')}_{timestamp}"
@@ -975,129 +4752,134 @@ class RT1018InstallerGUI:
 
         def backup_thread():
             try:
-                self.log(f"\n{'='*60}")
-                self.log(f"백업 시작: {device.ip}")
-                self.log(f"백업 위치: {backup_path}")
-                self.log(f"{'='*60}\n")
+                with PROFILER.span("backup", "backup", device=device.addr):
+                    self.backup_device(device, backup_path, timestamp)
 
-                device_addr = f"{device.ip}:{device.port}"
+                self.log(f"\n✅ 백업 완료!")
+                self.log(f"백업 저장 위치: {backup_path}")
 
-                # Request root access first (needed for /data/data access)
-                self.log("[1/6] 루트 권한 요청 중...")
-                try:
-                    result = self.run_adb_command(device_addr, ["root"])
-                    if "restarting" in result:
-                        self.log("디바이스 재시작 대기 중...")
-                        time.sleep(3)
-                        # Reconnect
-                        adb_exe = str(self.adb_path) if self.adb_path.exists() else "adb"
-                        subprocess.run([adb_exe, "connect", device_addr],
-                                     capture_output=True, text=True, timeout=5,
-                                     creationflags=SUBPROCESS_FLAGS)
-                        # Wait for device to be ready
-                        for i in range(15):
-                            try:
-                                result = subprocess.run(
-                                    [adb_exe, "-s", device_addr, "get-state"],
-                                    capture_output=True, text=True, timeout=2,
-                                    creationflags=SUBPROCESS_FLAGS
-                                )
-                                if result.returncode == 0 and "device" in result.stdout:
-                                    self.log(f"디바이스 준비 완료: {i+2}초")
-                                    break
-                            except:
-                                pass
-                            time.sleep(2)
-                except Exception as e:
-                    self.log(f"루트 접근: {str(e)}", "WARNING")
+                # Refresh backup list
+                self.root.after(0, PROFILER.wrap(self.refresh_backup_list))
 
-                # Create directory structure (matching install_files structure)
-                apk_dir = backup_path / "apk_files"
-                apk_dir.mkdir(exist_ok=True)
+            except Exception as e:
+                self.log(f"❌ 백업 실패: {str(e)}", "ERROR")
 
-                sdcard_dir = backup_path / "sdcard"
-                sdcard_dir.mkdir(exist_ok=True)
+        threading.Thread(target=backup_thread, daemon=True).start()
 
-                data_dir = backup_path / "data"
-                data_dir.mkdir(exist_ok=True)
+    def backup_device(self, device, backup_path, timestamp):
+        """Pull the app, its files, database and preferences from one device into backup_path"""
+        self.log(f"\n{'='*60}")
+        self.log(f"백업 시작: {device.ip}")
+        self.log(f"백업 위치: {backup_path}")
+        self.log(f"{'='*60}\n")
 
-                # Pull APK
-                self.log("[2/6] APK 백업 중...")
-                apk_path = self.run_adb_command(device_addr,
-                                              ["shell", "pm", "path", self.app_package])
-                if apk_path:
-                    apk_path = apk_path.replace("package:", "").strip()
-                    self.run_adb_command(device_addr,
-                                       ["pull", apk_path,
-                                        str(apk_dir / "EightPresso.apk")])
-                    self.log(f"✓ APK 백업 완료: {apk_dir / 'EightPresso.apk'}")
+        device_addr = f"{device.ip}:{device.port}"
 
-                # Pull files from sdcard
-                self.log("[3/6] /sdcard에서 파일 백업 중...")
-                try:
-                    result = self.run_adb_command(device_addr,
-                                       ["pull",
-                                        f"/sdcard/Android/data/{self.app_package}/files",
-                                        str(sdcard_dir)])
-                    self.log(f"✓ SD카드 파일 백업 완료")
-                except Exception as e:
-                    self.log(f"⚠ SD카드 백업 실패: {str(e)}", "WARNING")
+        # Request root access first (needed for /data/data access)
+        self.log("[1/6] 루트 권한 요청 중...")
+        try:
+            result = self.run_adb_command(device_addr, ["root"])
+            if "restarting" in result:
+                self.log("디바이스 재시작 대기 중...")
+                elapsed = self.transports.wait_for_device(device_addr, max_wait=30,
+                                                          initial_delay=1)
+                if elapsed is not None:
+                    self.log(f"디바이스 준비 완료: {elapsed:.0f}초")
+            if device.can_transition(AndroidDevice.ROOTED):
+                device.set_state(AndroidDevice.ROOTED)
+        except Exception as e:
+            self.log(f"루트 접근: {str(e)}", "WARNING")
 
-                # Pull files from /data/data
-                self.log("[4/6] /data/data에서 앱 파일 백업 중...")
-                try:
-                    result = self.run_adb_command(device_addr,
-                                       ["pull",
-                                        f"/data/data/{self.app_package}/files",
-                                        str(data_dir)])
-                    self.log(f"✓ 앱 파일 백업 완료")
-                except Exception as e:
-                    self.log(f"⚠ 앱 파일 백업 실패: {str(e)}", "WARNING")
+        # Create directory structure (matching install_files structure)
+        apk_dir = backup_path / "apk_files"
+        apk_dir.mkdir(exist_ok=True)
 
-                # Pull database
-                self.log("[5/6] 데이터베이스 백업 중...")
-                try:
-                    result = self.run_adb_command(device_addr,
-                                       ["pull",
-                                        f"/data/data/{self.app_package}/databases/MainDatabase.db",
-                                        str(data_dir / "MainDatabase.db")])
-                    self.log(f"✓ 데이터베이스 백업 완료")
-                except Exception as e:
-                    self.log(f"⚠ 데이터베이스 백업 실패: {str(e)}", "WARNING")
+        sdcard_dir = backup_path / "sdcard"
+        sdcard_dir.mkdir(exist_ok=True)
 
-                # Pull preferences
-                self.log("[6/6] 환경설정 백업 중...")
-                try:
-                    result = self.run_adb_command(device_addr,
-                                       ["pull",
-                                        f"/data/data/{self.app_package}/shared_prefs/{self.app_package}_preferences.xml",
-                                        str(data_dir / f"{self.app_package}_preferences.xml")])
-                    self.log(f"✓ 환경설정 백업 완료")
-                except Exception as e:
-                    self.log(f"⚠ 환경설정 백업 실패: {str(e)}", "WARNING")
+        data_dir = backup_path / "data"
+        data_dir.mkdir(exist_ok=True)
 
-                # Create backup metadata
-                metadata = {
-                    "device_ip": device.ip,
-                    "device_model": device.model,
-                    "android_version": device.version,
-                    "timestamp": timestamp,
-                    "backup_name": backup_name
-                }
+        # Pulled sizes are unknown up front - the row shows MB moved and the rate
+        progress = TransferProgress("백업", listener=lambda p: self.on_transfer_progress(device_addr, p))
+        try:
+            # Pull APK
+            self.log("[2/6] APK 백업 중...")
+            apk_path = self.run_adb_command(device_addr,
+                                          ["shell", "pm", "path", self.app_package])
+            if apk_path:
+                apk_path = apk_path.replace("package:", "").strip()
+                self.run_adb_command(device_addr,
+                                   ["pull", apk_path,
+                                    str(apk_dir / "EightPresso.apk")], watch=True, progress=progress)
+                self.log(f"✓ APK 백업 완료: {apk_dir / 'EightPresso.apk'}")
 
-                with open(backup_path / "backup_info.json", "w") as f:
-                    json.dump(metadata, f, indent=2)
+            # Pull files from sdcard
+            self.log("[3/6] /sdcard에서 파일 백업 중...")
+            try:
+                result = self.run_adb_command(device_addr,
+                                   ["pull",
+                                    f"/sdcard/Android/data/{self.app_package}/files",
+                                    str(sdcard_dir)], watch=True, progress=progress)
+                self.log(f"✓ SD카드 파일 백업 완료")
+            except Exception as e:
+                self.log(f"⚠ SD카드 백업 실패: {str(e)}", "WARNING")
 
-                self.log(f"\n✅ 백업 완료!")
-                self.log(f"백업 저장 위치: {backup_path}")
+            # Pull files from /data/data
+            self.log("[4/6] /data/data에서 앱 파일 백업 중...")
+            try:
+                result = self.run_adb_command(device_addr,
+                                   ["pull",
+                                    f"/data/data/{self.app_package}/files",
+                                    str(data_dir)], watch=True, progress=progress)
+                self.log(f"✓ 앱 파일 백업 완료")
+            except Exception as e:
+                self.log(f"⚠ 앱 파일 백업 실패: {str(e)}", "WARNING")
 
-                # Refresh backup list
-                self.root.after(0, self.refresh_backup_list)
+            # Pull database
+            self.log("[5/6] 데이터베이스 백업 중...")
+            try:
+                result = self.run_adb_command(device_addr,
+                                   ["pull",
+                                    f"/data/data/{self.app_package}/databases/MainDatabase.db",
+                                    str(data_dir / "MainDatabase.db")], watch=True, progress=progress)
+                self.log(f"✓ 데이터베이스 백업 완료")
+            except Exception as e:
+                self.log(f"⚠ 데이터베이스 백업 실패: {str(e)}", "WARNING")
 
+            # Pull preferences
+            self.log("[6/6] 환경설정 백업 중...")
+            try:
+                result = self.run_adb_command(device_addr,
+                                   ["pull",
+                                    f"/data/data/{self.app_package}/shared_prefs/{self.app_package}_preferences.xml",
+                                    str(data_dir / f"{self.app_package}_preferences.xml")], watch=True, progress=progress)
+                self.log(f"✓ 환경설정 백업 완료")
             except Exception as e:
-                self.log(f"❌ 백업 실패: {str(e)}", "ERROR")
+                self.log(f"⚠ 환경설정 백업 실패: {str(e)}", "WARNING")
+        finally:
+            progress.close()
+
+        # Create backup metadata
+        metadata = {
+            "device_ip": device.ip,
+            "device_model": device.model,
+            "android_version": device.version,
+            "timestamp": timestamp,
+            "backup_name": backup_path.name
+        }
 
-        threading.Thread(target=backup_thread, daemon=True).start()
+        # Checksums of the pulled files (worker processes); also warms the hash cache
+        # for an install from this backup
+        try:
+            manifest = build_source_manifest(backup_path)
+            metadata["files"] = {rel: list(entry) for rel, entry in manifest.items()}
+            self.log(f"✓ 백업 체크섬: {len(manifest)}개 파일")
+        except OSError as e:
+            self.log(f"⚠ 백업 체크섬 계산 실패: {str(e)}", "WARNING")
+
+        with open(backup_path / "backup_info.json", "w") as f:
+            json.dump(metadata, f, indent=2)
 
     def refresh_backup_list(self):
         """Refresh the list of available backups"""
@@ -1106,6 +4888,8 @@ class RT1018InstallerGUI:
             for item in self.backup_dir.iterdir():
                 if item.is_dir() and item.name.startswith("backup_"):
                     backups.append(item.name)
+                elif item.is_file() and item.suffix == BUNDLE_SUFFIX:
+                    backups.append(item.name)
         backups.sort(reverse=True)
         self.backup_combo['values'] = backups
         if backups:
@@ -1190,6 +4974,7 @@ class RT1018InstallerGUI:
 
                 # STEP 2: Connect to database and get referenced images
                 self.log("단계 2: 데이터베이스에서 이미지 참조 스캔 중...")
+                import sqlite3  # Only the cleanup tool needs it
                 conn = sqlite3.connect(db_path)
                 cursor = conn.cursor()
 
@@ -1278,7 +5063,7 @@ class RT1018InstallerGUI:
                 self.log(f"❌ 정리 실패: {str(e)}", "ERROR")
                 messagebox.showerror("정리 오류", f"정리 실패: {str(e)}")
 
-        threading.Thread(target=cleanup_thread, daemon=True).start()
+        threading.Thread(target=PROFILER.wrap(cleanup_thread, "cleanup", "cleanup"), daemon=True).start()
 
     def auto_start_scrcpy(self, device):
         """Automatically start scrcpy for a specific device (called during installation)"""
@@ -1350,7 +5135,8 @@ class RT1018InstallerGUI:
             self.scrcpy_retry_count = 0  # Reset retry count on successful start
 
             # Wait for window and embed it, store callback ID
-            self.scrcpy_search_id = self.root.after(2000, lambda: self.find_and_embed_scrcpy_window(window_title))
+            self.scrcpy_search_id = self.root.after(2000, PROFILER.wrap(
+                lambda: self.find_and_embed_scrcpy_window(window_title), "find scrcpy window"))
 
             self.scrcpy_btn.config(text="Scrcpy 중지")
 
@@ -1390,7 +5176,7 @@ class RT1018InstallerGUI:
                 self.log("Scrcpy 임베드 불가: pywin32 미설치", "ERROR")
                 return
 
-            selected_devices = [device for device, var in self.device_vars if var.get()]
+            selected_devices = self.registry.selected()
             if not selected_devices:
                 messagebox.showwarning("디바이스 없음", "먼저 디바이스를 선택해주세요")
                 return
@@ -1446,7 +5232,7 @@ class RT1018InstallerGUI:
                 self.scrcpy_placeholder.place_forget()
 
                 # Monitor the embedded window and store callback ID
-                self.scrcpy_monitor_id = self.root.after(1000, self.monitor_embedded_scrcpy)
+                self.scrcpy_monitor_id = self.root.after(1000, PROFILER.wrap(self.monitor_embedded_scrcpy))
 
             except Exception as e:
                 print(f"[DEBUG] Failed to embed: {str(e)}")
@@ -1458,7 +5244,8 @@ class RT1018InstallerGUI:
             # Try again
             if self.scrcpy_process and self.scrcpy_process.poll() is None:
                 # Store the callback ID for the retry
-                self.scrcpy_search_id = self.root.after(1000, lambda: self.find_and_embed_scrcpy_window(window_title))
+                self.scrcpy_search_id = self.root.after(1000, PROFILER.wrap(
+                lambda: self.find_and_embed_scrcpy_window(window_title), "find scrcpy window"))
             else:
                 # Scrcpy process died - trigger retry if not user-stopped
                 print("[DEBUG] Scrcpy process died")
@@ -1498,7 +5285,7 @@ class RT1018InstallerGUI:
                         pass
 
                 # Schedule next check and store the callback ID
-                self.scrcpy_monitor_id = self.root.after(1000, self.monitor_embedded_scrcpy)
+                self.scrcpy_monitor_id = self.root.after(1000, PROFILER.wrap(self.monitor_embedded_scrcpy))
             else:
                 # Process ended
                 print(f"[DEBUG] Scrcpy stopped (exit code: {poll}), user_stopped={self.scrcpy_user_stopped}")
@@ -1593,6 +5380,7 @@ class RT1018InstallerGUI:
         error_map = {
             'device offline': ('연결 끊김', '네트워크 확인'),
             'connect failed: closed': ('연결 종료됨', '재시도'),
+            'stalled': ('전송 정지됨', '네트워크 확인 후 재시도'),
             'timeout': ('시간 초과', '네트워크 확인'),
             'permission denied': ('권한 거부됨', '루트 권한 확인'),
             'read-only file': ('읽기전용 파일시스템', 'remount 재시도'),
@@ -1605,21 +5393,48 @@ class RT1018InstallerGUI:
                 return msg, solution
         return '알 수 없는 오류', '로그 확인'
 
-    def run_adb_command(self, device, command, timeout=60):
-        """Run an ADB command and return output"""
-        adb_exe = str(self.adb_path) if self.adb_path.exists() else "adb"
+    def run_adb_command(self, device, command, timeout=60, watch=False, stall_retries=STALL_RETRIES,
+                        progress=None, nbytes=None, step=None):
+        """Run an ADB command and return output
 
+        `step` is the id of the install plan step running the command; its
+        timeout is then learned per device and step (see AdaptiveTimeouts).
+
+        With `watch` (push/pull/install) there is no fixed timeout: the transfer
+        is aborted when it moves no data for `stall_timeout` seconds and retried
+        after a reconnect, up to `stall_retries` times (or, where stall detection
+        is unavailable, killed after `timeout`). A TransferProgress passed
+        as `progress` follows the `nbytes` of payload the command moves.
+        """
         if device:
-            full_cmd = [adb_exe, "-s", device] + command
+            full_cmd = ["-s", device] + command
         else:
-            full_cmd = [adb_exe] + command
+            full_cmd = command
 
-        print(f"[DEBUG] ADB: {' '.join(full_cmd)}")
-        result = subprocess.run(full_cmd, capture_output=True, text=True, timeout=timeout,
-                               creationflags=SUBPROCESS_FLAGS)
+        print(f"[DEBUG] ADB: adb {' '.join(full_cmd)}")
+        if not watch:
+            result = self.adb.run(full_cmd, timeout=timeout, step=step)
+        else:
+            for attempt in range(stall_retries + 1):
+                try:
+                    result = self.adb.run_watched(full_cmd, self.stall_timeout,
+                                                  progress=progress, nbytes=nbytes, timeout=timeout)
+                    break
+                except TransferStalled as e:
+                    if attempt == stall_retries:
+                        raise
+                    self.log(f"  ⚠ 전송 정지 감지 ({self.stall_timeout:.0f}초 동안 데이터 없음) - "
+                             f"재시도 {attempt + 1}/{stall_retries}", "WARNING")
+                    print(f"[DEBUG] {str(e)}")
+                    if device:
+                        self.transports.mark_unhealthy(device)
+                        self.ensure_device_connection(device)
 
         if result.returncode != 0 and result.stderr:
             print(f"[DEBUG] ADB ERROR: {result.stderr}")
+            if device and any(marker in result.stderr.lower()
+                              for marker in ("offline", "not found", "closed", "no devices")):
+                self.transports.mark_unhealthy(device)
             raise Exception(result.stderr)
 
         if result.stdout:
@@ -1629,63 +5444,40 @@ class RT1018InstallerGUI:
 
     def ensure_device_connection(self, device_addr, max_retries=3):
         """Ensure device is connected, reconnect if necessary"""
-        adb_exe = str(self.adb_path) if self.adb_path.exists() else "adb"
-
-        for attempt in range(max_retries):
-            try:
-                # Check if device is online
-                result = subprocess.run(
-                    [adb_exe, "-s", device_addr, "get-state"],
-                    capture_output=True, text=True, timeout=5,
-                    creationflags=SUBPROCESS_FLAGS
-                )
-                if result.returncode == 0 and "device" in result.stdout:
-                    print(f"[DEBUG] Device {device_addr} is online")
-                    return True
-            except:
-                pass
-
-            # Device offline, try to reconnect
-            print(f"[DEBUG] Device offline, attempting reconnect ({attempt + 1}/{max_retries})...")
-            self.log(f"디바이스 재연결 시도 중... ({attempt + 1}/{max_retries})")
-
-            try:
-                subprocess.run(
-                    [adb_exe, "connect", device_addr],
-                    capture_output=True, text=True, timeout=10,
-                    creationflags=SUBPROCESS_FLAGS
-                )
-                time.sleep(2)
-
-                # Check again
-                result = subprocess.run(
-                    [adb_exe, "-s", device_addr, "get-state"],
-                    capture_output=True, text=True, timeout=5,
-                    creationflags=SUBPROCESS_FLAGS
-                )
-                if result.returncode == 0 and "device" in result.stdout:
-                    self.log("✓ 디바이스 재연결 성공")
-                    return True
-            except:
-                pass
+        return self.transports.ensure(device_addr, max_retries)
 
-            time.sleep(2)
-
-        self.log("디바이스 재연결 실패", "WARNING")
-        return False
+    def inventory_key(self, device_addr):
+        """Inventory key (serial once identified) of the device at an adb address"""
+        device = self.registry.get(device_addr)
+        return DeviceInventory.key_for(device) if device else device_addr
 
     def on_closing(self):
         """Handle window closing"""
+        self.discovery.stop()
+        self.transports.stop()
+        if self.relay is not None:
+            self.relay.stop()
+        if self.adb.recorder is not None:
+            self.adb.recorder.close()
+        self.adb.timeouts.flush()
+        COMPUTE.shutdown()
+        if PROFILER.enabled:
+            try:
+                PROFILER.stop(self.profile_dir)
+            except OSError as e:
+                print(f"[DEBUG] Could not save profile: {str(e)}")
+
         if self.scrcpy_process and self.scrcpy_process.poll() is None:
             self.scrcpy_process.terminate()
 
-        # Disconnect all devices
-        try:
-            adb_exe = str(self.adb_path) if self.adb_path.exists() else "adb"
-            subprocess.run([adb_exe, "disconnect"], timeout=5, creationflags=SUBPROCESS_FLAGS)
-            subprocess.run([adb_exe, "kill-server"], timeout=5, creationflags=SUBPROCESS_FLAGS)
-        except:
-            pass
+        # Disconnect all devices and stop the server only when asked - otherwise the next
+        # start finds the server and its device connections already up
+        if self.kill_server_var.get():
+            try:
+                self.adb.run(["disconnect"], timeout=5)
+                self.adb.run(["kill-server"], timeout=5)
+            except:
+                pass
 
         self.root.destroy()
 
@@ -1727,14 +5519,26 @@ def check_path_for_korean():
 
 def main():
     """Main entry point"""
+    parser = argparse.ArgumentParser(description="RT1018 Android Device Installer")
+    parser.add_argument("--profile", action="store_true",
+                        help="record spans and stack samples to profiles/ until the window closes")
+    args, _ = parser.parse_known_args()
+
     # Check for Korean characters in path before starting
     check_path_for_korean()
 
     root = tk.Tk()
     app = RT1018InstallerGUI(root)
+    if args.profile:
+        app.profile_var.set(True)
+        app.toggle_profiling()
     root.protocol("WM_DELETE_WINDOW", app.on_closing)
     root.mainloop()
 
 
 if __name__ == "__main__":
+    if getattr(sys, 'frozen', False):
+        # Compute pool workers of the packaged exe start through this entry point
+        import multiprocessing
+        multiprocessing.freeze_support()
     main()
@@ -0,0 +1,75 @@
+"""Learned adb timeouts (no device needed)"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from rt1018_installer_gui import AdaptiveTimeouts, DeviceInventory  # noqa: E402
+
+ADDR = "192.168.7.21:5555"
+
+
+@pytest.fixture
+def inventory(tmp_path):
+    return DeviceInventory(tmp_path / "device_inventory.json")
+
+
+def learn(timeouts, operation, seconds, count=AdaptiveTimeouts.MIN_SAMPLES):
+    for _ in range(count):
+        timeouts.record(ADDR, operation, seconds)
+
+
+@pytest.mark.parametrize("args, step, expected", [
+    (["connect", ADDR], None, (ADDR, "connect")),
+    (["-s", ADDR, "get-state"], None, (ADDR, "get-state")),
+    (["-s", ADDR, "shell", "getprop ro.serialno"], None, (None, None)),
+    (["-s", ADDR, "shell", "cd /sdcard && find . -type f"], None, (None, None)),
+    (["-s", ADDR, "shell", "settings", "put", "global", "x", "1"], "locale:global",
+     (ADDR, "step locale:global shell settings")),
+    (["-s", ADDR, "root"], "root", (ADDR, "step root root")),
+    (["disconnect", ADDR], None, (None, None)),
+])
+def test_operation_keys(args, step, expected):
+    assert AdaptiveTimeouts.operation(args, step) == expected
+
+
+def test_budget_is_the_default_until_learned(inventory):
+    timeouts = AdaptiveTimeouts(inventory)
+    learn(timeouts, "connect", 10.0, count=AdaptiveTimeouts.MIN_SAMPLES - 1)
+    assert timeouts.budget(ADDR, "connect", 5) == 5
+
+
+def test_slow_devices_get_more_time_up_to_the_cap(inventory):
+    timeouts = AdaptiveTimeouts(inventory)
+    learn(timeouts, "connect", 4.0)
+    assert timeouts.budget(ADDR, "connect", 5) == pytest.approx(12.0)
+    learn(timeouts, "get-state", 30.0)
+    assert timeouts.budget(ADDR, "get-state", 5) == 5 * AdaptiveTimeouts.MAX_FACTOR
+
+
+def test_fast_devices_keep_the_static_timeout_until_they_time_out(inventory):
+    timeouts = AdaptiveTimeouts(inventory)
+    learn(timeouts, "connect", 0.1)
+    assert timeouts.budget(ADDR, "connect", 10) == 10
+    timeouts.record(ADDR, "connect", 10, timed_out=True)
+    # p99 now includes the hang, so the budget stays high until fast samples push it out
+    assert timeouts.budget(ADDR, "connect", 10) == 30
+    learn(timeouts, "connect", 0.1, count=AdaptiveTimeouts.SAMPLES)
+    assert timeouts.budget(ADDR, "connect", 10) == AdaptiveTimeouts.MIN_BUDGET
+
+
+def test_samples_and_timeouts_persist_in_the_inventory(inventory, tmp_path):
+    timeouts = AdaptiveTimeouts(inventory)
+    learn(timeouts, "step grant:camera shell pm", 2.0)
+    learn(timeouts, "shell pm", 2.0)  # Unkeyed shell samples are not learned
+    timeouts.record(ADDR, "reboot", 60, timed_out=True)
+    timeouts.flush()
+
+    reloaded = AdaptiveTimeouts(DeviceInventory(tmp_path / "device_inventory.json"))
+    assert reloaded.budget(ADDR, "step grant:camera shell pm", 5) == pytest.approx(6.0)
+    assert reloaded.budget(ADDR, "shell pm", 5) == 5
+    assert reloaded._device_samples(ADDR)["reboot"] == [60]
+    assert reloaded._timed_out[ADDR] == {"reboot"}
@@ -0,0 +1,194 @@
+"""Device discovery against a fake mDNS responder and a stub neighbor table (no network needed)"""
+
+import ipaddress
+import socket
+import struct
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import fake_adb_simulator  # noqa: E402
+from rt1018_installer_gui import (  # noqa: E402
+    AndroidDevice, DeviceDiscoveryService, DeviceRegistry, ScanTarget,
+    _interfaces_from_command_output, parse_mdns_response, parse_scan_targets, query_mdns,
+)
+
+
+def _name(name):
+    packet = b""
+    for label in name.strip(".").split("."):
+        packet += bytes([len(label)]) + label.encode("utf-8")
+    return packet + b"\x00"
+
+
+def _record(name, rtype, rdata):
+    return name + struct.pack("!HHIH", rtype, 0x8001, 120, len(rdata)) + rdata
+
+
+def build_response(services):
+    """mDNS answer with PTR + SRV (+ A when a host ip is given) per (instance, host, ip, port)"""
+    question = _name("_adb-tls-connect._tcp.local")
+    packet = struct.pack("!HHHHHH", 0, 0x8400, 1, 0, 0, 0) + question + struct.pack("!HH", 12, 1)
+    answers = []
+    for instance, host, ip, port in services:
+        # The instance name points back at the service name in the question (compression)
+        instance_name = bytes([len(instance)]) + instance.encode("utf-8") + b"\xc0\x0c"
+        answers.append(_record(b"\xc0\x0c", 12, instance_name))
+        answers.append(_record(instance_name, 33, struct.pack("!HHH", 0, 0, port) + _name(host)))
+        if ip:
+            answers.append(_record(_name(host), 1, socket.inet_aton(ip)))
+    header = struct.pack("!HHHHHH", 0, 0x8400, 1, len(answers), 0, 0)
+    return header + packet[12:] + b"".join(answers)
+
+
+class FakeMdnsResponder:
+    """Answers every query on a loopback UDP port, like a kiosk announcing adb"""
+
+    def __init__(self, services):
+        self.response = build_response(services)
+        self.queries = []
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.settimeout(0.1)
+        self.addr = self.sock.getsockname()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+
+    def _serve(self):
+        while not self._stop.is_set():
+            try:
+                data, sender = self.sock.recvfrom(9000)
+            except socket.timeout:
+                continue
+            self.queries.append(data)
+            self.sock.sendto(self.response, sender)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.sock.close()
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+SERVICES = [("kiosk-1", "kiosk-1.local", "192.168.7.21", 5555),
+            ("kiosk-2", "kiosk-2.local", None, 37111)]  # No A record: use the sender address
+
+
+def test_parse_mdns_response():
+    endpoints = parse_mdns_response(build_response(SERVICES), "192.168.7.99")
+    assert sorted(endpoints) == [("192.168.7.21", 5555), ("192.168.7.99", 37111)]
+
+
+def test_query_mdns_against_local_responder():
+    with FakeMdnsResponder(SERVICES) as responder:
+        endpoints = query_mdns(DeviceDiscoveryService.ADB_SERVICES, timeout=0.5,
+                               mdns_addr=responder.addr)
+    assert sorted(endpoints) == [("127.0.0.1", 37111), ("192.168.7.21", 5555)]
+    assert b"_adb-tls-connect" in responder.queries[0]
+
+
+@pytest.fixture
+def adb_device(tmp_path):
+    device = fake_adb_simulator.VirtualDevice("SIM0001", "127.0.0.1", free_port(), tmp_path)
+    device.start()
+    yield device
+    device.stop()
+
+
+def test_discovery_seeds_candidates_from_mdns_and_neighbors(adb_device):
+    closed_port = free_port()
+    identified = []
+    found = []
+
+    def identify(ip, port):
+        identified.append((ip, port))
+        return (ip, port, "SIM", "9", "RT1018")
+
+    registry = DeviceRegistry()
+    with FakeMdnsResponder(SERVICES) as responder:
+        service = DeviceDiscoveryService(
+            registry, identify, lambda *info: found.append(info),
+            ports=(adb_device.port, closed_port), mdns_addr=responder.addr,
+            neighbor_source=lambda: ["127.0.0.1"])
+        service.discover_once()
+
+    # mDNS endpoints first, then the neighbor whose port answered the ADB handshake
+    assert identified == [("192.168.7.21", 5555), ("127.0.0.1", 37111),
+                          ("127.0.0.1", adb_device.port)]
+    assert len(found) == 3
+
+
+def test_discovery_skips_known_devices(adb_device):
+    registry = DeviceRegistry()
+    device, _ = registry.upsert("127.0.0.1", adb_device.port)
+    device.set_state(AndroidDevice.CONNECTED)
+    identified = []
+    service = DeviceDiscoveryService(registry, lambda ip, port: identified.append((ip, port)),
+                                     lambda *info: None, ports=(adb_device.port,),
+                                     mdns_addr=("127.0.0.1", free_port()),
+                                     neighbor_source=lambda: ["127.0.0.1"])
+    service.discover_once()
+    assert identified == []
+
+
+IP_ADDR = "2: eth0    inet 172.16.0.4/20 brd 172.16.15.255 scope global eth0\n"
+IFCONFIG_LINUX = """eth0: flags=4163<UP,BROADCAST,RUNNING,MULTICAST>  mtu 1500
+        inet 192.168.1.10  netmask 255.255.255.0  broadcast 192.168.1.255
+lo: flags=73<UP,LOOPBACK,RUNNING>  mtu 65536
+        inet 127.0.0.1  netmask 255.0.0.0
+"""
+IFCONFIG_OLD_NET_TOOLS = """eth0      Link encap:Ethernet  HWaddr 00:11:22:33:44:55
+          inet addr:10.0.5.7  Bcast:10.0.5.255  Mask:255.255.254.0
+"""
+IFCONFIG_BSD = "en0: flags=8863<UP>\n\tinet 192.168.7.3 netmask 0xffffff00 broadcast 192.168.7.255\n"
+IPCONFIG = """Ethernet adapter Ethernet:
+   IPv4 Address. . . . . . . . . . . : 192.168.0.42
+   Subnet Mask . . . . . . . . . . . : 255.255.252.0
+   Default Gateway . . . . . . . . . : 192.168.0.1
+"""
+
+
+@pytest.mark.parametrize("output, expected", [
+    (IP_ADDR, ["172.16.0.4/20"]),
+    (IFCONFIG_LINUX, ["192.168.1.10/24", "127.0.0.1/8"]),
+    (IFCONFIG_OLD_NET_TOOLS, ["10.0.5.7/23"]),
+    (IFCONFIG_BSD, ["192.168.7.3/24"]),
+    (IPCONFIG, ["192.168.0.42/22"]),
+    ("", []),
+])
+def test_interfaces_from_command_output(output, expected):
+    assert _interfaces_from_command_output(output) == [ipaddress.ip_interface(i) for i in expected]
+
+
+def test_parse_scan_targets():
+    # Legacy three-octet form, per-target ports, duplicates dropped, host bits ignored
+    targets = parse_scan_targets("192.168.1, 10.0.5.0/23@5555+1206; 192.168.1.0/24\n"
+                                 "172.16.0.9/30@37000")
+    assert targets == [ScanTarget("192.168.1.0/24"), ScanTarget("10.0.5.0/23", [5555, 1206]),
+                       ScanTarget("172.16.0.8/30", [37000])]
+    assert targets[0].ports == (1206, 5555)
+
+
+@pytest.mark.parametrize("text, message", [
+    ("", "비어 있음"),
+    ("192.168.1.0/33", "잘못된 스캔 대상"),
+    ("fe80::/64", "IPv4만 지원"),
+    ("192.168.1.0/24@70000", "잘못된 포트"),
+    ("192.168.1.0/24@+", "포트가 지정되지 않음"),
+])
+def test_parse_scan_targets_rejects(text, message):
+    with pytest.raises(ValueError, match=message):
+        parse_scan_targets(text)
@@ -0,0 +1,85 @@
+"""ADB CNXN fingerprinting of open ports against the simulator and fake services"""
+
+import socket
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import fake_adb_simulator  # noqa: E402
+from rt1018_installer_gui import (  # noqa: E402
+    ADB_AUTH, ADB_ENDPOINT, ADB_UNAUTHORIZED, NOT_ADB, _adb_packet, classify_adb_handshake,
+    probe_adb_endpoints,
+)
+
+
+class FakeService:
+    """Accepts one connection, reads what the client sends and answers with fixed bytes"""
+
+    def __init__(self, reply):
+        self.reply = reply
+        self.received = b""
+        self.listener = socket.socket()
+        self.listener.bind(("127.0.0.1", 0))
+        self.listener.listen(1)
+        self.port = self.listener.getsockname()[1]
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+
+    def _serve(self):
+        conn, _ = self.listener.accept()
+        with conn:
+            conn.settimeout(2)
+            try:
+                self.received = conn.recv(64)
+            except OSError:
+                pass
+            conn.sendall(self.reply)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._thread.join(timeout=5)
+        self.listener.close()
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def adb_device(tmp_path):
+    device = fake_adb_simulator.VirtualDevice("SIM0001", "127.0.0.1", free_port(), tmp_path)
+    device.start()
+    yield device
+    device.stop()
+
+
+def test_simulated_adbd_answers_cnxn(adb_device):
+    with socket.create_connection(("127.0.0.1", adb_device.port), timeout=1) as sock:
+        assert classify_adb_handshake(sock) == ADB_ENDPOINT
+    assert probe_adb_endpoints("127.0.0.1", [adb_device.port]) == [
+        ("127.0.0.1", adb_device.port, ADB_ENDPOINT)]
+
+
+def test_closed_port_is_not_reported():
+    assert probe_adb_endpoints("127.0.0.1", [free_port()]) == []
+
+
+@pytest.mark.parametrize("reply, kind", [
+    (b"SSH-2.0-OpenSSH_9.6\r\n" + b"\0" * 8, NOT_ADB),        # Other service with a banner
+    (b"HTTP/1.1 400 Bad Request\r\n\r\n", NOT_ADB),
+    (b"", NOT_ADB),                                            # Closes without answering
+    (_adb_packet(ADB_AUTH, 1, 0, b"\0" * 20), ADB_UNAUTHORIZED),  # adbd waiting for the RSA key
+    (_adb_packet(ADB_AUTH, 1, 0)[:20] + b"\0\0\0\0", NOT_ADB),    # ADB-sized header, bad magic
+])
+def test_other_replies(reply, kind):
+    with FakeService(reply) as service:
+        assert probe_adb_endpoints("127.0.0.1", [service.port]) == [("127.0.0.1", service.port, kind)]
+    assert service.received.startswith(b"CNXN")
@@ -0,0 +1,117 @@
+"""Install bundle build / open / extract round trip (no device needed)"""
+
+import json
+import os
+import struct
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from rt1018_installer_gui import (  # noqa: E402
+    BUNDLE_MAGIC, BUNDLE_MANIFEST_NAME, InstallBundle, bundle_manifest_for,
+)
+
+FILES = {
+    "apk/EightPresso.apk": os.urandom(200_000),           # Incompressible - stored
+    "sdcard/files/menu.json": b'{"item": "latte"}\n' * 5000,  # Compressible - zlib
+    "sdcard/files/empty.txt": b"",
+    "data/MainDatabase.db": b"SQLite format 3\0" + bytes(range(256)) * 40,
+}
+
+
+@pytest.fixture
+def source(tmp_path):
+    root = tmp_path / "install_files"
+    for rel, content in FILES.items():
+        path = root / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(content)
+        os.utime(path, (1_700_000_000, 1_700_000_000))
+    return root
+
+
+@pytest.fixture
+def bundle(source, tmp_path):
+    return InstallBundle.build(source, tmp_path / "set.rtb")
+
+
+def test_round_trip(bundle, tmp_path):
+    assert sorted(bundle.files) == sorted(FILES)
+    compression = {rel: entry["compression"] for rel, entry in bundle.files.items()}
+    assert compression["sdcard/files/menu.json"] == "zlib"
+    assert compression["apk/EightPresso.apk"] != "zlib"
+    for rel, content in FILES.items():
+        assert bundle.read(rel) == content
+
+    reopened = InstallBundle(bundle.path)
+    assert reopened.bundle_id == bundle.bundle_id
+    dest = reopened.extract(tmp_path / "extracted")
+    for rel, content in FILES.items():
+        assert (dest / rel).read_bytes() == content
+        assert int((dest / rel).stat().st_mtime) == 1_700_000_000
+    manifest = json.loads((dest / BUNDLE_MANIFEST_NAME).read_text(encoding="utf-8"))
+    assert manifest["files"] == reopened.header["files"]
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_manifest_slice(bundle):
+    files = bundle_manifest_for(bundle.files, "sdcard/files")
+    assert sorted(files) == ["empty.txt", "menu.json"]
+    assert files["empty.txt"][0] == 0
+    assert sorted(bundle_manifest_for(bundle.files, "data/MainDatabase.db")) == ["MainDatabase.db"]
+
+
+def rewrite_header(path, edit):
+    data = path.read_bytes()
+    (length,) = struct.unpack(">I", data[len(BUNDLE_MAGIC):len(BUNDLE_MAGIC) + 4])
+    start = len(BUNDLE_MAGIC) + 4
+    header = edit(data[start:start + length])
+    path.write_bytes(BUNDLE_MAGIC + struct.pack(">I", len(header)) + header + data[start + length:])
+
+
+def test_not_a_bundle(tmp_path):
+    path = tmp_path / "other.rtb"
+    path.write_bytes(b"PK\x03\x04 zip file")
+    with pytest.raises(ValueError, match="설치 번들 형식이 아님"):
+        InstallBundle(path)
+
+
+@pytest.mark.parametrize("edit", [
+    lambda header: header[:len(header) // 2],             # Truncated JSON
+    lambda header: b"[1, 2, 3]",                          # Valid JSON, not a manifest
+    lambda header: json.dumps({"version": 1}).encode(),   # No file table
+    lambda header: json.dumps({"files": [{"size": 1}]}).encode(),  # Entry without a path
+])
+def test_corrupted_manifest_is_rejected(bundle, edit):
+    rewrite_header(bundle.path, edit)
+    with pytest.raises(ValueError, match="손상된 설치 번들"):
+        InstallBundle(bundle.path)
+
+
+def test_truncated_manifest_is_rejected(bundle):
+    bundle.path.write_bytes(bundle.path.read_bytes()[:len(BUNDLE_MAGIC) + 4 + 10])
+    with pytest.raises(ValueError, match="손상된 설치 번들"):
+        InstallBundle(bundle.path)
+
+
+def test_manifest_hash_mismatch_fails_extraction(bundle, tmp_path):
+    def wrong_md5(header):
+        manifest = json.loads(header)
+        manifest["files"][0]["md5"] = "0" * 32
+        return json.dumps(manifest).encode()
+
+    rewrite_header(bundle.path, wrong_md5)
+    with pytest.raises(ValueError, match="해시 불일치"):
+        InstallBundle(bundle.path).extract(tmp_path / "extracted")
+
+
+def test_truncated_payload_is_detected(bundle):
+    data = bundle.path.read_bytes()
+    bundle.path.write_bytes(data[:-10])
+    entries = bundle.files.values()
+    last = max(entries, key=lambda entry: (entry["offset"], entry["length"]))["path"]
+    with pytest.raises(ValueError, match="손상된 설치 번들"):
+        InstallBundle(bundle.path).read(last)
@@ -0,0 +1,94 @@
+"""Checkpoint journal persistence (no device needed)"""
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from rt1018_installer_gui import InstallJournal  # noqa: E402
+
+
+@pytest.fixture
+def path(tmp_path):
+    return tmp_path / "journals" / "SERIAL1.json"
+
+
+def test_checkpoints_persist_across_reopen(path):
+    journal = InstallJournal(path, "src")
+    journal.mark_done("apk:app")
+    journal.mark_done("apk:app")
+    journal.record_files("push:sdcard", {"a.mp4": 10, "sub/b.mp4": 20})
+    journal.record_files("push:sdcard", {"c.mp4": 30})
+    journal.record_files("push:sdcard", {})
+
+    reopened = InstallJournal(path, "src")
+    assert reopened.completed_steps() == ["apk:app"]
+    assert reopened.is_done("apk:app") and not reopened.is_done("grant:camera")
+    assert reopened.pushed_files("push:sdcard") == {"a.mp4": 10, "sub/b.mp4": 20, "c.mp4": 30}
+    assert reopened.pushed_files("push:app_files") == {}
+
+
+@pytest.mark.parametrize("stored", [
+    {"version": InstallJournal.VERSION, "source": "old-src"},
+    {"version": InstallJournal.VERSION + 1, "source": "src"},
+])
+def test_mismatched_journal_is_deleted(path, stored):
+    path.parent.mkdir(parents=True)
+    path.write_text(json.dumps(dict(stored, steps=["apk:app"], files={})), encoding="utf-8")
+    journal = InstallJournal(path, "src")
+    assert journal.completed_steps() == []
+    assert not path.exists()
+
+
+def test_corrupt_journal_starts_empty(path):
+    path.parent.mkdir(parents=True)
+    path.write_text("{not json", encoding="utf-8")
+    journal = InstallJournal(path, "src")
+    assert journal.completed_steps() == []
+    journal.mark_done("root")
+    assert InstallJournal(path, "src").completed_steps() == ["root"]
+
+
+def test_fresh_discards_an_existing_journal(path):
+    InstallJournal(path, "src").mark_done("apk:app")
+    journal = InstallJournal(path, "src", fresh=True)
+    assert journal.completed_steps() == []
+    assert not path.exists()
+
+
+def test_finish_deletes_the_journal(path):
+    journal = InstallJournal(path, "src")
+    journal.mark_done("apk:app")
+    journal.finish()
+    assert not path.exists()
+    assert journal.completed_steps() == []
+    journal.finish()  # Already gone
+
+
+def test_failed_save_keeps_the_previous_journal(path, monkeypatch):
+    journal = InstallJournal(path, "src")
+    journal.mark_done("apk:app")
+
+    def broken_dump(*args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(json, "dump", broken_dump)
+    with pytest.raises(OSError):
+        journal.mark_done("grant:camera")
+    monkeypatch.undo()
+    # The half-written temp file never replaced the journal
+    assert json.loads(path.read_text(encoding="utf-8"))["steps"] == ["apk:app"]
+    assert InstallJournal(path, "src").completed_steps() == ["apk:app"]
+
+
+def test_source_fingerprint_follows_content(tmp_path):
+    source = tmp_path / "source"
+    (source / "data").mkdir(parents=True)
+    (source / "data" / "db").write_bytes(b"1234")
+    before = InstallJournal.source_fingerprint(source)
+    assert before == InstallJournal.source_fingerprint(source)
+    (source / "data" / "extra").write_bytes(b"x")
+    assert InstallJournal.source_fingerprint(source) != before
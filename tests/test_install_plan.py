@@ -0,0 +1,186 @@
+"""Install plan compiler and executor against a stub host (no device needed)"""
+
+import contextlib
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from rt1018_installer_gui import (  # noqa: E402
+    AndroidDevice, InstallJournal, InstallPlanExecutor, StepFailed, compile_install_plan,
+)
+
+
+class StubHost:
+    """Answers every adb call with empty output; commands containing a `fail` word raise"""
+
+    def __init__(self, fail=()):
+        self.fail = set(fail)
+        self.commands = []
+        self.logs = []
+
+    def log(self, message, level="INFO"):
+        self.logs.append((level, message))
+
+    def run_adb_command(self, device, command, timeout=60, watch=False, progress=None, nbytes=None,
+                        step=None):
+        self.commands.append(command)
+        if self.fail.intersection(command):
+            raise Exception(f"error: {' '.join(command)} failed")
+        return ""
+
+    def get_error_message(self, error):
+        return error, "로그 확인"
+
+    def ensure_device_connection(self, device_addr):
+        return True
+
+
+def shell(step_id, after=(), **extra):
+    return dict({"id": step_id, "action": "shell", "command": ["echo", step_id], "after": list(after)},
+                **extra)
+
+
+def ids(steps):
+    return [step.id for step in steps]
+
+
+def make_executor(host, plan, tmp_path, source_id="src"):
+    device = AndroidDevice("127.0.0.1")
+    device.set_state(AndroidDevice.CONNECTED)
+    journal = InstallJournal(tmp_path / "journal.json", source_id)
+    return InstallPlanExecutor(host, plan, device, tmp_path, journal), journal
+
+
+def run_order(host):
+    return [command[2] for command in host.commands]
+
+
+def test_compile_orders_dependencies():
+    steps = compile_install_plan({"steps": [shell("c", after=["b"]), shell("a"), shell("b", after=["a"])]})
+    assert ids(steps) == ["a", "b", "c"]
+
+
+def test_compile_rejects_unknown_dependency():
+    with pytest.raises(ValueError, match="'b'의 선행 단계 'missing' 없음"):
+        compile_install_plan({"steps": [shell("a"), shell("b", after=["missing"])]})
+
+
+def test_compile_rejects_cycles():
+    with pytest.raises(ValueError, match="순환 의존성 \\(a, b\\)"):
+        compile_install_plan({"steps": [shell("a", after=["b"]), shell("b", after=["a"]), shell("c")]})
+
+
+def test_compile_rejects_duplicate_ids_and_unknown_actions():
+    with pytest.raises(ValueError, match="중복된 단계 ID"):
+        compile_install_plan({"steps": [shell("a"), shell("a")]})
+    with pytest.raises(ValueError, match="알 수 없는 동작"):
+        compile_install_plan({"steps": [{"id": "a", "action": "format_disk"}]})
+
+
+def test_reboot_is_a_barrier():
+    steps = compile_install_plan({"steps": [
+        shell("a"), shell("b", after=["a"]), shell("unrelated"),
+        {"id": "reboot", "action": "reboot", "after": ["a"]},
+        shell("after_reboot", after=["reboot"]),
+    ]})
+    by_id = {step.id: step for step in steps}
+    # The reboot waits for every step that does not depend on it, not only the declared one
+    assert sorted(by_id["reboot"].after) == ["a", "b", "unrelated"]
+    assert ids(steps).index("reboot") > max(ids(steps).index(s) for s in ("a", "b", "unrelated"))
+    assert ids(steps)[-1] == "after_reboot"
+
+
+def test_barrier_can_be_disabled_or_set_on_other_steps():
+    steps = compile_install_plan({"steps": [
+        shell("a"), shell("b"), {"id": "reboot", "action": "reboot", "after": ["a"], "barrier": False},
+        shell("sync", barrier=True),
+    ]})
+    by_id = {step.id: step for step in steps}
+    assert by_id["reboot"].after == ("a",)
+    assert sorted(by_id["sync"].after) == ["a", "b", "reboot"]
+    assert "barrier" not in by_id["sync"].params
+
+
+def test_variables_are_substituted_into_every_string():
+    steps = compile_install_plan({
+        "variables": {"package": "com.example.kiosk"},
+        "steps": [{"id": "stop", "action": "shell", "command": ["am", "force-stop", "{package}"],
+                   "label": "stop {package}", "paths": {"data": "/data/data/{package}"}}],
+    })
+    assert steps[0].params["command"] == ["am", "force-stop", "com.example.kiosk"]
+    assert steps[0].params["paths"] == {"data": "/data/data/com.example.kiosk"}
+    assert steps[0].label == "stop com.example.kiosk"
+
+
+def test_executor_runs_steps_after_their_dependencies(tmp_path):
+    host = StubHost()
+    plan = {"steps": [shell("a"), shell("b", after=["a"]), shell("c", after=["a"]),
+                      shell("d", after=["b", "c"])]}
+    executor, journal = make_executor(host, plan, tmp_path)
+    executor.run()
+    order = run_order(host)
+    assert sorted(order) == ["a", "b", "c", "d"]
+    assert order[0] == "a" and order[-1] == "d"
+    assert all(executor.results[step]["status"] == "success" for step in order)
+    assert executor.device.state == AndroidDevice.INSTALLING
+    assert not journal.path.exists()
+
+
+def test_required_step_failure_stops_dependents(tmp_path):
+    host = StubHost(fail={"b"})
+    plan = {"steps": [shell("a"), shell("b", after=["a"]), shell("c", after=["b"])]}
+    executor, journal = make_executor(host, plan, tmp_path)
+    with pytest.raises(StepFailed, match="b"):
+        executor.run()
+    assert run_order(host) == ["a", "b"]
+    assert executor.results["b"]["status"] == "failed"
+    assert "c" not in executor.results
+    # The journal stays so the next run resumes after "a"
+    assert InstallJournal(journal.path, "src").completed_steps() == ["a"]
+
+
+def test_failed_optional_step_still_finishes_the_journal(tmp_path):
+    host = StubHost(fail={"remount"})
+    plan = {"steps": [shell("a"),
+                      {"id": "remount", "action": "shell", "command": ["remount"], "adb": True,
+                       "required": False, "quiet": True, "checkpoint": False},
+                      shell("b", after=["a", "remount"])]}
+    executor, journal = make_executor(host, plan, tmp_path)
+    executor.run()
+    assert executor.results["remount"]["status"] == "failed"
+    assert executor.results["b"]["status"] == "success"
+    assert not journal.path.exists()
+
+
+def test_checkpointed_steps_are_skipped_on_resume(tmp_path):
+    plan = {"steps": [shell("a"), shell("b", after=["a"]), shell("c", after=["b"]),
+                      shell("always", after=["a"], checkpoint=False)]}
+    first = StubHost(fail={"c"})
+    executor, _ = make_executor(first, plan, tmp_path)
+    with pytest.raises(StepFailed):
+        executor.run()
+
+    second = StubHost()
+    executor, journal = make_executor(second, plan, tmp_path)
+    executor.run()
+    # "a" and "b" completed in the first run; uncheckpointed steps always rerun
+    assert sorted(run_order(second)) == ["always", "c"]
+    assert executor.results["a"]["status"] == executor.results["b"]["status"] == "skipped"
+    assert not journal.path.exists()
+
+
+def test_reboot_timeout_returns_the_device_to_installing(tmp_path):
+    host = StubHost()
+    host.reboots = SimpleNamespace(reboot=lambda addr, max_wait, initial_delay: None)
+    host.reboot_wait = lambda device: contextlib.nullcontext()
+    plan = {"steps": [shell("a"), {"id": "reboot", "action": "reboot", "after": ["a"]},
+                      shell("b", after=["reboot"])]}
+    executor, _ = make_executor(host, plan, tmp_path)
+    executor.run()
+    assert executor.results["reboot"]["status"] == "skipped"
+    assert executor.device.state == AndroidDevice.INSTALLING
+    assert not executor.rebooted
@@ -0,0 +1,84 @@
+"""Relay HTTP server access and peer file lists, run against local processes (no device needed)"""
+
+import subprocess
+import sys
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from rt1018_installer_gui import MediaRelay, RelayServer  # noqa: E402
+
+
+@pytest.fixture
+def media(tmp_path):
+    root = tmp_path / "sdcard" / "files"
+    (root / "video").mkdir(parents=True)
+    (root / "video" / "intro 1.mp4").write_bytes(b"0123456789")
+    (tmp_path / "data.db").write_bytes(b"secret")
+    return root
+
+
+@pytest.fixture
+def server(media):
+    server = RelayServer(media, "127.0.0.1")
+    yield server
+    server.stop()
+
+
+def fetch(url, headers=None):
+    request = urllib.request.Request(url, headers=headers or {})
+    with urllib.request.urlopen(request, timeout=5) as response:
+        return response.status, response.read()
+
+
+def test_server_listens_only_on_the_given_address(server):
+    assert server.url.startswith(f"http://127.0.0.1:{server.port}/")
+
+
+def test_files_are_served_under_the_token_only(server):
+    assert fetch(f"{server.url}/video/intro%201.mp4") == (200, b"0123456789")
+    assert fetch(f"{server.url}/video/intro%201.mp4", {"Range": "bytes=4-"}) == (206, b"456789")
+    base = server.url.rpartition("/")[0]
+    for url in (f"{base}/video/intro%201.mp4", f"{base}/wrong-token/video/intro%201.mp4",
+                f"{server.url}/../data.db", f"{server.url}/%2e%2e/data.db"):
+        with pytest.raises(urllib.error.HTTPError) as error:
+            fetch(url)
+        assert error.value.code == 404
+
+
+def test_each_server_gets_its_own_token(media, server):
+    other = RelayServer(media, "127.0.0.1")
+    try:
+        assert other.url.rpartition("/")[2] != server.url.rpartition("/")[2]
+    finally:
+        other.stop()
+
+
+def test_peer_file_list_holds_only_pending_paths(tmp_path, monkeypatch):
+    # The "peer" is a local directory; its shell commands run in sh
+    peer_dir = tmp_path / "peer"
+    (peer_dir / "sub").mkdir(parents=True)
+    for rel in ("a b.mp4", "sub/c'1.mp4", "runtime.log"):
+        (peer_dir / rel).write_bytes(rel.encode("utf-8"))
+
+    def run_adb(addr, command, timeout=60):
+        return subprocess.run(["sh", "-c", command[1]], capture_output=True, text=True,
+                              check=True, timeout=timeout).stdout
+
+    relay = MediaRelay(run_adb, print)
+    monkeypatch.setattr(MediaRelay, "PEER_FILE_LIST", str(tmp_path / "list.txt"))
+    monkeypatch.setattr(MediaRelay, "BATCH_FILES", 1)
+    peer = type("Peer", (), {"addr": "peer:5555"})()
+    relay._write_peer_file_list(peer, {"a b.mp4": 7, "sub/c'1.mp4": 9})
+    written = (tmp_path / "list.txt").read_text(encoding="utf-8").splitlines()
+    assert written == ["a b.mp4", "sub/c'1.mp4"]
+
+    # What the peer's `tar -T` sends: the pending files, not what the app wrote next to them
+    script = f"cd '{peer_dir}' && tar -cf - -T '{tmp_path / 'list.txt'}' | tar -tf -"
+    listing = subprocess.run(["sh", "-c", script], capture_output=True, text=True,
+                             check=True).stdout
+    assert sorted(listing.splitlines()) == ["a b.mp4", "sub/c'1.mp4"]